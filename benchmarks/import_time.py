@@ -0,0 +1,61 @@
+"""Cold-start import time report.
+
+Imports an entry point in a fresh interpreter under ``-X importtime`` and
+lists the slowest modules by cumulative time, so a heavy dependency creeping
+back onto the startup path shows up before it ships.
+
+    python -m benchmarks.import_time --module src.daemon --max-ms 500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every module a fresh import of ``module`` loads."""
+    code = f"import sys; sys.path[:0] = [{ROOT!r}, {os.path.join(ROOT, 'src')!r}]; import {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            times.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return times
+
+
+def total_ms(times: List[Tuple[str, int, int]], module: str) -> float:
+    return next((cumulative for name, _, cumulative in times if name == module), 0) / 1000
+
+
+def format_report(times: List[Tuple[str, int, int]], module: str, top: int) -> str:
+    lines = [f"import {module}: {total_ms(times, module):.1f} ms", f"{'cumulative ms':>14} {'self ms':>9}  module"]
+    for name, own, cumulative in sorted(times, key=lambda t: t[2], reverse=True)[:top]:
+        lines.append(f"{cumulative / 1000:>14.1f} {own / 1000:>9.1f}  {name}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, help="exit non-zero if the import takes longer")
+    args = parser.parse_args(argv)
+
+    times = import_times(args.module)
+    print(format_report(times, args.module, args.top))
+    if args.max_ms is not None and total_ms(times, args.module) > args.max_ms:
+        print(f"Import of {args.module} exceeds {args.max_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
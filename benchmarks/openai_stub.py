@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple, Union
+
+# responder(request_body) -> (status, content or error body, extra headers);
+# a dict instead of the content is sent as the complete chat completion
+Responder = Callable[[dict], Tuple[int, Union[str, dict], Dict[str, str]]]
+
+
+def chat_completion(content: str, prompt_tokens: int = 10, completion_tokens: int = 1) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-4.1-mini",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class OpenAIStub:
+    """Local OpenAI-compatible chat completions server for tests.
+
+    Use as a context manager; ``base_url`` goes into ``Config.openai_api_base``.
+    """
+
+    def __init__(self, responder: Responder, latency: float = 0.0):
+        self.responder = responder
+        self.latency = latency
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests.append(body)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    status, content, headers = stub.responder(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                if status == 200:
+                    payload = json.dumps(content if isinstance(content, dict) else chat_completion(content)).encode()
+                else:
+                    payload = json.dumps({"error": {"message": content, "type": "stub_error"}}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
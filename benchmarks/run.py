@@ -0,0 +1,287 @@
+"""Offline end-to-end pipeline benchmark.
+
+Serves a synthetic feed plus OpenAI-compatible, Pushover and redirect
+stand-ins from local servers, runs the fetch, filter, classify, resolve and
+notify stages against them and reports per-stage latency percentiles,
+throughput and peak RSS. Nothing leaves the machine.
+
+    python -m benchmarks.run --entries 10000 --runs 5 --openai-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Tuple
+
+import requests
+
+from benchmarks.stubs import Faults, feed_stub, openai_stub, pushover_stub, redirect_stub
+from src.classifier_engine import ClassifierEngine
+from src.config import Config
+from src.follow_redirects import follow_redirects_many, set_redirect_cache
+from src.metrics import percentile
+from src.notifier import MAX_URL_LENGTH, PushoverClient, send_notification
+from src.redirect_cache import RedirectCache
+from src.rss import fetch_feed, parse_rss_events
+
+STAGES = ("fetch", "filter", "classify", "resolve", "notify")
+KEYWORD = "Iran"
+TRIGGER_WORD = "struck"
+
+
+@dataclass
+class BenchmarkOptions:
+    entries: int = 1000
+    runs: int = 5
+    match_rate: float = 0.3
+    trigger_rate: float = 0.1
+    long_link_rate: float = 0.3
+    recipients: int = 2
+    streaming: bool = False
+    batch_size: int = 20
+    concurrency: int = 4
+    feed_latency: float = 0.0
+    openai_latency: float = 0.05
+    pushover_latency: float = 0.02
+    redirect_latency: float = 0.01
+    error_rate: float = 0.0
+    poll_interval: float = 60.0
+    seed: int = 0
+
+
+@dataclass
+class BenchmarkReport:
+    options: BenchmarkOptions
+    samples: Dict[str, List[float]] = field(default_factory=lambda: {stage: [] for stage in STAGES})
+    entries: int = 0
+    matched: int = 0
+    triggered: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    # Errors the stand-in servers injected, per service; retries hide most of them from ``errors``
+    injected: Dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+    peak_rss_mb: float = 0.0
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "total": sum(values),
+            }
+            for stage, values in self.samples.items()
+        }
+
+    def to_dict(self) -> dict:
+        run_seconds = self.elapsed / self.options.runs if self.options.runs else 0.0
+        return {
+            "options": asdict(self.options),
+            "stages": self.stage_stats(),
+            "entries": self.entries,
+            "matched": self.matched,
+            "triggered": self.triggered,
+            "errors": self.errors,
+            "injected_errors": self.injected,
+            "elapsed_seconds": self.elapsed,
+            "entries_per_second": self.entries / self.elapsed if self.elapsed else 0.0,
+            "watches_per_poll_interval": math.floor(self.options.poll_interval / run_seconds) if run_seconds else 0,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def synthetic_feed(options: BenchmarkOptions, redirect_port: int) -> bytes:
+    """RSS document with ``entries`` items published within the last half hour."""
+    rng = random.Random(options.seed)
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(options.entries):
+        if rng.random() < options.match_rate:
+            verb = TRIGGER_WORD if rng.random() < options.trigger_rate / options.match_rate else "warns about"
+            title = f"{KEYWORD} {verb} target {i} in region {i % 17}"
+        else:
+            title = f"Markets update {i}: stocks move in sector {i % 23}"
+        if rng.random() < options.long_link_rate:
+            link = f"http://127.0.0.1:{redirect_port}/r/{i}?ref={'x' * (MAX_URL_LENGTH + 100)}"
+        else:
+            link = f"https://news.example/articles/{i}"
+        published = format_datetime(now - timedelta(seconds=rng.randint(0, 1800)))
+        items.append(f"<item><title>{title}</title><link>{link}</link><guid>bench-{i}</guid><pubDate>{published}</pubDate></item>")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Benchmark feed</title>{"".join(items)}</channel></rss>""".encode("utf-8")
+
+
+def _timed(report: BenchmarkReport, stage: str, func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        report.errors[stage] = report.errors.get(stage, 0) + 1
+        logging.debug(f"{stage} failed: {e}")
+        return None
+    finally:
+        report.samples[stage].append(time.perf_counter() - start)
+
+
+async def _run_once(report: BenchmarkReport, config: Config, engine: ClassifierEngine, client: PushoverClient, feed_url: str, session: requests.Session):
+    options = report.options
+    response = _timed(report, "fetch", fetch_feed, feed_url, session=session)
+    if response is None:
+        return
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=config.lookback_minutes)
+    events = _timed(
+        report, "filter", parse_rss_events,
+        response.content, response.headers.get("Content-Type", ""), cutoff, KEYWORD, options.streaming,
+    ) or []
+    report.entries += options.entries
+    report.matched += len(events)
+
+    start = time.perf_counter()
+    verdicts = await engine.classify_many([event.title for event in events])
+    report.samples["classify"].append(time.perf_counter() - start)
+    report.errors["classify"] = report.errors.get("classify", 0) + sum(v is None for v in verdicts)
+    triggered = [event for event, verdict in zip(events, verdicts) if verdict]
+    report.triggered += len(triggered)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RedirectCache(os.path.join(tmp, "redirects.sqlite3"))
+        set_redirect_cache(cache)
+        try:
+            long_links = [event.link for event in triggered if len(event.link) > MAX_URL_LENGTH]
+            _timed(report, "resolve", follow_redirects_many, long_links, cache)
+            for event in triggered:
+                results = _timed(
+                    report, "notify", send_notification,
+                    title=f"News Alert: {KEYWORD}",
+                    message=event.title,
+                    url=event.link,
+                    user_keys=config.pushover_user_keys,
+                    api_token=config.pushover_api_token,
+                    client=client,
+                ) or []
+                failed = sum(not result.success for result in results)
+                if failed:
+                    report.errors["notify"] = report.errors.get("notify", 0) + failed
+        finally:
+            set_redirect_cache(None)
+            cache.close()
+
+
+def run_benchmark(options: BenchmarkOptions) -> BenchmarkReport:
+    report = BenchmarkReport(options)
+    faults = {
+        "feed": Faults(options.feed_latency, options.error_rate, options.seed),
+        "openai": Faults(options.openai_latency, options.error_rate, options.seed),
+        "redirect": Faults(options.redirect_latency, options.error_rate, options.seed),
+        "pushover": Faults(options.pushover_latency, options.error_rate, options.seed),
+    }
+    with redirect_stub(faults["redirect"]) as redirects, \
+            pushover_stub(faults["pushover"]) as pushover, \
+            openai_stub(lambda text: TRIGGER_WORD in text, faults["openai"]) as openai, \
+            tempfile.TemporaryDirectory() as state_dir:
+        body = synthetic_feed(options, redirects.port)
+        with feed_stub(body, faults["feed"]) as feed:
+            config = Config(
+                rss_feed_url=f"http://127.0.0.1:{feed.port}/rss",
+                keyword_filter=KEYWORD,
+                triggering_event="Benchmark event has occurred",
+                lookback_minutes=60,
+                pushover_user_keys=[f"user{i}" for i in range(options.recipients)],
+                pushover_api_token="bench-token",
+                openai_api_key="bench-key",
+                state_dir=state_dir,
+                classification_batch_size=options.batch_size,
+                classification_max_concurrency=options.concurrency,
+                openai_api_base=openai.base_url,
+                prescreen_enabled=False,
+            )
+            client = PushoverClient(
+                config.pushover_api_token,
+                backoff_base=0.01,
+                api_url=f"http://127.0.0.1:{pushover.port}/1/messages.json",
+            )
+            session = requests.Session()
+
+            async def run_all():
+                engine = ClassifierEngine(config, backoff_base=0.01)
+                try:
+                    for _ in range(options.runs):
+                        await _run_once(report, config, engine, client, config.rss_feed_url, session)
+                finally:
+                    await engine.aclose()
+
+            start = time.perf_counter()
+            try:
+                asyncio.run(run_all())
+            finally:
+                report.elapsed = time.perf_counter() - start
+                client.close()
+                session.close()
+    report.injected = {service: f.injected for service, f in faults.items()}
+    report.peak_rss_mb = peak_rss_mb()
+    return report
+
+
+def format_report(report: BenchmarkReport) -> str:
+    data = report.to_dict()
+    lines = [
+        f"{report.entries} entries over {report.options.runs} runs in {report.elapsed:.2f}s "
+        f"({data['entries_per_second']:.0f} entries/s); {report.matched} matched, {report.triggered} triggered",
+        f"{'stage':<10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'total s':>10} {'errors':>7}",
+    ]
+    for stage, stats in data["stages"].items():
+        lines.append(
+            f"{stage:<10} {stats['p50'] * 1000:>10.2f} {stats['p95'] * 1000:>10.2f} {stats['p99'] * 1000:>10.2f} "
+            f"{stats['total']:>10.3f} {report.errors.get(stage, 0):>7}"
+        )
+    if any(report.injected.values()):
+        lines.append("Injected errors: " + ", ".join(f"{service}={count}" for service, count in report.injected.items()))
+    lines.append(f"Peak RSS: {report.peak_rss_mb:.1f} MB")
+    lines.append(f"Watches of this size one runner can poll sequentially every {report.options.poll_interval:.0f}s: {data['watches_per_poll_interval']}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> Tuple[BenchmarkOptions, bool]:
+    """The benchmark options and whether to print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = BenchmarkOptions()
+    for name, value in asdict(defaults).items():
+        flag = "--" + name.replace("_", "-")
+        if isinstance(value, bool):
+            parser.add_argument(flag, action="store_true")
+        else:
+            parser.add_argument(flag, type=type(value), default=value)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = vars(parser.parse_args(argv))
+    as_json = args.pop("json")
+    return BenchmarkOptions(**args), as_json
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    options, as_json = parse_args(argv)
+    report = run_benchmark(options)
+    print(json.dumps(report.to_dict(), indent=2) if as_json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
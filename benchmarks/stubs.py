@@ -0,0 +1,126 @@
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from benchmarks.openai_stub import OpenAIStub
+
+_NUMBERED_TITLE = re.compile(r"^\s*(\d+)\. (.*)$", re.MULTILINE)
+
+
+class Faults:
+    """Injected latency and error rate shared by the stand-in servers."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.injected = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            self.injected += failed
+            return failed
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class StubServer:
+    """Local HTTP server answering every request with ``respond(handler) -> (status, headers, body)``."""
+
+    def __init__(self, respond: Callable[[BaseHTTPRequestHandler], Tuple[int, Dict[str, str], bytes]], faults: Optional[Faults] = None):
+        self.faults = faults or Faults()
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this, Nagle's
+                # algorithm and delayed ACKs add ~40ms to every keep-alive request
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.body = self.rfile.read(length) if length else b""
+                stub.requests += 1
+                stub.faults.wait()
+                if stub.faults.fail():
+                    status, headers, payload = 500, {}, b"injected error"
+                else:
+                    status, headers, payload = respond(self)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def feed_stub(body: bytes, faults: Optional[Faults] = None) -> StubServer:
+    return StubServer(lambda handler: (200, {"Content-Type": "application/rss+xml; charset=utf-8"}, body), faults)
+
+
+def pushover_stub(faults: Optional[Faults] = None) -> StubServer:
+    def respond(handler):
+        return 200, {"Content-Type": "application/json"}, json.dumps({"status": 1, "request": "bench"}).encode()
+    return StubServer(respond, faults)
+
+
+def redirect_stub(faults: Optional[Faults] = None) -> StubServer:
+    """Redirects /r/... to /final on "localhost", so the redirect leaves the original host."""
+    def respond(handler):
+        if handler.path.startswith("/r/"):
+            return 302, {"Location": f"http://localhost:{handler.server.server_address[1]}/final"}, b""
+        return 200, {}, b""
+    return StubServer(respond, faults)
+
+
+def openai_stub(is_positive: Callable[[str], bool], faults: Optional[Faults] = None) -> OpenAIStub:
+    """OpenAI-compatible stub answering both single-title and batch prompts with is_positive."""
+    faults = faults or Faults()
+
+    def responder(body):
+        if faults.fail():
+            return 500, "injected error", {}
+        prompt = body["messages"][-1]["content"]
+        if "News Titles:" in prompt:
+            titles = _NUMBERED_TITLE.findall(prompt.split("News Titles:", 1)[1])
+            verdicts = [{"index": int(i), "happened": is_positive(title)} for i, title in titles]
+            return 200, json.dumps({"verdicts": verdicts}), {}
+        return 200, "True" if is_positive(prompt) else "False", {}
+
+    return OpenAIStub(responder, latency=faults.latency)
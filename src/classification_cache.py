@@ -0,0 +1,110 @@
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from src.normalize import normalize_title
+from src.prompts import CONTEXT_SEPARATOR
+
+
+class ClassificationCache:
+    """Memoizes classifier verdicts.
+
+    An in-process LRU tier sits in front of an optional SQLite tier. Both tiers
+    honor the same TTL and are bounded to ``max_entries``; the oldest entries
+    are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 24 * 3600, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS verdicts (
+                    cache_key TEXT PRIMARY KEY,
+                    verdict INTEGER NOT NULL,
+                    stored_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_stored_at ON verdicts (stored_at)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(title: str, triggering_event: str, model_name: str, prompt_version: str) -> str:
+        # Only the headline is normalized: normalizing the context too would let strip_source
+        # cut a short context at the separator, and key it like the bare headline
+        headline, _, context = title.partition(CONTEXT_SEPARATOR)
+        parts = [normalize_title(headline)] + ([context.strip()] if context.strip() else [])
+        raw = "\x1f".join(parts + [triggering_event.strip(), model_name, prompt_version])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return now - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[bool]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if not self._expired(entry[1], now):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            del self._memory[key]
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT verdict, stored_at FROM verdicts WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is not None and not self._expired(row[1], now):
+                self._remember(key, bool(row[0]), row[1])
+                self.hits += 1
+                return bool(row[0])
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, verdict: bool):
+        now = time.time()
+        self._remember(key, verdict, now)
+        if self._conn is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (cache_key, verdict, stored_at) VALUES (?, ?, ?)",
+                (key, int(verdict), now),
+            )
+            self._conn.execute(
+                """DELETE FROM verdicts WHERE stored_at < ? OR cache_key IN (
+                    SELECT cache_key FROM verdicts ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (now - self.ttl_seconds, self.max_entries),
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, verdict: bool, stored_at: float):
+        self._memory[key] = (verdict, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._memory),
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
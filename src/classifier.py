@@ -1,36 +1,34 @@
-from langchain_openai import ChatOpenAI
+"""LangChain pieces of the batch prompt, imported by the classifier engine when first needed."""
+from typing import List, Optional, Tuple
+
+from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import PromptTemplate
-from src.config import Config
-
-def classify_event(title: str, description: str, config: Config) -> bool:
-    llm = ChatOpenAI(model_name="gpt-4.1-mini", openai_api_key=config.openai_api_key, temperature=0)
-    
-    prompt_template = """You are a news analyst. You will be given a news event title. 
-    You need to determine if the following specific triggering event has happened: "{triggering_event}"
-    
-    GUIDELINES:
-    - Respond 'True' ONLY if the event described in "{triggering_event}" has actually occurred as a confirmed fact in the news report title.
-    - Respond 'False' for:
-        - Verbal threats, warnings, or predictions of the event.
-        - "Tensions rising" or "fears of" the event without it actually happening.
-        - Rumors or unsubstantiated claims.
-    
-    Respond with only 'True' if the event has happened, and 'False' otherwise.
-    
-    News Title: {title}
-    """
-    
+from pydantic import BaseModel, Field
+from src.prompts import BATCH_PROMPT_TEMPLATE
+
+
+class TitleVerdict(BaseModel):
+    index: int = Field(description="Index of the title in the numbered list")
+    happened: bool = Field(description="True if the triggering event has happened according to this title")
+
+
+class BatchVerdicts(BaseModel):
+    verdicts: List[TitleVerdict]
+
+
+def build_batch_prompt() -> Tuple[PromptTemplate, PydanticOutputParser]:
+    parser = PydanticOutputParser(pydantic_object=BatchVerdicts)
     prompt = PromptTemplate(
-        input_variables=["title", "triggering_event"],
-        template=prompt_template
+        template=BATCH_PROMPT_TEMPLATE,
+        input_variables=["titles", "triggering_event"],
+        partial_variables={"format_instructions": parser.get_format_instructions()}
     )
-    
-    chain = prompt | llm
-
-    response = chain.invoke({
-        "title": title,
-        "triggering_event": config.triggering_event
-    })
-    
-    result = response.content.strip().lower()
-    return result == "true"
+    return prompt, parser
+
+
+def verdicts_from_batch(result: BatchVerdicts, count: int) -> List[Optional[bool]]:
+    verdicts: List[Optional[bool]] = [None] * count
+    for verdict in result.verdicts:
+        if 0 <= verdict.index < count:
+            verdicts[verdict.index] = verdict.happened
+    return verdicts
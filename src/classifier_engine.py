@@ -0,0 +1,343 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import AsyncIterator, Dict, List, Mapping, Optional, Tuple
+
+from src.classification_cache import ClassificationCache
+from src.config import Config
+from src.metrics import metrics
+from src.prescreen import LabelStore, Prescreen, load_prescreen
+from src.prompts import (
+    MODEL_NAME,
+    MODEL_PRICES_PER_MTOK,
+    PROMPT_TEMPLATE,
+    PROMPT_VERSION,
+    number_titles,
+    pack_batches,
+    title_of,
+    with_context,
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset durations ("20ms", "1s", "6m0s") or plain seconds into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_delay_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Server-suggested wait before the next request, if the response says so."""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    delay = parse_duration(headers.get("retry-after"))
+    if delay is not None:
+        return delay
+    resets = [parse_duration(headers.get(name)) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+class ClassifierEngine:
+    """Long-lived async classifier.
+
+    Builds the OpenAI client and prompt chains once and reuses them (and the
+    client's HTTP connection pool) for every call. Requests run concurrently up
+    to ``classification_max_concurrency``; 429 and 5xx responses are retried with jittered
+    exponential backoff, and rate-limit headers pause all workers until the
+    window resets.
+
+    With ``prescreen_enabled`` and a trained prescreen for the triggering event,
+    titles the local model is confident about are decided without the LLM.
+    LLM verdicts are recorded in ``labels`` to train it.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        cache: Optional[ClassificationCache] = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        labels: Optional[LabelStore] = None,
+        model_name: str = MODEL_NAME,
+    ):
+        self.config = config
+        self.model_name = model_name
+        self.cache = cache
+        self.labels = labels
+        self.local_decisions = 0
+        self._prescreens: Dict[str, Optional[Prescreen]] = {}
+        self.max_concurrency = config.classification_max_concurrency
+        self.max_retries = config.classification_max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        # The OpenAI client and langchain are only loaded once a title actually needs the LLM
+        self._llm = None
+        self._single_chain = None
+        self._batch_chain = None
+        self._batch_parser = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._paused_until = 0.0
+
+    def _build_chains(self):
+        if self._llm is not None:
+            return
+        import openai
+        from langchain_core.prompts import PromptTemplate
+        from langchain_openai import ChatOpenAI
+
+        from src.classifier import build_batch_prompt
+
+        self._llm = ChatOpenAI(
+            model_name=self.model_name,
+            openai_api_key=self.config.openai_api_key,
+            openai_api_base=self.config.openai_api_base,
+            temperature=0,
+            max_retries=0,
+            include_response_headers=True,
+            # langchain otherwise shares one cached client per base URL, which aclose() would close for every engine
+            http_async_client=openai.DefaultAsyncHttpxClient(),
+        )
+        self._single_chain = PromptTemplate(
+            input_variables=["title", "triggering_event"],
+            template=PROMPT_TEMPLATE
+        ) | self._llm
+        batch_prompt, self._batch_parser = build_batch_prompt()
+        self._batch_chain = batch_prompt | self._llm
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _wait_for_window(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _observe_headers(self, headers: Mapping[str, str]):
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None and remaining.strip() == "0":
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                logging.info(f"OpenAI request quota exhausted, pausing {reset:.2f}s")
+                self._pause(reset)
+
+    async def _invoke(self, chain, inputs: dict):
+        import openai
+
+        for attempt in range(self.max_retries + 1):
+            # Hold a concurrency slot only for the request itself, not for the backoff
+            async with self._get_semaphore():
+                await self._wait_for_window()
+                metrics.inc("llm_calls")
+                try:
+                    with metrics.span("llm_call"):
+                        response = await chain.ainvoke(inputs)
+                except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    headers = e.response.headers if getattr(e, "response", None) is not None else {}
+                    suggested = retry_delay_from_headers(headers)
+                    delay = suggested + random.uniform(0, self.backoff_base) if suggested is not None else self._backoff(attempt)
+                    if isinstance(e, openai.RateLimitError):
+                        self._pause(delay)
+                    self.retries += 1
+                    metrics.inc("llm_retries")
+                    logging.warning(f"OpenAI request failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+                else:
+                    self._observe_headers(response.response_metadata.get("headers", {}))
+                    self._record_usage(response)
+                    return response
+            await asyncio.sleep(delay)
+
+    def _record_usage(self, response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        metrics.inc("llm_input_tokens", input_tokens)
+        metrics.inc("llm_output_tokens", output_tokens)
+        # Models without a known price report tokens but no cost
+        input_price, output_price = MODEL_PRICES_PER_MTOK.get(self.model_name, (0.0, 0.0))
+        metrics.inc("llm_cost_usd", (input_tokens * input_price + output_tokens * output_price) / 1e6)
+
+    def _cached(self, title: str, triggering_event: str) -> Optional[bool]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._cache_key(title, triggering_event))
+        metrics.inc("cache_hits" if cached is not None else "cache_misses")
+        return cached
+
+    def _cache_key(self, title: str, triggering_event: str) -> str:
+        return ClassificationCache.make_key(title, triggering_event, self.model_name, PROMPT_VERSION)
+
+    def _remember(self, title: str, triggering_event: str, verdict: bool):
+        if self.cache is not None:
+            self.cache.put(self._cache_key(title, triggering_event), verdict)
+        if self.labels is not None:
+            # The prescreen sees bare titles, so it is trained on them
+            self.labels.add(title_of(title), triggering_event, verdict)
+
+    def _prescreen(self, triggering_event: str) -> Optional[Prescreen]:
+        if not self.config.prescreen_enabled:
+            return None
+        if triggering_event not in self._prescreens:
+            self._prescreens[triggering_event] = load_prescreen(self.config.state_dir, triggering_event)
+        return self._prescreens[triggering_event]
+
+    async def _classify_uncached(self, title: str, triggering_event: str) -> bool:
+        self._build_chains()
+        response = await self._invoke(self._single_chain, {"title": title, "triggering_event": triggering_event})
+        verdict = response.content.strip().lower() == "true"
+        self._remember(title, triggering_event, verdict)
+        return verdict
+
+    async def classify(self, title: str, triggering_event: Optional[str] = None) -> bool:
+        triggering_event = triggering_event or self.config.triggering_event
+        cached = self._cached(title, triggering_event)
+        if cached is not None:
+            return cached
+        prescreen = self._prescreen(triggering_event)
+        if prescreen is not None:
+            local = prescreen.decide_many([title])[0]
+            if local is not None:
+                self.local_decisions += 1
+                metrics.inc("prescreen_decisions")
+                return local
+        return await self._classify_uncached(title, triggering_event)
+
+    async def _classify_single_safe(self, title: str, triggering_event: str) -> Optional[bool]:
+        try:
+            return await self._classify_uncached(title, triggering_event)
+        except Exception as e:
+            logging.error(f"Error classifying '{title}': {e}")
+            return None
+
+    async def _classify_batch(self, titles: List[str], triggering_event: str) -> List[Optional[bool]]:
+        from src.classifier import verdicts_from_batch
+
+        self._build_chains()
+        try:
+            response = await self._invoke(
+                self._batch_chain,
+                {"titles": number_titles(titles), "triggering_event": triggering_event}
+            )
+            verdicts = verdicts_from_batch(self._batch_parser.parse(response.content), len(titles))
+        except Exception as e:
+            logging.warning(f"Batch classification of {len(titles)} titles failed, falling back to single calls: {e}")
+            verdicts = [None] * len(titles)
+
+        for title, verdict in zip(titles, verdicts):
+            if verdict is not None:
+                self._remember(title, triggering_event, verdict)
+        missing = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        fallbacks = await asyncio.gather(*(self._classify_single_safe(titles[i], triggering_event) for i in missing))
+        for i, verdict in zip(missing, fallbacks):
+            verdicts[i] = verdict
+        return verdicts
+
+    async def classify_iter(
+        self,
+        titles: List[str],
+        triggering_event: Optional[str] = None,
+        contexts: Optional[List[str]] = None,
+    ) -> AsyncIterator[Tuple[int, Optional[bool]]]:
+        """Classify titles concurrently, yielding (index, verdict) as soon as each verdict is known.
+
+        Cached and prescreened titles come first, then each LLM batch as it
+        completes, so callers can act on early verdicts while later batches
+        are still in flight. A verdict is None if the title could not be classified.
+
+        ``contexts`` (one per title, "" for none) is sent to the LLM alongside
+        each title and is part of its cache key; the prescreen only sees titles.
+        """
+        triggering_event = triggering_event or self.config.triggering_event
+        metrics.inc("titles_classified", len(titles))
+        texts = titles if contexts is None else [with_context(title, context) for title, context in zip(titles, contexts)]
+        pending = []
+        for i, text in enumerate(texts):
+            cached = self._cached(text, triggering_event)
+            if cached is not None:
+                yield i, cached
+                continue
+            pending.append(i)
+
+        prescreen = self._prescreen(triggering_event)
+        if prescreen is not None and pending:
+            local = prescreen.decide_many([titles[i] for i in pending])
+            decided = sum(verdict is not None for verdict in local)
+            self.local_decisions += decided
+            metrics.inc("prescreen_decisions", decided)
+            logging.info(f"Prescreen decided {decided} of {len(pending)} titles locally")
+            for i, verdict in zip(pending, local):
+                if verdict is not None:
+                    yield i, verdict
+            pending = [i for i, verdict in zip(pending, local) if verdict is None]
+
+        pending_titles = [texts[i] for i in pending]
+        batches = pack_batches(
+            pending_titles,
+            self.config.classification_batch_size,
+            self.config.classification_batch_max_tokens,
+        )
+
+        async def run(batch: List[int]):
+            batch_titles = [pending_titles[j] for j in batch]
+            if len(batch) == 1:
+                return batch, [await self._classify_single_safe(batch_titles[0], triggering_event)]
+            return batch, await self._classify_batch(batch_titles, triggering_event)
+
+        tasks = [asyncio.ensure_future(run(batch)) for batch in batches]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                batch, verdicts = await completed
+                for j, verdict in zip(batch, verdicts):
+                    yield pending[j], verdict
+        finally:
+            # The caller stopped early; don't leave requests running unobserved
+            for task in tasks:
+                task.cancel()
+
+    async def classify_many(
+        self,
+        titles: List[str],
+        triggering_event: Optional[str] = None,
+        contexts: Optional[List[str]] = None,
+    ) -> List[Optional[bool]]:
+        """Classify titles concurrently, in batches where possible.
+
+        Returns:
+            One verdict per title, in order. None if the title could not be classified.
+        """
+        results: List[Optional[bool]] = [None] * len(titles)
+        async for i, verdict in self.classify_iter(titles, triggering_event, contexts):
+            results[i] = verdict
+        return results
+
+    async def aclose(self):
+        if self._llm is not None:
+            await self._llm.root_async_client.close()
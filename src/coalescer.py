@@ -0,0 +1,156 @@
+"""Coalesces bursts of alerts: the first is sent at once, the rest as one digest per window."""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from src.notifier import MAX_MESSAGE_LENGTH, prepare_message_and_url
+
+
+@dataclass
+class Alert:
+    title: str
+    message: str
+    url: str
+    queued_at: float = 0.0
+    # Row id while queued, to acknowledge the alert once its digest is delivered
+    id: int = 0
+
+
+class AlertCoalescer:
+    """Decides which alerts go out now and holds the rest for a digest.
+
+    An alert is sent immediately if nothing was sent in the last
+    ``window_seconds``; alerts triggered inside the window are queued and go
+    out together once it has passed, so a burst costs at most one message per
+    recipient per window after the first. The queue and the time of the last
+    send are kept in SQLite, so a burst spanning several runs still coalesces.
+    """
+
+    def __init__(self, path: str, window_seconds: float):
+        self.window_seconds = window_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pending (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                message TEXT NOT NULL,
+                url TEXT NOT NULL,
+                queued_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sends (id INTEGER PRIMARY KEY CHECK (id = 0), last_sent_at REAL NOT NULL)")
+        self._conn.commit()
+
+    def _last_sent_at(self) -> float:
+        row = self._conn.execute("SELECT last_sent_at FROM sends WHERE id = 0").fetchone()
+        return row[0] if row else 0.0
+
+    def _mark_sent(self, now: float):
+        self._conn.execute("INSERT OR REPLACE INTO sends (id, last_sent_at) VALUES (0, ?)", (now,))
+
+    def _pending_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending_count()
+
+    def submit(self, alert: Alert, now: Optional[float] = None) -> bool:
+        """Record a triggered alert.
+
+        Returns:
+            True if the caller should send it now, and call requeue() if that
+            fails; False if it was queued for the digest.
+        """
+        now = now or time.time()
+        alert.queued_at = now
+        with self._lock:
+            if now - self._last_sent_at() >= self.window_seconds and self._pending_count() == 0:
+                self._mark_sent(now)
+                self._conn.commit()
+                return True
+            self._conn.execute(
+                "INSERT INTO pending (title, message, url, queued_at) VALUES (?, ?, ?, ?)",
+                (alert.title, alert.message, alert.url, now),
+            )
+            self._conn.commit()
+            return False
+
+    def requeue(self, alert: Alert):
+        """Queue an alert whose immediate send failed, and reopen the window it opened.
+
+        The next flush then sends it, with anything queued meanwhile, as a digest.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pending (title, message, url, queued_at) VALUES (?, ?, ?, ?)",
+                (alert.title, alert.message, alert.url, alert.queued_at),
+            )
+            # Unless another send has started a newer window since
+            self._conn.execute("DELETE FROM sends WHERE id = 0 AND last_sent_at = ?", (alert.queued_at,))
+            self._conn.commit()
+
+    def due(self, now: Optional[float] = None, force: bool = False) -> List[Alert]:
+        """The queued alerts once their window has passed (or right away with force).
+
+        They stay queued until ack() is called after their digest is delivered,
+        so a failed send is retried on the next check.
+        """
+        now = now or time.time()
+        with self._lock:
+            if not force and now - self._last_sent_at() < self.window_seconds:
+                return []
+            rows = self._conn.execute("SELECT id, title, message, url, queued_at FROM pending ORDER BY queued_at, id").fetchall()
+        return [Alert(title, message, url, queued_at, id) for id, title, message, url, queued_at in rows]
+
+    def ack(self, alerts: List[Alert], now: Optional[float] = None):
+        """Drop delivered alerts from the queue and start a new window."""
+        now = now or time.time()
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE id = ?", [(alert.id,) for alert in alerts])
+            self._mark_sent(now)
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def _fit_lines(lines: List[str], total: int, limit: int) -> str:
+    """Join as many lines as fit in limit characters, summarizing the rest of total as "…and N more"."""
+    for shown in range(len(lines), 0, -1):
+        more = total - shown
+        text = "\n".join(lines[:shown] + ([f"…and {more} more"] if more else []))
+        if len(text) <= limit:
+            return text
+    # Not even one line fits: cut the first one down
+    return lines[0][:limit - 3] + "..." if lines and limit > 3 else ""
+
+
+def build_digest(alerts: List[Alert], max_items: int = 10) -> Tuple[str, str, str]:
+    """Title, message and URL of a digest, already within the Pushover length limits.
+
+    Lists up to max_items alert messages, oldest first; the URL is the first
+    alert's link. A link that has to be embedded in the message is appended
+    after the list, and the returned URL is then empty.
+    """
+    titles = {alert.title for alert in alerts}
+    title = f"{alerts[0].title} ({len(alerts)} more)" if len(titles) == 1 else f"News Alerts ({len(alerts)} more)"
+    lines = [f"• {alert.message}" for alert in alerts[:max_items]]
+    message = _fit_lines(lines, len(alerts), MAX_MESSAGE_LENGTH)
+
+    prepared_message, prepared_url = prepare_message_and_url(message, alerts[0].url)
+    if prepared_url is not None:
+        return title, message, prepared_url
+    if prepared_message == message:
+        # The link cannot be sent in any form
+        return title, message, ""
+    embedded = prepared_message
+    listed = _fit_lines(lines, len(alerts), MAX_MESSAGE_LENGTH - len(embedded) - 1)
+    return title, f"{listed}\n{embedded}" if listed else embedded, ""
@@ -1,12 +1,26 @@
 import json
 import logging
 import os
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import List, Optional
 from dotenv import load_dotenv
 
+from src.metrics import PROFILERS
+from src.prefilter import Prefilter
+
 load_dotenv()
 
+@dataclass
+class Watch:
+    name: str
+    rss_feed_url: str
+    keyword_filter: str
+    triggering_event: str
+    lookback_minutes: int = 60
+    min_poll_seconds: float = 60
+    max_poll_seconds: float = 900
+    prefilter: Optional[Prefilter] = None
+
 @dataclass
 class Config:
     rss_feed_url: str
@@ -16,6 +30,73 @@ class Config:
     pushover_user_keys: List[str]
     pushover_api_token: str
     openai_api_key: str
+    state_dir: str = ".state"
+    seen_retention_hours: int = 48
+    classification_cache_ttl_hours: float = 24
+    classification_cache_max_entries: int = 1000
+    classification_batch_size: int = 20
+    classification_batch_max_tokens: int = 2000
+    classification_max_concurrency: int = 4
+    classification_max_retries: int = 5
+    openai_api_base: Optional[str] = None
+    redirect_cache_ttl_hours: float = 168
+    pushover_collapse_recipients: bool = False
+    streaming_parse: bool = False
+    feed_date_ordered: bool = False
+    prefilter: Optional[Prefilter] = None
+    story_clustering: bool = False
+    story_similarity_threshold: float = 0.5
+    prescreen_enabled: bool = True
+    metrics_textfile: Optional[str] = None
+    metrics_interval_seconds: float = 60
+    profile: Optional[str] = None
+    archive_feeds: bool = False
+    websub_callback_url: Optional[str] = None
+    websub_listen_host: str = "0.0.0.0"
+    websub_listen_port: int = 8080
+    websub_lease_seconds: int = 86400
+    enrichment: str = "none"
+    enrichment_max_chars: int = 400
+    enrichment_budget_seconds: float = 3.0
+    enrichment_workers: int = 8
+    notify_coalesce_seconds: float = 0
+    notify_digest_max_items: int = 10
+    watches: List[Watch] = field(default_factory=list)
+
+    def default_watch(self) -> Watch:
+        """The single watch described by the top-level feed settings."""
+        return Watch(
+            name="",
+            rss_feed_url=self.rss_feed_url,
+            keyword_filter=self.keyword_filter,
+            triggering_event=self.triggering_event,
+            lookback_minutes=self.lookback_minutes,
+            prefilter=self.prefilter,
+        )
+
+    def get_watches(self) -> List[Watch]:
+        return self.watches or [self.default_watch()]
+
+def _feed_url(rss_url: str, keyword: str) -> str:
+    if "{keyword}" in rss_url:
+        rss_url = rss_url.format(keyword=keyword)
+    return rss_url
+
+def _load_watch(watch_data: dict, defaults: dict) -> Watch:
+    keyword = watch_data["keyword_filter"]
+    return Watch(
+        name=watch_data.get("name", keyword),
+        rss_feed_url=_feed_url(watch_data.get("rss_feed_url", defaults["rss_feed_url"]), keyword),
+        keyword_filter=keyword,
+        triggering_event=watch_data["triggering_event"],
+        lookback_minutes=watch_data.get("lookback_minutes", defaults.get("lookback_minutes", 60)),
+        min_poll_seconds=watch_data.get("min_poll_seconds", defaults.get("min_poll_seconds", 60)),
+        max_poll_seconds=watch_data.get("max_poll_seconds", defaults.get("max_poll_seconds", 900)),
+        prefilter=_load_prefilter(watch_data),
+    )
+
+def _load_prefilter(data: dict) -> Optional[Prefilter]:
+    return Prefilter.from_dict(data["prefilter"]) if data.get("prefilter") else None
 
 def load_config(config_path: str = "config.json") -> Config:
     with open(config_path, "r") as f:
@@ -38,16 +119,63 @@ def load_config(config_path: str = "config.json") -> Config:
     logging.info(f"Loaded Pushover user keys: {[k[:4] + '****' + k[-4:] for k in pushover_user_keys]}")
 
     keyword = config_data["keyword_filter"]
-    rss_url = config_data["rss_feed_url"]
-    if "{keyword}" in rss_url:
-        rss_url = rss_url.format(keyword=keyword)
+    rss_url = _feed_url(config_data["rss_feed_url"], keyword)
+    watches = [_load_watch(watch_data, config_data) for watch_data in config_data.get("watches", [])]
+    names = [watch.name for watch in watches]
+    if len(set(names)) != len(names):
+        raise ValueError("Watch names must be unique")
+
+    enrichment = config_data.get("enrichment", "none")
+    if enrichment not in ("none", "description", "article"):
+        raise ValueError(f"enrichment must be 'none', 'description' or 'article', not {enrichment!r}")
+
+    profile = os.getenv("PROFILE") or config_data.get("profile")
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f"profile must be one of {', '.join(PROFILERS)}, not {profile!r}")
+
+    lookback_minutes = config_data.get("lookback_minutes", 60)
+    seen_retention_hours = config_data.get("seen_retention_hours", 48)
+    if seen_retention_hours * 60 < lookback_minutes:
+        logging.warning("seen_retention_hours is shorter than lookback_minutes; old entries may be re-classified")
 
     return Config(
         rss_feed_url=rss_url,
         keyword_filter=keyword,
         triggering_event=config_data["triggering_event"],
-        lookback_minutes=config_data.get("lookback_minutes", 60),
+        lookback_minutes=lookback_minutes,
         pushover_user_keys=pushover_user_keys,
         pushover_api_token=pushover_api_token,
         openai_api_key=openai_api_key,
+        state_dir=config_data.get("state_dir", ".state"),
+        seen_retention_hours=seen_retention_hours,
+        classification_cache_ttl_hours=config_data.get("classification_cache_ttl_hours", 24),
+        classification_cache_max_entries=config_data.get("classification_cache_max_entries", 1000),
+        classification_batch_size=config_data.get("classification_batch_size", 20),
+        classification_batch_max_tokens=config_data.get("classification_batch_max_tokens", 2000),
+        classification_max_concurrency=config_data.get("classification_max_concurrency", 4),
+        classification_max_retries=config_data.get("classification_max_retries", 5),
+        openai_api_base=os.getenv("OPENAI_API_BASE") or None,
+        redirect_cache_ttl_hours=config_data.get("redirect_cache_ttl_hours", 168),
+        pushover_collapse_recipients=config_data.get("pushover_collapse_recipients", False),
+        streaming_parse=config_data.get("streaming_parse", False),
+        feed_date_ordered=config_data.get("feed_date_ordered", False),
+        prefilter=_load_prefilter(config_data),
+        story_clustering=config_data.get("story_clustering", False),
+        story_similarity_threshold=config_data.get("story_similarity_threshold", 0.5),
+        prescreen_enabled=config_data.get("prescreen_enabled", True),
+        metrics_textfile=config_data.get("metrics_textfile"),
+        metrics_interval_seconds=config_data.get("metrics_interval_seconds", 60),
+        profile=profile,
+        archive_feeds=config_data.get("archive_feeds", False),
+        websub_callback_url=config_data.get("websub_callback_url"),
+        websub_listen_host=config_data.get("websub_listen_host", "0.0.0.0"),
+        websub_listen_port=config_data.get("websub_listen_port", 8080),
+        websub_lease_seconds=config_data.get("websub_lease_seconds", 86400),
+        enrichment=enrichment,
+        enrichment_max_chars=config_data.get("enrichment_max_chars", 400),
+        enrichment_budget_seconds=config_data.get("enrichment_budget_seconds", 3.0),
+        enrichment_workers=config_data.get("enrichment_workers", 8),
+        notify_coalesce_seconds=config_data.get("notify_coalesce_seconds", 0),
+        notify_digest_max_items=config_data.get("notify_digest_max_items", 10),
+        watches=watches,
     )
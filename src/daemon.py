@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import os
+import random
+import signal
+import time
+from collections import defaultdict
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from src.classifier_engine import ClassifierEngine
+from src.config import Config, Watch, load_config
+from src.metrics import metrics, profiling
+from src.processing import Stores, flush_alerts, process_events, write_metrics
+from src.rss import NewsEvent, fetch_rss_events, parse_rss_events, prefilter_rules, prefilter_text
+from src.websub import WebSubReceiver, discover_feed_hub
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Entries can show up in a feed with a publish time slightly before ones already
+# handled; re-read this far behind the high-water mark (the seen store dedupes)
+HIGH_WATER_GRACE_SECONDS = 300
+COMPACT_INTERVAL_SECONDS = 3600
+# How often WebSub leases are checked for renewal and feeds without a subscription retried
+WEBSUB_MAINTENANCE_SECONDS = 600
+# Longest a due digest waits to be sent
+DIGEST_CHECK_SECONDS = 10
+
+
+class PollSchedule:
+    """Adapts a feed's poll interval to how often it publishes.
+
+    Keeps an exponentially smoothed estimate of new entries per second and
+    aims for about one new entry per poll, bounded by min/max and jittered so
+    feeds don't poll in lockstep.
+    """
+
+    def __init__(self, min_seconds: float, max_seconds: float, smoothing: float = 0.3, jitter: float = 0.1):
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.smoothing = smoothing
+        self.jitter = jitter
+        self.rate = 0.0
+        self.interval = min_seconds
+
+    def observe(self, new_entries: int, elapsed_seconds: Optional[float]) -> float:
+        """Record a poll's result and return the updated base interval.
+
+        elapsed_seconds is None for a feed's first poll: its entries span the
+        whole lookback window, not the time since a previous poll, so they say
+        nothing about the arrival rate.
+        """
+        if elapsed_seconds is None:
+            return self.interval
+        if elapsed_seconds > 0:
+            observed = new_entries / elapsed_seconds
+            self.rate = self.smoothing * observed + (1 - self.smoothing) * self.rate
+        ideal = 1 / self.rate if self.rate > 0 else self.max_seconds
+        self.interval = min(self.max_seconds, max(self.min_seconds, ideal))
+        return self.interval
+
+    def next_delay(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class Daemon:
+    """Polls every configured watch from one process.
+
+    Watches sharing a feed URL are served by a single poller, so each feed is
+    fetched once per cycle no matter how many watches read it.
+
+    With ``websub_callback_url`` set, feeds that advertise a WebSub hub are
+    subscribed to and their pushed entries are handled as they arrive; such
+    feeds are then only polled every ``max_poll_seconds`` as a safety net.
+    """
+
+    def __init__(self, config: Config, stores: Optional[Stores] = None):
+        self.config = config
+        self.stores = stores or Stores(config)
+        self.engine = ClassifierEngine(
+            config,
+            cache=self.stores.cache if self.stores.shares_triggering_events() else None,
+            labels=self.stores.labels,
+        )
+        self.feeds: Dict[str, List[Watch]] = defaultdict(list)
+        for watch in config.get_watches():
+            self.feeds[watch.rss_feed_url].append(watch)
+        self.schedules = {
+            url: PollSchedule(min(w.min_poll_seconds for w in watches), max(w.max_poll_seconds for w in watches))
+            for url, watches in self.feeds.items()
+        }
+        # A push can land while the same feed is being polled or another push is handled;
+        # one at a time per feed, so the second sees the first's entries as seen
+        self._feed_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._stop = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.websub: Optional[WebSubReceiver] = None
+        # Feeds found without a hub are not re-fetched for discovery
+        self._without_hub = set()
+        if config.websub_callback_url:
+            self.websub = WebSubReceiver(
+                config.websub_callback_url,
+                os.path.join(config.state_dir, "websub.sqlite3"),
+                self._on_push,
+                host=config.websub_listen_host,
+                port=config.websub_listen_port,
+                lease_seconds=config.websub_lease_seconds,
+            )
+
+    def stop(self):
+        self._stop.set()
+
+    def _since(self, feed_url: str, watches: List[Watch]) -> datetime:
+        now = datetime.now(timezone.utc)
+        lookback = now - timedelta(minutes=max(w.lookback_minutes for w in watches))
+        high_water_mark = self.stores.feed_state.get(feed_url).high_water_mark
+        if high_water_mark is None:
+            return lookback
+        return max(lookback, datetime.fromtimestamp(high_water_mark - HIGH_WATER_GRACE_SECONDS, timezone.utc))
+
+    @staticmethod
+    def _filter(events: List[NewsEvent], watch: Watch) -> List[NewsEvent]:
+        matched = []
+        for event in events:
+            rules = prefilter_rules(prefilter_text(event.title, event.description), watch.keyword_filter, watch.prefilter)
+            if rules is not None:
+                matched.append(replace(event, matched_rules=rules))
+        return matched
+
+    async def poll_feed(self, feed_url: str) -> int:
+        """Fetch a feed once and run its watches. Returns the number of entries past the high-water mark."""
+        watches = self.feeds[feed_url]
+        started_at = time.perf_counter()
+        previous_mark = self.stores.feed_state.get(feed_url).high_water_mark or 0
+        events = await asyncio.to_thread(
+            fetch_rss_events,
+            feed_url,
+            0,
+            None,
+            self.stores.feed_state,
+            self._since(feed_url, watches),
+            self.config.streaming_parse,
+            self.config.feed_date_ordered,
+            archive=self.stores.archive,
+        )
+        if events is None:
+            return 0
+
+        if await self._dispatch(feed_url, events, started_at):
+            self.stores.feed_state.commit(feed_url)
+        return sum(1 for e in events if e.published.timestamp() > previous_mark)
+
+    async def _dispatch(self, feed_url: str, events: List[NewsEvent], started_at: float) -> bool:
+        """Run a feed's entries through each of its watches. True if every entry got a verdict."""
+        async with self._feed_locks[feed_url]:
+            results = await asyncio.gather(*(
+                process_events(self._filter(events, w), w, self.config, self.stores, self.engine, started_at)
+                for w in self.feeds[feed_url]
+            ))
+            if events:
+                self.stores.feed_state.advance_high_water_mark(feed_url, max(e.published.timestamp() for e in events))
+        return all(results)
+
+    def _on_push(self, feed_url: str, body: bytes, content_type: str):
+        # Called from the WebSub server's threads; the pipeline runs on the event loop
+        if self._loop is None or feed_url not in self.feeds:
+            return
+        asyncio.run_coroutine_threadsafe(self.handle_push(feed_url, body, content_type), self._loop)
+
+    async def handle_push(self, feed_url: str, body: bytes, content_type: str):
+        """Handle the entries a hub pushed for a feed."""
+        started_at = time.perf_counter()
+        with metrics.span("push"):
+            try:
+                events = await asyncio.to_thread(
+                    parse_rss_events,
+                    body,
+                    content_type,
+                    self._since(feed_url, self.feeds[feed_url]),
+                    None,
+                    self.config.streaming_parse,
+                )
+                logging.info(f"WebSub push for {feed_url}: {len(events)} entries")
+                await self._dispatch(feed_url, events, started_at)
+            except Exception as e:
+                logging.error(f"Failed to handle push for {feed_url}: {e}")
+
+    async def _subscribe(self, feed_url: str):
+        try:
+            advertised = await asyncio.to_thread(discover_feed_hub, feed_url, self.websub.session)
+        except Exception as e:
+            logging.warning(f"WebSub discovery for {feed_url} failed: {e}")
+            return
+        if advertised is None:
+            logging.info(f"{feed_url} has no WebSub hub, polling it")
+            self._without_hub.add(feed_url)
+            return
+        hub, topic = advertised
+        await asyncio.to_thread(self.websub.subscribe, feed_url, hub, topic)
+
+    async def _maintain_subscriptions(self):
+        """Subscribe to every feed's hub, then renew leases before they run out."""
+        while not self._stop.is_set():
+            renewals = {s.feed_url for s in self.websub.due_for_renewal()}
+            for feed_url in self.feeds:
+                if feed_url in self._without_hub:
+                    continue
+                if feed_url in renewals or not self.websub.is_subscribed(feed_url):
+                    await self._subscribe(feed_url)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=WEBSUB_MAINTENANCE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _next_delay(self, feed_url: str) -> float:
+        schedule = self.schedules[feed_url]
+        if self.websub is not None and self.websub.is_subscribed(feed_url):
+            return schedule.max_seconds
+        return schedule.next_delay()
+
+    async def _run_feed(self, feed_url: str, max_polls: Optional[int]):
+        schedule = self.schedules[feed_url]
+        polls = 0
+        last_poll: Optional[float] = None
+        while not self._stop.is_set():
+            new_entries = 0
+            try:
+                with metrics.span("poll"):
+                    new_entries = await self.poll_feed(feed_url)
+            except Exception as e:
+                logging.error(f"Failed to poll {feed_url}: {e}")
+            now = time.monotonic()
+            interval = schedule.observe(new_entries, now - last_poll if last_poll is not None else None)
+            last_poll = now
+            logging.info(f"Polled {feed_url}: {new_entries} new entries, next poll in ~{interval:.0f}s")
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                return
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self._next_delay(feed_url))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _compact_periodically(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=COMPACT_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                self.stores.compact()
+
+    async def _write_metrics_periodically(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.config.metrics_interval_seconds)
+            except asyncio.TimeoutError:
+                write_metrics(self.config)
+
+    async def _flush_alerts_periodically(self):
+        interval = min(self.config.notify_coalesce_seconds, DIGEST_CHECK_SECONDS)
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                await flush_alerts(self.config, self.stores)
+
+    async def run(self, max_polls: Optional[int] = None):
+        """Poll all feeds until stop() is called, or each feed max_polls times."""
+        logging.info(f"Daemon watching {len(self.feeds)} feeds for {sum(len(w) for w in self.feeds.values())} watches")
+        self._loop = asyncio.get_running_loop()
+        background = [
+            asyncio.create_task(self._compact_periodically()),
+            asyncio.create_task(self._write_metrics_periodically()),
+        ]
+        if self.stores.alerts is not None:
+            background.append(asyncio.create_task(self._flush_alerts_periodically()))
+        if self.websub is not None:
+            self.websub.start()
+            background.append(asyncio.create_task(self._maintain_subscriptions()))
+        try:
+            await asyncio.gather(*(self._run_feed(url, max_polls) for url in self.feeds))
+        finally:
+            for task in background:
+                task.cancel()
+            if self.websub is not None:
+                self.websub.close()
+            write_metrics(self.config)
+            await self.engine.aclose()
+            self.stores.close()
+
+
+async def _serve(config: Config):
+    daemon = Daemon(config)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, daemon.stop)
+    await daemon.run()
+
+
+def main():
+    try:
+        config = load_config()
+        logging.info("Configuration loaded successfully.")
+    except Exception as e:
+        logging.error(f"Failed to load configuration: {e}")
+        return
+
+    with profiling(config.profile, os.path.join(config.state_dir, "profiles")):
+        asyncio.run(_serve(config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Article context for the classifier: feed descriptions and article bodies, fetched in parallel."""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.follow_redirects import resolve_offline
+from src.google_news import GOOGLE_NEWS_HOST
+from src.html_text import article_text, truncate
+from src.metrics import metrics
+from src.normalize import normalize_title
+from src.rss import NewsEvent
+
+ENRICHMENT_MODES = ("none", "description", "article")
+ARTICLE_TIMEOUT = (3.05, 5)
+# Only the start of a page is read; article text is normally well inside it
+MAX_ARTICLE_BYTES = 512 * 1024
+READ_CHUNK_BYTES = 16 * 1024
+# Links on these hosts lead to a page that only a browser gets past
+BROWSER_ONLY_HOSTS = frozenset({GOOGLE_NEWS_HOST})
+# Context adding fewer new words than this to the title is not worth sending
+MIN_CONTEXT_WORDS = 5
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class ArticleCache:
+    """On-disk map of article URL -> extracted text, with expiry.
+
+    Pages that had no usable text are cached as an empty string so they are
+    not fetched again on every poll. Fetches that finish in the background
+    after close() are dropped.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text, fetched_at FROM articles WHERE url = ?", (url,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def put(self, url: str, text: str):
+        with self._lock:
+            if self._closed:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (url, text, fetched_at) VALUES (?, ?, ?)",
+                (url, text, time.time()),
+            )
+            self._conn.commit()
+
+    def compact(self) -> int:
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM articles WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+
+def _get_session(pool_size: int) -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update({"Accept-Encoding": "gzip, deflate", "User-Agent": "news-event-trigger"})
+            _session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+            _session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+    return _session
+
+
+def fetch_article_text(url: str, max_chars: int, session: Optional[requests.Session] = None) -> str:
+    """Download the start of an article page and extract its text.
+
+    At most MAX_ARTICLE_BYTES are read, and reading stops early once max_chars
+    of article text is extracted. Non-HTML responses give an empty string.
+
+    Raises:
+        requests.RequestException: If the page cannot be fetched.
+    """
+    session = session or _get_session(8)
+    with session.get(url, timeout=ARTICLE_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "")
+        if "html" not in content_type:
+            return ""
+        encoding = response.encoding if "charset" in content_type.lower() else "utf-8"
+        received = 0
+
+        def chunks():
+            nonlocal received
+            for chunk in response.iter_content(READ_CHUNK_BYTES):
+                received += len(chunk)
+                yield chunk
+                if received >= MAX_ARTICLE_BYTES:
+                    return
+
+        text = article_text(chunks(), encoding or "utf-8", max_chars)
+    metrics.inc("article_bytes", received)
+    return text
+
+
+def article_url(link: str) -> Optional[str]:
+    """The page to fetch for a feed link, or None if there is none worth fetching.
+
+    Fetching a Google News link over plain HTTP returns its interstitial, not
+    the article, so such links are only followed where the redirect cache or
+    offline decoding already knows the publisher URL.
+    """
+    if not link:
+        return None
+    if urlparse(link).netloc not in BROWSER_ONLY_HOSTS:
+        return link
+    return resolve_offline(link)
+
+
+def useful_context(title: str, context: str) -> str:
+    """The context, or "" if it mostly repeats the title.
+
+    Google News descriptions, for instance, are just the headline and outlet.
+    """
+    new_words = set(normalize_title(context).split()) - set(normalize_title(title).split())
+    return context if len(new_words) >= MIN_CONTEXT_WORDS else ""
+
+
+def enrich_events(
+    events: List[NewsEvent],
+    mode: str = "description",
+    max_chars: int = 400,
+    cache: Optional[ArticleCache] = None,
+    budget_seconds: float = 3.0,
+    workers: int = 8,
+) -> List[str]:
+    """Context for each event to classify alongside its title.
+
+    "description" uses the feed's description. "article" fetches the linked
+    pages in parallel over one pooled session and falls back to the
+    description for pages that fail, are not in within ``budget_seconds`` or
+    need a browser to reach (see article_url);
+    fetches still running then finish in the background and fill the cache
+    for the next poll.
+
+    Returns:
+        One context string per event, in order; "" where there is none worth sending.
+    """
+    contexts = [truncate(event.description, max_chars) for event in events]
+    if mode == "article" and events:
+        urls = [article_url(event.link) for event in events]
+        todo = []
+        for i, url in enumerate(urls):
+            if url is None:
+                if events[i].link:
+                    metrics.inc("article_skipped")
+                continue
+            cached = cache.get(url) if cache is not None else None
+            if cached is not None:
+                metrics.inc("article_cache_hits")
+                contexts[i] = cached or contexts[i]
+            else:
+                todo.append(i)
+
+        if todo:
+            session = _get_session(workers)
+
+            def fetch(url: str) -> str:
+                try:
+                    with metrics.span("article_fetch"):
+                        text = fetch_article_text(url, max_chars, session)
+                    if cache is not None:
+                        cache.put(url, text)
+                except Exception as e:
+                    logging.warning(f"Failed to fetch article {url}: {e}")
+                    metrics.inc("article_failures")
+                    return ""
+                return text
+
+            executor = ThreadPoolExecutor(max_workers=min(workers, len(todo)))
+            futures = {executor.submit(fetch, urls[i]): i for i in todo}
+            done, not_done = wait(futures, timeout=budget_seconds)
+            # Fetches already running finish in the background; queued ones are not started
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in done:
+                i = futures[future]
+                contexts[i] = future.result() or contexts[i]
+            metrics.inc("article_fetches", len(done))
+            if not_done:
+                metrics.inc("article_timeouts", len(not_done))
+                logging.info(f"{len(not_done)} of {len(todo)} articles not fetched within {budget_seconds}s, using descriptions")
+
+    return [useful_context(event.title, context) for event, context in zip(events, contexts)]
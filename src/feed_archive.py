@@ -0,0 +1,146 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+# Segments are rolled over at this size so old history can be pruned or shipped file by file
+SEGMENT_BYTES = 64 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+
+
+@dataclass
+class ArchivedFeed:
+    id: int
+    feed_url: str
+    fetched_at: float
+    content_type: str
+    content: bytes
+
+
+class FeedArchive:
+    """Append-only archive of raw feed bodies as fetched, for replaying history.
+
+    Bodies are zlib-compressed and appended to numbered segment files; an SQLite
+    index maps each snapshot's feed and fetch time to its segment offset. The
+    index row is only written after the body is on disk, so a crash can leave
+    unreferenced bytes at the end of a segment but never a dangling entry.
+    A body identical to the feed's previous snapshot is not stored again.
+    Safe to share between threads.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                feed_url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                content_type TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_length INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_fetched_at ON snapshots (fetched_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_feed ON snapshots (feed_url, fetched_at)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT MAX(segment) FROM snapshots").fetchone()
+        self._segment = row[0] or 1
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.z")
+
+    def append(self, feed_url: str, content: bytes, content_type: str = "", fetched_at: Optional[float] = None) -> Optional[int]:
+        """Archive a fetched body. Returns the snapshot id, or None if it repeats the previous snapshot."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        compressed = zlib.compress(content, COMPRESSION_LEVEL)
+        with self._lock:
+            last = self._conn.execute(
+                "SELECT content_hash FROM snapshots WHERE feed_url = ? ORDER BY id DESC LIMIT 1", (feed_url,)
+            ).fetchone()
+            if last is not None and last[0] == content_hash:
+                return None
+            path = self._segment_path(self._segment)
+            if os.path.exists(path) and os.path.getsize(path) + len(compressed) > self.segment_bytes:
+                self._segment += 1
+                path = self._segment_path(self._segment)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(compressed)
+                f.flush()
+                os.fsync(f.fileno())
+            cursor = self._conn.execute(
+                """INSERT INTO snapshots (feed_url, fetched_at, content_type, content_hash, segment, offset, length, raw_length)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (feed_url, fetched_at or time.time(), content_type, content_hash, self._segment, offset, len(compressed), len(content)),
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def snapshots(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        feed_urls: Optional[List[str]] = None,
+        after_id: int = 0,
+    ) -> Iterator[ArchivedFeed]:
+        """Archived bodies in fetch order, optionally limited to a fetch-time window and to some feeds.
+
+        ``after_id`` skips snapshots up to and including that id, to resume a replay.
+        """
+        query = "SELECT id, feed_url, fetched_at, content_type, segment, offset, length FROM snapshots WHERE id > ?"
+        params: list = [after_id]
+        if since is not None:
+            query += " AND fetched_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND fetched_at < ?"
+            params.append(until)
+        if feed_urls:
+            query += f" AND feed_url IN ({','.join('?' * len(feed_urls))})"
+            params.extend(feed_urls)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+
+        # Keep the current segment open across snapshots; replays read segments sequentially
+        handle = None
+        open_segment = None
+        try:
+            for snapshot_id, feed_url, fetched_at, content_type, segment, offset, length in rows:
+                if segment != open_segment:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(self._segment_path(segment), "rb")
+                    open_segment = segment
+                handle.seek(offset)
+                content = zlib.decompress(handle.read(length))
+                yield ArchivedFeed(snapshot_id, feed_url, fetched_at, content_type, content)
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, raw, stored, first, last = self._conn.execute(
+                "SELECT COUNT(*), SUM(raw_length), SUM(length), MIN(fetched_at), MAX(fetched_at) FROM snapshots"
+            ).fetchone()
+        return {
+            "snapshots": count,
+            "raw_bytes": raw or 0,
+            "stored_bytes": stored or 0,
+            "first_fetched_at": first,
+            "last_fetched_at": last,
+        }
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+
+@dataclass
+class FeedState:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    # Publish time (epoch seconds) of the newest entry handled so far
+    high_water_mark: Optional[float] = None
+
+
+class FeedStateStore:
+    """Persists each feed's HTTP validators, body hash and high-water mark between runs.
+
+    New state is staged during a run and only written by ``commit()``, so a run
+    that fails half-way re-fetches the same body next time instead of treating
+    it as already handled. Safe to share between threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS feeds (
+                feed_url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(feeds)")]
+        if "high_water_mark" not in columns:
+            self._conn.execute("ALTER TABLE feeds ADD COLUMN high_water_mark REAL")
+        self._conn.commit()
+        self._staged: Dict[str, FeedState] = {}
+
+    def get(self, feed_url: str) -> FeedState:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, high_water_mark FROM feeds WHERE feed_url = ?", (feed_url,)
+            ).fetchone()
+        return FeedState(*row) if row else FeedState()
+
+    def stage(self, feed_url: str, state: FeedState):
+        with self._lock:
+            self._staged[feed_url] = state
+
+    def advance_high_water_mark(self, feed_url: str, timestamp: float):
+        """Stage a newer high-water mark for the feed; older timestamps are ignored."""
+        current = self._staged.get(feed_url) or self.get(feed_url)
+        if current.high_water_mark is None or timestamp > current.high_water_mark:
+            self.stage(feed_url, replace(current, high_water_mark=timestamp))
+
+    def commit(self, feed_url: Optional[str] = None):
+        """Persist staged state for one feed, or for every feed if feed_url is None."""
+        now = time.time()
+        with self._lock:
+            urls = [feed_url] if feed_url is not None else list(self._staged)
+            for url in urls:
+                state = self._staged.pop(url, None)
+                if state is None:
+                    continue
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO feeds (feed_url, etag, last_modified, content_hash, high_water_mark, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)""",
+                    (url, state.etag, state.last_modified, state.content_hash, state.high_water_mark, now),
+                )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
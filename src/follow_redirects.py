@@ -1,49 +1,222 @@
 import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 
-from playwright.async_api import async_playwright
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.google_news import decode_google_news_url
+from src.metrics import metrics
+from src.redirect_cache import RedirectCache
+
+REDIRECT_TIMEOUT_MS = 10000
+MAX_CONCURRENT_PAGES = 4
+HTTP_TIMEOUT = (3.05, 10)
+HTTP_WORKERS = 8
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+}
+
+# Resolution tiers, cheapest first
+TIER_CACHE = "cache"
+TIER_DECODE = "decode"
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+TIER_UNRESOLVED = "unresolved"
+
+_default_cache: Optional[RedirectCache] = None
+_session: Optional[requests.Session] = None
+
+
+@dataclass
+class ResolvedUrl:
+    final_url: str
+    tier: str
+
+
+def set_redirect_cache(cache: Optional[RedirectCache]):
+    """Set the cache used by follow_redirects/follow_redirects_many when none is passed."""
+    global _default_cache
+    _default_cache = cache
 
 
 class PlaywrightBrowser:
 
-    def __init__(self, playwright, browser):
+    def __init__(self, playwright, browser, max_pages: int = MAX_CONCURRENT_PAGES):
         self._playwright = playwright
         self._browser = browser
+        self._context = None
+        self._page_slots = asyncio.Semaphore(max_pages)
 
     @classmethod
-    async def initialize(cls, headless: bool = True):
+    async def initialize(cls, headless: bool = True, max_pages: int = MAX_CONCURRENT_PAGES):
         """Initialize Playwright, browser, and tools."""
+        from playwright.async_api import async_playwright
+
         playwright = await async_playwright().start()
         browser = await playwright.chromium.launch(headless=headless)
-        return cls(playwright, browser)
+        return cls(playwright, browser, max_pages)
 
     def get_browser(self):
         return self._browser
 
+    async def get_context(self):
+        """Shared browser context, created on first use and reused for every page."""
+        if self._context is None:
+            self._context = await self._browser.new_context()
+        return self._context
+
+    async def resolve(self, url: str) -> str:
+        """Open url in a pooled page and return the URL it lands on."""
+        initial_host = urlparse(url).netloc
+        async with self._page_slots:
+            page = await (await self.get_context()).new_page()
+            try:
+                await page.goto(url, wait_until="domcontentloaded")
+                try:
+                    await page.wait_for_url(
+                        lambda current: urlparse(current).netloc != initial_host,
+                        timeout=REDIRECT_TIMEOUT_MS,
+                    )
+                except Exception:
+                    pass
+                return page.url
+            finally:
+                await page.close()
+
+    async def resolve_many(self, urls: List[str]) -> Dict[str, str]:
+        """Resolve several URLs concurrently, bounded by the page limit.
+
+        URLs that fail to load map to themselves.
+        """
+        unique = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.resolve(url) for url in unique), return_exceptions=True)
+        resolved = {}
+        for url, result in zip(unique, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Failed to resolve {url}: {result}")
+                result = url
+            resolved[url] = result
+        return resolved
+
     async def teardown(self):
         """Gracefully close browser and playwright."""
+        if self._context is not None:
+            await self._context.close()
         await self._browser.close()
         await self._playwright.stop()
 
 
-async def _follow_redirects_async(url: str) -> str:
-    from urllib.parse import urlparse
-    initial_host = urlparse(url).netloc
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update(HTTP_HEADERS)
+        adapter = HTTPAdapter(pool_connections=HTTP_WORKERS, pool_maxsize=HTTP_WORKERS)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+def _left_host(url: str, final_url: str) -> bool:
+    return urlparse(final_url).netloc != urlparse(url).netloc
+
+
+def resolve_with_http(url: str, session: Optional[requests.Session] = None) -> Optional[str]:
+    """Follow plain HTTP redirects without downloading the body.
+
+    Returns the final URL if the redirects left the original host, otherwise None.
+    """
+    session = session or _get_session()
+    try:
+        with session.get(url, allow_redirects=True, timeout=HTTP_TIMEOUT, stream=True) as response:
+            final_url = response.url
+    except requests.exceptions.RequestException as e:
+        logging.info(f"HTTP redirect resolution failed for {url}: {e}")
+        return None
+    return final_url if _left_host(url, final_url) else None
+
+
+async def _follow_redirects_many_async(urls: List[str]) -> Dict[str, str]:
     browser = await PlaywrightBrowser.initialize(headless=True)
     try:
-        page = await browser.get_browser().new_page()
-        await page.goto(url, wait_until="domcontentloaded")
-        try:
-            await page.wait_for_url(
-                lambda current: urlparse(current).netloc != initial_host,
-                timeout=10000,
-            )
-        except Exception:
-            pass
-        return page.url
+        return await browser.resolve_many(urls)
     finally:
         await browser.teardown()
 
 
+def resolve_urls(urls: List[str], cache: Optional[RedirectCache] = None) -> Dict[str, ResolvedUrl]:
+    """Resolve URLs through a chain of increasingly expensive tiers.
+
+    Each URL is tried against the redirect cache, then decoded offline (Google
+    News article tokens), then followed over plain HTTP, and only the rest are
+    opened in a headless browser, all of them in a single browser launch.
+    Resolutions that left the original host are written back to the cache.
+
+    Args:
+        urls: The initial URLs to follow redirects from.
+        cache: Redirect cache to use; defaults to the one set with set_redirect_cache.
+    Returns:
+        Mapping of each URL to its final URL and the tier that produced it.
+    """
+    with metrics.span("resolve_redirects"):
+        return _resolve_urls(urls, cache or _default_cache)
+
+
+def _resolve_urls(urls: List[str], cache: Optional[RedirectCache]) -> Dict[str, ResolvedUrl]:
+    resolved: Dict[str, ResolvedUrl] = {}
+    pending = []
+    for url in dict.fromkeys(urls):
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None:
+            resolved[url] = ResolvedUrl(cached, TIER_CACHE)
+            continue
+        decoded = decode_google_news_url(url)
+        if decoded is not None:
+            resolved[url] = ResolvedUrl(decoded, TIER_DECODE)
+            continue
+        pending.append(url)
+
+    if pending:
+        with metrics.span("redirect_http"), ThreadPoolExecutor(max_workers=min(HTTP_WORKERS, len(pending))) as pool:
+            http_results = list(pool.map(resolve_with_http, pending))
+        browser_urls = []
+        for url, final_url in zip(pending, http_results):
+            if final_url is not None:
+                resolved[url] = ResolvedUrl(final_url, TIER_HTTP)
+            else:
+                browser_urls.append(url)
+
+        if browser_urls:
+            with metrics.span("redirect_browser"):
+                browser_results = asyncio.run(_follow_redirects_many_async(browser_urls))
+            for url, final_url in browser_results.items():
+                tier = TIER_BROWSER if _left_host(url, final_url) else TIER_UNRESOLVED
+                resolved[url] = ResolvedUrl(final_url, tier)
+
+    for url, result in resolved.items():
+        logging.info(f"Resolved {url} via {result.tier}")
+        metrics.inc(f"redirects_{result.tier}")
+        if cache is not None and result.tier in (TIER_DECODE, TIER_HTTP, TIER_BROWSER):
+            cache.put(url, result.final_url)
+    return resolved
+
+
+def resolve_offline(url: str, cache: Optional[RedirectCache] = None) -> Optional[str]:
+    """The final URL if the redirect cache or offline decoding knows it, else None; never fetches."""
+    cache = cache or _default_cache
+    cached = cache.get(url) if cache is not None else None
+    return cached if cached is not None else decode_google_news_url(url)
+
+
+def follow_redirects_many(urls: List[str], cache: Optional[RedirectCache] = None) -> Dict[str, str]:
+    """Resolve many URLs, returning a mapping of each URL to its final URL. See resolve_urls."""
+    return {url: result.final_url for url, result in resolve_urls(urls, cache).items()}
+
+
 def follow_redirects(url: str) -> str:
     """Follow redirects for a given URL and return the final URL.
 
@@ -52,4 +225,4 @@ def follow_redirects(url: str) -> str:
     Returns:
         The final URL after following redirects.
     """
-    return asyncio.run(_follow_redirects_async(url))
\ No newline at end of file
+    return follow_redirects_many([url])[url]
@@ -0,0 +1,73 @@
+import base64
+import binascii
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+GOOGLE_NEWS_HOST = "news.google.com"
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _length_delimited_fields(data: bytes) -> Iterator[bytes]:
+    """Yield the top-level length-delimited values of a protobuf message."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        wire_type = key & 0x7
+        if wire_type == 0:
+            _, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            pos += 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            yield data[pos:pos + length]
+            pos += length
+        elif wire_type == 5:
+            pos += 4
+        else:
+            return
+
+
+def article_token(url: str) -> Optional[str]:
+    parsed = urlparse(url)
+    if parsed.netloc != GOOGLE_NEWS_HOST:
+        return None
+    parts = parsed.path.split("/")
+    if "articles" not in parts:
+        return None
+    index = parts.index("articles") + 1
+    return parts[index] if index < len(parts) and parts[index] else None
+
+
+def decode_google_news_url(url: str) -> Optional[str]:
+    """Extract the publisher URL embedded in a Google News article link, offline.
+
+    Older article tokens are a base64url protobuf that carries the publisher
+    URL verbatim. Newer "AU_yqL..." tokens are opaque ids and return None.
+    """
+    token = article_token(url)
+    if token is None:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    try:
+        for value in _length_delimited_fields(payload):
+            if value.startswith((b"http://", b"https://")):
+                return value.decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return None
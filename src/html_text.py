@@ -0,0 +1,121 @@
+"""Fast text extraction from HTML with the stdlib parser."""
+import codecs
+from html.parser import HTMLParser
+from typing import Iterable, List
+
+# Elements whose text is never part of an article
+SKIP_TAGS = frozenset({
+    "script", "style", "noscript", "template", "svg", "iframe",
+    "nav", "header", "footer", "aside", "form", "button", "select",
+})
+
+
+def collapse_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Cut text to at most max_chars, at a word boundary where possible."""
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+class TextExtractor(HTMLParser):
+    """Collects visible text, paragraph text and the meta description of a document.
+
+    Can be fed a document in pieces; ``paragraph_chars`` lets a caller stop
+    reading once it has enough article text.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.text: List[str] = []
+        self.paragraphs: List[str] = []
+        self.paragraph_chars = 0
+        self.meta_description = ""
+        self._skip_depth = 0
+        self._paragraph: List[str] = []
+        self._in_paragraph = False
+
+    def _boundary(self):
+        # Text on either side of a tag is separate words, as with get_text(separator=" ");
+        # marking tags rather than joining text nodes keeps words split across fed chunks whole
+        self.text.append(" ")
+        if self._in_paragraph:
+            self._paragraph.append(" ")
+
+    def handle_starttag(self, tag, attrs):
+        self._boundary()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "p":
+            self._end_paragraph()
+            self._in_paragraph = True
+        elif tag == "meta" and not self.meta_description:
+            attributes = dict(attrs)
+            if attributes.get("name") == "description" or attributes.get("property") == "og:description":
+                self.meta_description = collapse_whitespace(attributes.get("content") or "")
+
+    def handle_endtag(self, tag):
+        self._boundary()
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "p":
+            self._end_paragraph()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self.text.append(data)
+        if self._in_paragraph:
+            self._paragraph.append(data)
+
+    def _end_paragraph(self):
+        if self._in_paragraph:
+            paragraph = collapse_whitespace("".join(self._paragraph))
+            if paragraph:
+                self.paragraphs.append(paragraph)
+                self.paragraph_chars += len(paragraph) + 1
+        self._paragraph = []
+        self._in_paragraph = False
+
+    def close(self):
+        super().close()
+        self._end_paragraph()
+
+
+def html_to_text(html_content: str) -> str:
+    """Visible text of an HTML fragment, whitespace collapsed."""
+    if not html_content:
+        return ""
+    parser = TextExtractor()
+    parser.feed(html_content)
+    parser.close()
+    return collapse_whitespace("".join(parser.text))
+
+
+def article_text(chunks: Iterable[bytes], encoding: str = "utf-8", max_chars: int = 0) -> str:
+    """Main text of an article page, read from its body in chunks.
+
+    Paragraph text is preferred, then the page's meta description, then all
+    visible text. Reading stops as soon as max_chars of paragraph text is in.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = TextExtractor()
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        if max_chars and parser.paragraph_chars >= max_chars:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    text = " ".join(parser.paragraphs) or parser.meta_description or collapse_whitespace("".join(parser.text))
+    return truncate(text, max_chars)
@@ -1,8 +1,12 @@
+import asyncio
 import logging
-from src.config import load_config
+import os
+import time
+from src.config import Config, load_config
 from src.rss import fetch_rss_events
-from src.classifier import classify_event
-from src.notifier import send_notification
+from src.classifier_engine import ClassifierEngine
+from src.metrics import metrics, profiling
+from src.processing import Stores, flush_alerts, process_events, write_metrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -14,37 +18,47 @@ def main():
         logging.error(f"Failed to load configuration: {e}")
         return
 
-    logging.info(f"Fetching RSS feed from {config.rss_feed_url}")
-    try:
-        events = fetch_rss_events(config.rss_feed_url, config.lookback_minutes, config.keyword_filter)
-    except Exception as e:
-        logging.error(f"Failed to fetch RSS feed: {e}")
-        return
-
+    with profiling(config.profile, os.path.join(config.state_dir, "profiles")), metrics.span("run"):
+        asyncio.run(run_once(config))
+    write_metrics(config)
 
-    logging.info(f"Found {len(events)} events matching keyword '{config.keyword_filter}' in the last {config.lookback_minutes} minutes.")
-    logging.info(f"Expected triggering event: {config.triggering_event}")
-    for event in events:
+async def run_once(config: Config):
+    stores = Stores(config)
+    # One watch: the seen store already skips decided headlines, so no classification cache
+    engine = ClassifierEngine(config, labels=stores.labels)
+    try:
+        watch = config.default_watch()
+        logging.info(f"Fetching RSS feed from {watch.rss_feed_url}")
+        started_at = time.perf_counter()
         try:
-            logging.info("**********")
-            logging.info(f"Classifying event: {event.title}")
-            logging.info(f"Published: {event.published.isoformat()}")
-            logging.info(f"Link: {event.link}")
-            is_triggered = classify_event(event.title, event.description, config)
-
-            if is_triggered:
-                logging.info("TRIGGERED")
-                send_notification(
-                    title=f"News Alert: {config.keyword_filter}",
-                    message=event.title,
-                    url=event.link,
-                    user_keys=config.pushover_user_keys,
-                    api_token=config.pushover_api_token
-                )
-            else:
-                logging.info("Not triggered")
+            events = fetch_rss_events(
+                watch.rss_feed_url,
+                watch.lookback_minutes,
+                watch.keyword_filter,
+                state_store=stores.feed_state,
+                streaming=config.streaming_parse,
+                date_ordered=config.feed_date_ordered,
+                prefilter=watch.prefilter,
+                archive=stores.archive,
+            )
         except Exception as e:
-            logging.error(f"Error processing event '{event.title}': {e}")
+            logging.error(f"Failed to fetch RSS feed: {e}")
+            return
+
+        if events is None:
+            logging.info("Feed unchanged since the last run, nothing to do.")
+            return
+
+        logging.info(f"Found {len(events)} events matching keyword '{watch.keyword_filter}' in the last {watch.lookback_minutes} minutes.")
+        # Only remember the feed body once every entry in it has a verdict
+        if await process_events(events, watch, config, stores, engine, started_at):
+            stores.feed_state.commit(watch.rss_feed_url)
+        stores.compact()
+    finally:
+        # Digests queued by earlier runs go out once their window has passed, even if this run found nothing
+        await flush_alerts(config, stores)
+        await engine.aclose()
+        stores.close()
 
 if __name__ == "__main__":
     main()
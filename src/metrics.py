@@ -0,0 +1,168 @@
+import cProfile
+import json
+import logging
+import math
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+
+# Percentiles are computed over the most recent samples of each span
+SPAN_SAMPLES = 2048
+PROMETHEUS_PREFIX = "news_trigger"
+PROFILERS = ("cprofile", "tracemalloc")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Metrics:
+    """Timing spans and counters for one process.
+
+    Spans keep a count, a running total and the latest samples for
+    percentiles; counters are plain cumulative sums. Safe to use from the
+    worker threads the pipeline fans out to.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._span_count: Dict[str, int] = defaultdict(int)
+        self._span_total: Dict[str, float] = defaultdict(float)
+        self._span_samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=SPAN_SAMPLES))
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            self._span_count[name] += 1
+            self._span_total[name] += seconds
+            self._span_samples[name].append(seconds)
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block, including any awaits inside it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.counters.clear()
+            self._span_count.clear()
+            self._span_total.clear()
+            self._span_samples.clear()
+
+    def summary(self) -> dict:
+        with self._lock:
+            spans = {
+                name: {
+                    "count": self._span_count[name],
+                    "total_seconds": self._span_total[name],
+                    "p50": percentile(list(samples), 50),
+                    "p95": percentile(list(samples), 95),
+                    "p99": percentile(list(samples), 99),
+                    "max": max(samples) if samples else 0.0,
+                }
+                for name, samples in self._span_samples.items()
+            }
+            counters = dict(self.counters)
+        alerts = counters.get("alerts_sent", 0)
+        return {
+            "started_at": self.started_at,
+            "written_at": time.time(),
+            "spans": spans,
+            "counters": counters,
+            "cost_per_alert_usd": counters.get("llm_cost_usd", 0.0) / alerts if alerts else None,
+        }
+
+    def prometheus(self) -> str:
+        """The summary in Prometheus text exposition format."""
+        summary = self.summary()
+        lines = []
+        for name, value in sorted(summary["counters"].items()):
+            metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        metric = f"{PROMETHEUS_PREFIX}_span_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for name, stats in sorted(summary["spans"].items()):
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'{metric}{{span="{name}",quantile="0.{quantile[1:]}"}} {stats[quantile]}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {stats["total_seconds"]}')
+            lines.append(f'{metric}_count{{span="{name}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str, textfile_path: Optional[str] = None):
+        """Write the JSON summary and, if a path is given, the Prometheus textfile."""
+        _write_atomic(json_path, json.dumps(self.summary(), indent=2))
+        if textfile_path:
+            _write_atomic(textfile_path, self.prometheus())
+
+
+def _write_atomic(path: str, content: str):
+    # Collectors may read the file at any time, so never expose a partial write
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# Process-wide registry, so deep call sites can record without threading a handle through
+metrics = Metrics()
+
+
+@contextmanager
+def profiling(kind: Optional[str], output_dir: str):
+    """Profile the enclosed block with cProfile or tracemalloc, writing the result to output_dir.
+
+    A kind of None profiles nothing.
+    """
+    if kind is None:
+        yield
+        return
+    if kind not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{kind}', expected one of {', '.join(PROFILERS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    if kind == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(output_dir, f"profile-{stamp}.prof")
+            profiler.dump_stats(path)
+            logging.info(f"cProfile stats written to {path}")
+        return
+
+    tracemalloc.start(25)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        path = os.path.join(output_dir, f"tracemalloc-{stamp}.txt")
+        with open(path, "w") as f:
+            f.write(f"current={current} peak={peak}\n")
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+        logging.info(f"tracemalloc top allocations written to {path}")
@@ -0,0 +1,43 @@
+import hashlib
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w]+")
+# Google News appends the outlet as " - Outlet Name" to every headline
+_SOURCE_SEPARATOR = re.compile(r"\s+[-–—|]\s+")
+MAX_SOURCE_CHARS = 60
+
+
+def strip_source(title: str) -> str:
+    """Drop a trailing " - Outlet" segment.
+
+    Only the last segment is dropped, and only if it is shorter than the
+    headline before it, so " - " inside a headline ("US - Iran talks
+    collapse") is kept.
+    """
+    separators = list(_SOURCE_SEPARATOR.finditer(title))
+    if not separators:
+        return title
+    last = separators[-1]
+    headline, source = title[:last.start()].strip(), title[last.end():].strip()
+    if not source or len(source) > MAX_SOURCE_CHARS or len(headline) <= len(source):
+        return title
+    return headline
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a headline so syndicated copies of the same story compare equal.
+
+    Lowercases, folds unicode compatibility forms, drops a trailing
+    " - Outlet" suffix and collapses punctuation and whitespace.
+    """
+    if not title:
+        return ""
+    title = unicodedata.normalize("NFKC", title)
+    title = strip_source(title)
+    return _NON_WORD.sub(" ", title.lower()).strip()
+
+
+def title_hash(title: str) -> str:
+    """Stable hex digest of the normalized title."""
+    return hashlib.sha1(normalize_title(title).encode("utf-8")).hexdigest()
@@ -1,13 +1,22 @@
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 import requests
-from typing import List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
 
 from src.follow_redirects import follow_redirects
+from src.metrics import metrics
+
+PUSHOVER_API_URL = "https://api.pushover.net/1/messages.json"
+REQUEST_TIMEOUT = (3.05, 10)
 
 # Pushover limits
 MAX_MESSAGE_LENGTH = 1024
 MAX_URL_LENGTH = 512
+MAX_RECIPIENTS_PER_CALL = 50
 
 def prepare_message_and_url(message: str, url: str) -> Tuple[str, Optional[str]]:
     """
@@ -44,28 +53,155 @@ def prepare_message_and_url(message: str, url: str) -> Tuple[str, Optional[str]]
         return message, None
     return final_url, None
 
-def send_notification(title: str, message: str, url: str, user_keys: List[str], api_token: str):
-    api_url = "https://api.pushover.net/1/messages.json"
-    
-    # Prepare message and URL to handle Pushover limits
-    prepared_message, prepared_url = prepare_message_and_url(message, url)
-    
-    for user_key in user_keys:
+@dataclass
+class DeliveryResult:
+    user_key: str
+    success: bool
+    status_code: Optional[int] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    request_id: Optional[str] = None
+
+
+class PushoverClient:
+    """Delivers Pushover messages to many recipients concurrently.
+
+    Requests share a keep-alive connection pool. Connection errors and 5xx
+    responses are retried with exponential backoff (Pushover asks for at least
+    5 seconds between retries); other 4xx responses, including 429 when the
+    app's message quota is used up, are final.
+    """
+
+    def __init__(
+        self,
+        api_token: str,
+        session: Optional[requests.Session] = None,
+        max_workers: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 5.0,
+        timeout: Tuple[float, float] = REQUEST_TIMEOUT,
+        api_url: str = PUSHOVER_API_URL,
+    ):
+        self.api_token = api_token
+        self.api_url = api_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+        self._session = session
+
+    def _post(self, data: dict, recipients: List[str]) -> List[DeliveryResult]:
+        attempt = 0
+        while True:
+            attempt += 1
+            error = None
+            status_code = None
+            request_id = None
+            try:
+                metrics.inc("pushover_posts")
+                with metrics.span("pushover_post"):
+                    response = self._session.post(self.api_url, data=data, timeout=self.timeout)
+                status_code = response.status_code
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                request_id = body.get("request")
+                if status_code == 200 and body.get("status", 1) == 1:
+                    return [DeliveryResult(key, True, status_code, attempt, None, request_id) for key in recipients]
+                error = "; ".join(body.get("errors", [])) or f"HTTP {status_code}"
+                if status_code == 429:
+                    reset = response.headers.get("X-Limit-App-Reset")
+                    error = f"{error} (app message quota exhausted until {reset})" if reset else error
+                retryable = status_code >= 500
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+                retryable = True
+
+            if not retryable or attempt > self.max_retries:
+                metrics.inc("pushover_failures", len(recipients))
+                return [DeliveryResult(key, False, status_code, attempt, error, request_id) for key in recipients]
+            metrics.inc("pushover_retries")
+            delay = self.backoff_base * 2 ** (attempt - 1)
+            logging.warning(f"Pushover request failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def _payload(self, title: str, message: str, url: Optional[str], user: str) -> dict:
         data = {
-            "token": api_token,
-            "user": user_key,
+            "token": self.api_token,
+            "user": user,
             "title": title,
-            "message": prepared_message,
+            "message": message,
         }
-        
         # Only include URL fields if we have a separate URL (not embedded in message)
-        if prepared_url is not None:
-            data["url"] = prepared_url
+        if url:
+            data["url"] = url
             data["url_title"] = "Read more"
-        
-        try:
-            response = requests.post(api_url, data=data)
-            response.raise_for_status()
-            print(f"Notification sent to {user_key}")
-        except requests.exceptions.RequestException as e:
-            print(f"Failed to send notification to {user_key}: {e}")
+        return data
+
+    def send(self, title: str, message: str, url: Optional[str], user_keys: List[str], collapse: bool = False) -> List[DeliveryResult]:
+        """Send a prepared message to every recipient.
+
+        With collapse=True recipients are sent as comma-separated groups of up
+        to MAX_RECIPIENTS_PER_CALL in one request each; if a group is rejected
+        with a 4xx (e.g. one invalid key), its recipients are retried one by one.
+
+        Returns:
+            One DeliveryResult per recipient, in user_keys order.
+        """
+        if collapse:
+            groups = [user_keys[i:i + MAX_RECIPIENTS_PER_CALL] for i in range(0, len(user_keys), MAX_RECIPIENTS_PER_CALL)]
+        else:
+            groups = [[key] for key in user_keys]
+
+        def deliver(group: List[str]) -> List[DeliveryResult]:
+            results = self._post(self._payload(title, message, url, ",".join(group)), group)
+            status_code = results[0].status_code
+            rejected = status_code is not None and 400 <= status_code < 500 and status_code != 429
+            if len(group) > 1 and rejected:
+                return [result for key in group for result in self._post(self._payload(title, message, url, key), [key])]
+            return results
+
+        if not groups:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as pool:
+            by_group = list(pool.map(deliver, groups))
+        return [result for results in by_group for result in results]
+
+    def close(self):
+        self._session.close()
+
+
+_clients: Dict[str, PushoverClient] = {}
+
+
+def _get_client(api_token: str) -> PushoverClient:
+    if api_token not in _clients:
+        _clients[api_token] = PushoverClient(api_token)
+    return _clients[api_token]
+
+
+def send_notification(
+    title: str,
+    message: str,
+    url: str,
+    user_keys: List[str],
+    api_token: str,
+    collapse: bool = False,
+    client: Optional[PushoverClient] = None,
+) -> List[DeliveryResult]:
+    # Prepare message and URL to handle Pushover limits
+    prepared_message, prepared_url = prepare_message_and_url(message, url)
+
+    client = client or _get_client(api_token)
+    results = client.send(title, prepared_message, prepared_url, user_keys, collapse=collapse)
+    for result in results:
+        if result.success:
+            logging.info(f"Notification sent to {result.user_key}")
+        else:
+            logging.error(f"Failed to send notification to {result.user_key} after {result.attempts} attempt(s): {result.error}")
+    return results
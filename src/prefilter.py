@@ -0,0 +1,133 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+
+
+@dataclass
+class Rule:
+    """Boolean rule over canonical terms: any of ``any``, all of ``all``, none of ``none``."""
+    name: str
+    any: List[str] = field(default_factory=list)
+    all: List[str] = field(default_factory=list)
+    none: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PrefilterMatch:
+    rules: List[str]
+    terms: FrozenSet[str]
+
+
+def _trie_pattern(terms: List[str]) -> str:
+    """Regex for a set of literal terms, factored as a trie.
+
+    Alternatives at each position share prefixes, so the regex engine never
+    retries the same characters against many terms and matching stays linear
+    in the input however many terms are added. Longer terms are preferred.
+    """
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+def _inner_forms(form: str, surfaces: Dict[str, set], word_boundaries: bool) -> List[str]:
+    """Other surface forms that occur inside ``form``."""
+    if not word_boundaries:
+        return [other for other in surfaces if other != form and other in form]
+    # With word boundaries a nested form spans whole words, so only those spans need a lookup
+    words = [m.span() for m in re.finditer(r"\w+", form)]
+    spans = {form[start:end] for i, (start, _) in enumerate(words) for _, end in words[i:]}
+    return [span for span in spans if span != form and span in surfaces]
+
+
+class Prefilter:
+    """Keyword prefilter compiled into a single regex.
+
+    Every include and exclude term, and their aliases, are matched in one
+    pass over the text; the set of canonical terms found is then checked
+    against the boolean rules. Text passes if no exclude term is present and
+    at least one rule fires. Overlapping phrases that only partially share
+    words (e.g. "new york" in "new york times" is found, but of "new york" and
+    "york times" only the first) are not both reported.
+    """
+
+    def __init__(
+        self,
+        rules: List[Rule],
+        aliases: Optional[Dict[str, List[str]]] = None,
+        exclude: Optional[List[str]] = None,
+        word_boundaries: bool = True,
+    ):
+        self.rules = rules
+        self.exclude = frozenset(term.lower() for term in exclude or [])
+        aliases = {canonical.lower(): [a.lower() for a in forms] for canonical, forms in (aliases or {}).items()}
+
+        canonical_terms = set(self.exclude)
+        for rule in rules:
+            canonical_terms.update(term.lower() for term in rule.any + rule.all + rule.none)
+
+        # surface form -> canonical terms it stands for
+        surfaces: Dict[str, set] = {}
+        for term in canonical_terms:
+            for form in [term] + aliases.get(term, []):
+                surfaces.setdefault(form, set()).add(term)
+
+        left, right = (r"(?<!\w)", r"(?!\w)") if word_boundaries else ("", "")
+        # A long match hides shorter terms inside it, so credit those at compile time
+        self._terms_for: Dict[str, FrozenSet[str]] = {}
+        for form, terms in surfaces.items():
+            found = set(terms)
+            for inner in _inner_forms(form, surfaces, word_boundaries):
+                found.update(surfaces[inner])
+            self._terms_for[form] = frozenset(found)
+
+        self._pattern = re.compile(left + _trie_pattern(list(surfaces)) + right, re.IGNORECASE) if surfaces else None
+
+    @classmethod
+    def from_keyword(cls, keyword: str) -> "Prefilter":
+        """Equivalent of the plain case-insensitive substring keyword filter."""
+        return cls([Rule(name=keyword, any=[keyword])], word_boundaries=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Prefilter":
+        return cls(
+            rules=[Rule(**rule) for rule in data.get("rules", [])],
+            aliases=data.get("aliases"),
+            exclude=data.get("exclude"),
+            word_boundaries=data.get("word_boundaries", True),
+        )
+
+    def find_terms(self, text: str) -> FrozenSet[str]:
+        if self._pattern is None or not text:
+            return frozenset()
+        found = set()
+        for match in self._pattern.finditer(text):
+            found.update(self._terms_for.get(match.group().lower(), ()))
+        return frozenset(found)
+
+    def match(self, text: str) -> Optional[PrefilterMatch]:
+        """Return the fired rules and found terms, or None if the text is filtered out."""
+        terms = self.find_terms(text)
+        if terms & self.exclude:
+            return None
+        fired = [
+            rule.name for rule in self.rules
+            if (not rule.any or terms.intersection(t.lower() for t in rule.any))
+            and all(t.lower() in terms for t in rule.all)
+            and not terms.intersection(t.lower() for t in rule.none)
+        ]
+        return PrefilterMatch(fired, terms) if fired else None
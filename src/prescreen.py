@@ -0,0 +1,348 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.normalize import normalize_title
+
+MODEL_VERSION = 1
+DEFAULT_NUM_FEATURES = 1 << 18
+RECALL_TARGETS = (1.0, 0.995, 0.99, 0.98, 0.95, 0.9)
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1 / (1 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1 + z)
+
+
+class HashedNgramModel:
+    """Logistic regression over hashed word and character n-grams of a title.
+
+    Features are word unigrams and bigrams plus character trigrams of each
+    word, hashed with a sign bit into ``num_features`` buckets, so the model
+    needs no vocabulary and scoring is a sparse dot product.
+    """
+
+    def __init__(self, num_features: int = DEFAULT_NUM_FEATURES):
+        self.num_features = num_features
+        self.weights: Dict[int, float] = {}
+        self.bias = 0.0
+
+    def features(self, title: str) -> Dict[int, float]:
+        words = normalize_title(title).split()
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        if not grams:
+            return {}
+        scale = 1 / math.sqrt(len(grams))
+        vector: Dict[int, float] = {}
+        for gram in grams:
+            h = zlib.crc32(gram.encode("utf-8"))
+            index = h % self.num_features
+            vector[index] = vector.get(index, 0.0) + (scale if h & 0x80000000 else -scale)
+        return vector
+
+    def _margin(self, vector: Dict[int, float]) -> float:
+        weights = self.weights
+        return self.bias + sum(weights.get(i, 0.0) * v for i, v in vector.items())
+
+    def score(self, title: str) -> float:
+        """Probability that the title is a positive."""
+        return _sigmoid(self._margin(self.features(title)))
+
+    def score_many(self, titles: Sequence[str]) -> List[float]:
+        return [_sigmoid(self._margin(self.features(title))) for title in titles]
+
+    def fit(self, examples: Sequence[Tuple[str, bool]], epochs: int = 30, learning_rate: float = 0.5, l2: float = 1e-4, seed: int = 0):
+        """Train by stochastic gradient descent on log loss."""
+        vectors = [(self.features(title), 1.0 if label else 0.0) for title, label in examples]
+        rng = random.Random(seed)
+        order = list(range(len(vectors)))
+        weights = self.weights
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + 0.1 * epoch)
+            for i in order:
+                vector, label = vectors[i]
+                gradient = _sigmoid(self._margin(vector)) - label
+                self.bias -= rate * gradient
+                for index, value in vector.items():
+                    weight = weights.get(index, 0.0)
+                    weights[index] = weight - rate * (gradient * value + l2 * weight)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "num_features": self.num_features,
+            "bias": self.bias,
+            "weights": {str(i): w for i, w in self.weights.items() if abs(w) > 1e-6},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HashedNgramModel":
+        model = cls(data["num_features"])
+        model.bias = data["bias"]
+        model.weights = {int(i): w for i, w in data["weights"].items()}
+        return model
+
+
+class Prescreen:
+    """First stage of the classifier cascade.
+
+    Titles scoring below ``low`` are decided negative and at or above ``high``
+    positive without calling the LLM; the band in between is escalated.
+    ``high`` of None never decides a title positive locally.
+    """
+
+    def __init__(self, model: HashedNgramModel, low: float, high: Optional[float] = None):
+        self.model = model
+        self.low = low
+        self.high = high
+
+    def decide(self, score: float) -> Optional[bool]:
+        if score < self.low:
+            return False
+        if self.high is not None and score >= self.high:
+            return True
+        return None
+
+    def decide_many(self, titles: Sequence[str]) -> List[Optional[bool]]:
+        """Local verdicts, None for titles that need the LLM."""
+        return [self.decide(score) for score in self.model.score_many(titles)]
+
+    def save(self, path: str, triggering_event: str, trained_on: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "version": MODEL_VERSION,
+            "triggering_event": triggering_event,
+            "low": self.low,
+            "high": self.high,
+            "trained_on": trained_on,
+            "trained_at": time.time(),
+            "model": self.model.to_dict(),
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+
+def model_path(state_dir: str, triggering_event: str) -> str:
+    digest = hashlib.sha1(triggering_event.strip().encode("utf-8")).hexdigest()[:16]
+    return os.path.join(state_dir, "prescreen", f"{digest}.json")
+
+
+def load_prescreen(state_dir: str, triggering_event: str) -> Optional[Prescreen]:
+    """The trained prescreen for a triggering event, or None if there is none."""
+    path = model_path(state_dir, triggering_event)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION or data.get("triggering_event", "").strip() != triggering_event.strip():
+            return None
+        return Prescreen(HashedNgramModel.from_dict(data["model"]), data["low"], data["high"])
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"Ignoring unreadable prescreen model {path}: {e}")
+        return None
+
+
+class LabelStore:
+    """LLM verdicts kept as training data for the prescreen."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS labels (
+                triggering_event TEXT NOT NULL,
+                title TEXT NOT NULL,
+                verdict INTEGER NOT NULL,
+                labeled_at REAL NOT NULL,
+                PRIMARY KEY (triggering_event, title)
+            )"""
+        )
+        self._conn.commit()
+
+    def add(self, title: str, triggering_event: str, verdict: bool):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO labels (triggering_event, title, verdict, labeled_at) VALUES (?, ?, ?, ?)",
+            (triggering_event.strip(), title, int(verdict), time.time()),
+        )
+        self._conn.commit()
+
+    def examples(self, triggering_event: str) -> List[Tuple[str, bool]]:
+        rows = self._conn.execute(
+            "SELECT title, verdict FROM labels WHERE triggering_event = ? ORDER BY labeled_at",
+            (triggering_event.strip(),),
+        )
+        return [(title, bool(verdict)) for title, verdict in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+def load_cases(path: str, triggering_event: str) -> List[Tuple[str, bool]]:
+    """Labeled cases for a triggering event from a JSON-lines file of {title, triggering_event, label}."""
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            if case.get("triggering_event", triggering_event).strip() == triggering_event.strip():
+                examples.append((case["title"], bool(case["label"])))
+    return examples
+
+
+def cross_validated_scores(examples: Sequence[Tuple[str, bool]], folds: int = 5, num_features: int = DEFAULT_NUM_FEATURES, seed: int = 0) -> List[float]:
+    """Score every example with a model that was not trained on it."""
+    order = list(range(len(examples)))
+    random.Random(seed).shuffle(order)
+    scores = [0.0] * len(examples)
+    folds = max(2, min(folds, len(examples)))
+    for fold in range(folds):
+        held_out = order[fold::folds]
+        held = set(held_out)
+        model = HashedNgramModel(num_features).fit([examples[i] for i in order if i not in held], seed=seed)
+        for i in held_out:
+            scores[i] = model.score(examples[i][0])
+    return scores
+
+
+def choose_low(scores: Sequence[float], labels: Sequence[bool], target_recall: float) -> float:
+    """Highest negative threshold that loses at most (1 - target_recall) of the positives."""
+    positives = sorted(s for s, label in zip(scores, labels) if label)
+    if not positives:
+        return 0.0
+    allowed = int(math.floor((1 - target_recall) * len(positives) + 1e-9))
+    return positives[min(allowed, len(positives) - 1)]
+
+
+def choose_high(scores: Sequence[float], labels: Sequence[bool], target_precision: float) -> Optional[float]:
+    """Lowest positive threshold whose local positives reach target_precision, or None."""
+    best = None
+    correct = 0
+    ranked = sorted(zip(scores, labels), reverse=True)
+    for count, (score, label) in enumerate(ranked, start=1):
+        correct += label
+        if correct / count >= target_precision and (count == len(ranked) or ranked[count][0] < score):
+            best = score
+    return best
+
+
+@dataclass
+class CascadeStats:
+    low: float
+    high: Optional[float]
+    local_fraction: float
+    recall: float
+    precision: float
+
+
+def cascade_stats(scores: Sequence[float], labels: Sequence[bool], low: float, high: Optional[float]) -> CascadeStats:
+    """How the cascade would do, taking the LLM's verdicts on escalated titles as correct."""
+    prescreen = Prescreen(HashedNgramModel(), low, high)
+    local = true_positives = predicted_positives = 0
+    for score, label in zip(scores, labels):
+        verdict = prescreen.decide(score)
+        if verdict is None:
+            verdict = label
+        else:
+            local += 1
+        predicted_positives += verdict
+        true_positives += verdict and label
+    positives = sum(labels)
+    return CascadeStats(
+        low=low,
+        high=high,
+        local_fraction=local / len(scores) if scores else 0.0,
+        recall=true_positives / positives if positives else 1.0,
+        precision=true_positives / predicted_positives if predicted_positives else 1.0,
+    )
+
+
+def calibration_report(scores: Sequence[float], labels: Sequence[bool], target_precision: float) -> str:
+    high = choose_high(scores, labels, target_precision)
+    lines = [
+        f"{len(labels)} examples, {sum(labels)} positive; local positives at score >= {high if high is not None else 'never'}",
+        f"{'target recall':>14} {'low':>8} {'decided locally':>16} {'recall':>8} {'precision':>10}",
+    ]
+    for target in RECALL_TARGETS:
+        stats = cascade_stats(scores, labels, choose_low(scores, labels, target), high)
+        lines.append(
+            f"{target:>14.3f} {stats.low:>8.4f} {stats.local_fraction:>16.1%} {stats.recall:>8.1%} {stats.precision:>10.1%}"
+        )
+    return "\n".join(lines)
+
+
+def train(
+    examples: Sequence[Tuple[str, bool]],
+    target_recall: float = 0.99,
+    target_precision: float = 0.99,
+    folds: int = 5,
+) -> Tuple[Prescreen, str]:
+    """Fit a prescreen on all examples, with thresholds calibrated on held-out scores.
+
+    Returns:
+        The prescreen and a calibration report of the recall traded at each threshold.
+    """
+    labels = [label for _, label in examples]
+    scores = cross_validated_scores(examples, folds)
+    low = choose_low(scores, labels, target_recall)
+    high = choose_high(scores, labels, target_precision)
+    if high is not None:
+        low = min(low, high)
+    model = HashedNgramModel().fit(examples)
+    return Prescreen(model, low, high), calibration_report(scores, labels, target_precision)
+
+
+def main():
+    from src.config import load_config
+
+    parser = argparse.ArgumentParser(description="Train the local prescreen from labeled cases and logged LLM verdicts.")
+    parser.add_argument("--triggering-event", help="defaults to the configured triggering event")
+    parser.add_argument("--cases", nargs="*", default=[], help="JSON-lines files of labeled cases")
+    parser.add_argument("--target-recall", type=float, default=0.99)
+    parser.add_argument("--target-precision", type=float, default=0.99)
+    parser.add_argument("--dry-run", action="store_true", help="print the calibration report without saving the model")
+    args = parser.parse_args()
+
+    config = load_config()
+    triggering_event = args.triggering_event or config.triggering_event
+    labels = LabelStore(os.path.join(config.state_dir, "labels.sqlite3"))
+    examples = labels.examples(triggering_event)
+    labels.close()
+    for path in args.cases:
+        examples += load_cases(path, triggering_event)
+    if len(examples) < 10 or all(examples[0][1] == label for _, label in examples):
+        print(f"Need at least 10 examples of both classes to train, have {len(examples)}.")
+        return
+
+    prescreen, report = train(examples, args.target_recall, args.target_precision)
+    print(report)
+    print(f"Chosen thresholds: low={prescreen.low:.4f} high={prescreen.high}")
+    if not args.dry_run:
+        path = model_path(config.state_dir, triggering_event)
+        prescreen.save(path, triggering_event, len(examples))
+        print(f"Saved prescreen to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from src.classification_cache import ClassificationCache
+from src.classifier_engine import ClassifierEngine
+from src.coalescer import Alert, AlertCoalescer, build_digest
+from src.config import Config, Watch
+from src.enrichment import ArticleCache, enrich_events
+from src.feed_archive import FeedArchive
+from src.feed_state import FeedStateStore
+from src.follow_redirects import follow_redirects_many, set_redirect_cache
+from src.metrics import metrics
+from src.notifier import MAX_URL_LENGTH, send_notification
+from src.prescreen import LabelStore
+from src.redirect_cache import RedirectCache
+from src.rss import NewsEvent
+from src.seen_store import SeenStore
+from src.story_index import StoryCluster, StoryIndex
+
+# Triggered stories waiting to be resolved or sent. Bounded, so a burst of
+# verdicts waits on the notifier instead of piling up in memory
+PIPELINE_QUEUE_SIZE = 16
+# Notifications sent concurrently; each one already fans out to every recipient
+NOTIFY_WORKERS = 4
+
+
+class Stores:
+    """Persistent state under ``config.state_dir``, shared by every watch of a process."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.feed_state = FeedStateStore(os.path.join(config.state_dir, "feeds.sqlite3"))
+        self._cache: Optional[ClassificationCache] = None
+        self.redirect_cache = RedirectCache(
+            os.path.join(config.state_dir, "redirects.sqlite3"),
+            config.redirect_cache_ttl_hours * 3600,
+        )
+        set_redirect_cache(self.redirect_cache)
+        self.labels = LabelStore(os.path.join(config.state_dir, "labels.sqlite3"))
+        self.archive = FeedArchive(os.path.join(config.state_dir, "archive")) if config.archive_feeds else None
+        self.alerts = (
+            AlertCoalescer(os.path.join(config.state_dir, "alerts.sqlite3"), config.notify_coalesce_seconds)
+            if config.notify_coalesce_seconds > 0 else None
+        )
+        self.alerts_flush = asyncio.Lock()
+        self.articles = ArticleCache(os.path.join(config.state_dir, "articles.sqlite3")) if config.enrichment == "article" else None
+        self._seen: Dict[str, SeenStore] = {}
+        self._stories: Dict[str, StoryIndex] = {}
+
+    @property
+    def cache(self) -> ClassificationCache:
+        """Verdicts by normalized title and triggering event, opened on first use.
+
+        The seen store already skips a headline a watch has decided, for longer
+        than the cache keeps it, so the cache only pays off where that does not
+        apply: several watches sharing a triggering event.
+        """
+        if self._cache is None:
+            self._cache = ClassificationCache(
+                max_entries=self.config.classification_cache_max_entries,
+                ttl_seconds=self.config.classification_cache_ttl_hours * 3600,
+                path=os.path.join(self.config.state_dir, "classifications.sqlite3"),
+            )
+        return self._cache
+
+    def shares_triggering_events(self) -> bool:
+        """Whether any two watches ask the same question, so one's verdicts can serve the other."""
+        events = [watch.triggering_event for watch in self.config.get_watches()]
+        return len(set(events)) < len(events)
+
+    def seen_store(self, watch: Watch) -> SeenStore:
+        if watch.name not in self._seen:
+            self._seen[watch.name] = SeenStore(
+                os.path.join(self.config.state_dir, "seen.sqlite3"),
+                self.config.seen_retention_hours,
+                namespace=watch.name,
+            )
+        return self._seen[watch.name]
+
+    def story_index(self, watch: Watch) -> StoryIndex:
+        if watch.name not in self._stories:
+            self._stories[watch.name] = StoryIndex(
+                os.path.join(self.config.state_dir, "stories.sqlite3"),
+                self.config.seen_retention_hours,
+                namespace=watch.name,
+                threshold=self.config.story_similarity_threshold,
+            )
+        return self._stories[watch.name]
+
+    def compact(self):
+        if self._seen:
+            next(iter(self._seen.values())).compact()
+        # Every index, not just one: each also drops its expired stories from memory
+        for index in self._stories.values():
+            index.compact()
+        self.redirect_cache.compact()
+        if self.articles is not None:
+            self.articles.compact()
+        if self._cache is not None:
+            logging.info(f"Classification cache: {self._cache.stats()}")
+
+    def close(self):
+        set_redirect_cache(None)
+        for store in self._seen.values():
+            store.close()
+        for index in self._stories.values():
+            index.close()
+        self.feed_state.close()
+        if self._cache is not None:
+            self._cache.close()
+        self.redirect_cache.close()
+        self.labels.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.articles is not None:
+            self.articles.close()
+        if self.alerts is not None:
+            self.alerts.close()
+
+
+def write_metrics(config: Config):
+    """Write the metrics summary under state_dir, plus the Prometheus textfile if configured."""
+    try:
+        metrics.write(os.path.join(config.state_dir, "metrics", "summary.json"), config.metrics_textfile)
+    except OSError as e:
+        logging.error(f"Failed to write metrics: {e}")
+
+
+async def flush_alerts(config: Config, stores: Stores, force: bool = False) -> int:
+    """Send the queued alerts as one digest if their coalescing window has passed.
+
+    Alerts leave the queue only once the digest reached at least one
+    recipient; otherwise they are sent again on the next flush.
+
+    Returns:
+        The number of alerts the digest covered, 0 if none was sent.
+    """
+    if stores.alerts is None:
+        return 0
+    # A digest is only acknowledged once sent; one flush at a time so two never cover the same alerts
+    async with stores.alerts_flush:
+        alerts = stores.alerts.due(force=force)
+        if not alerts:
+            return 0
+        try:
+            with metrics.span("notify"):
+                title, message, url = await asyncio.to_thread(build_digest, alerts, config.notify_digest_max_items)
+                logging.info(f"Sending digest of {len(alerts)} alerts")
+                results = await asyncio.to_thread(
+                    send_notification,
+                    title=title,
+                    message=message,
+                    url=url,
+                    user_keys=config.pushover_user_keys,
+                    api_token=config.pushover_api_token,
+                    collapse=config.pushover_collapse_recipients
+                )
+        except Exception as e:
+            logging.error(f"Failed to send digest of {len(alerts)} alerts: {e}")
+            return 0
+        if results and not any(result.success for result in results):
+            logging.error(f"Digest of {len(alerts)} alerts was not delivered, keeping them queued")
+            return 0
+        stores.alerts.ack(alerts)
+    metrics.inc("digests_sent")
+    return len(alerts)
+
+
+def _log_event(event: NewsEvent, sources: int = 1):
+    logging.info("**********")
+    logging.info(f"Event: {event.title}")
+    logging.info(f"Published: {event.published.isoformat()}")
+    logging.info(f"Link: {event.link}")
+    if sources > 1:
+        logging.info(f"Sources: {sources}")
+    if event.matched_rules:
+        logging.info(f"Prefilter rules: {', '.join(event.matched_rules)}")
+
+
+async def process_events(
+    events: List[NewsEvent],
+    watch: Watch,
+    config: Config,
+    stores: Stores,
+    engine: ClassifierEngine,
+    started_at: Optional[float] = None,
+) -> bool:
+    """Classify a watch's new events and notify for the triggered ones.
+
+    Runs as a pipeline of classify, resolve and notify stages joined by bounded
+    queues: a story is resolved and notified as soon as its batch's verdict
+    arrives, while later batches are still being classified. ``started_at``
+    (a ``time.perf_counter()`` value, e.g. taken before the fetch) is the
+    reference for the time_to_first_alert metric.
+
+    Returns:
+        True if every event got a verdict, i.e. nothing needs to be retried.
+    """
+    started_at = started_at if started_at is not None else time.perf_counter()
+    seen_store = stores.seen_store(watch)
+    new_events = seen_store.filter_unseen(events)
+    metrics.inc("events_already_seen", len(events) - len(new_events))
+    metrics.inc("events_new", len(new_events))
+    logging.info(f"Skipping {len(events) - len(new_events)} events already decided in previous runs.")
+    logging.info(f"Expected triggering event: {watch.triggering_event}")
+    if not new_events:
+        return True
+
+    if config.story_clustering:
+        story_index = stores.story_index(watch)
+        clusters = story_index.cluster(new_events)
+    else:
+        story_index = None
+        clusters = [StoryCluster(representative=event, members=[event]) for event in new_events]
+    metrics.inc("stories", len(clusters))
+    # Every new headline is classified on its own; a story is notified once, through its triggered members
+    members = [(cluster, event) for cluster in clusters for event in cluster.members]
+    remaining = {id(cluster): len(cluster.members) for cluster in clusters}
+    triggered: Dict[int, List[NewsEvent]] = defaultdict(list)
+
+    def finish(cluster: StoryCluster):
+        if story_index is not None:
+            story_index.record(cluster, True)
+        for member in cluster.members:
+            seen_store.mark(member, True)
+
+    contexts = None
+    if config.enrichment != "none":
+        # Bounded by enrichment_budget_seconds, however many stories the burst has
+        with metrics.span("enrich"):
+            contexts = await asyncio.to_thread(
+                enrich_events,
+                [event for _, event in members],
+                config.enrichment,
+                config.enrichment_max_chars,
+                stores.articles,
+                config.enrichment_budget_seconds,
+                config.enrichment_workers,
+            )
+
+    to_resolve: asyncio.Queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+    to_notify: asyncio.Queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+    unclassified = 0
+    classify_failed = False
+    first_alert_sent = False
+
+    async def classify_stage():
+        nonlocal unclassified, classify_failed
+        try:
+            with metrics.span("classify"):
+                titles = [event.title for _, event in members]
+                async for i, is_triggered in engine.classify_iter(titles, watch.triggering_event, contexts):
+                    cluster, event = members[i]
+                    remaining[id(cluster)] -= 1
+                    if is_triggered:
+                        triggered[id(cluster)].append(event)
+                    else:
+                        _log_event(event)
+                        if is_triggered is None:
+                            unclassified += 1
+                            logging.error(f"Could not classify event '{event.title}', will retry next run")
+                        else:
+                            logging.info("Not triggered")
+                            try:
+                                seen_store.mark(event, False)
+                            except Exception as e:
+                                logging.error(f"Error processing event '{event.title}': {e}")
+                    if remaining[id(cluster)] or not triggered[id(cluster)]:
+                        continue
+                    # Every member has its verdict: the story goes out once, with its triggered members as sources
+                    story = StoryCluster(
+                        representative=triggered[id(cluster)][0],
+                        members=triggered[id(cluster)],
+                        notified_before=cluster.notified_before,
+                        signature=cluster.signature,
+                    )
+                    if story.notified_before:
+                        _log_event(story.representative, len(story.members))
+                        logging.info("Already notified as part of an earlier story")
+                        try:
+                            finish(story)
+                        except Exception as e:
+                            logging.error(f"Error processing event '{story.representative.title}': {e}")
+                        continue
+                    # Blocks while the notifier is behind, instead of queueing the whole burst
+                    await to_resolve.put(story)
+        except Exception as e:
+            classify_failed = True
+            logging.error(f"Failed to classify events: {e}")
+        finally:
+            await to_resolve.put(None)
+
+    async def resolve_stage():
+        done = False
+        while not done:
+            # Take every story that is ready, so one browser launch serves all of them
+            ready = [await to_resolve.get()]
+            while not to_resolve.empty():
+                ready.append(to_resolve.get_nowait())
+            done = None in ready
+            ready = [cluster for cluster in ready if cluster is not None]
+            long_links = [cluster.representative.link for cluster in ready if len(cluster.representative.link) > MAX_URL_LENGTH]
+            if long_links:
+                try:
+                    await asyncio.to_thread(follow_redirects_many, long_links)
+                except Exception as e:
+                    logging.error(f"Failed to resolve redirects: {e}")
+            for cluster in ready:
+                await to_notify.put(cluster)
+        for _ in range(NOTIFY_WORKERS):
+            await to_notify.put(None)
+
+    async def notify_stage():
+        nonlocal first_alert_sent
+        while (cluster := await to_notify.get()) is not None:
+            event = cluster.representative
+            try:
+                _log_event(event, len(cluster.members))
+                logging.info("TRIGGERED")
+                title = f"News Alert: {watch.keyword_filter}"
+                message = event.title
+                if len(cluster.members) > 1:
+                    message = f"{event.title} ({len(cluster.members)} sources)"
+                alert = Alert(title, message, event.link)
+                sent = True
+                if stores.alerts is None or stores.alerts.submit(alert):
+                    try:
+                        with metrics.span("notify"):
+                            results = await asyncio.to_thread(
+                                send_notification,
+                                title=title,
+                                message=message,
+                                url=event.link,
+                                user_keys=config.pushover_user_keys,
+                                api_token=config.pushover_api_token,
+                                collapse=config.pushover_collapse_recipients
+                            )
+                        if stores.alerts is not None and results and not any(result.success for result in results):
+                            sent = False
+                    except Exception as e:
+                        if stores.alerts is None:
+                            raise
+                        logging.error(f"Failed to send alert '{event.title}': {e}")
+                        sent = False
+                    if sent:
+                        metrics.inc("alerts_sent")
+                    elif stores.alerts is not None:
+                        # The next flush sends it as a digest, possibly from a later run
+                        logging.error("Alert not delivered, queued for the next digest")
+                        stores.alerts.requeue(alert)
+                else:
+                    # Goes out with the next digest, possibly from a later run
+                    logging.info("Queued for the next digest")
+                    metrics.inc("alerts_coalesced")
+                    sent = await flush_alerts(config, stores) > 0
+                if sent and not first_alert_sent:
+                    first_alert_sent = True
+                    metrics.observe("time_to_first_alert", time.perf_counter() - started_at)
+                finish(cluster)
+            except Exception as e:
+                logging.error(f"Error processing event '{event.title}': {e}")
+
+    await asyncio.gather(classify_stage(), resolve_stage(), *(notify_stage() for _ in range(NOTIFY_WORKERS)))
+    return not classify_failed and unclassified == 0
@@ -0,0 +1,85 @@
+"""Model, prices and prompts shared by the classifier and the classifier engine.
+
+Kept free of LLM client imports so the entry points can load it cheaply.
+"""
+from typing import List
+
+MODEL_NAME = "gpt-4.1-mini"
+# USD per million (input, output) tokens, used to report LLM cost
+MODEL_PRICES_PER_MTOK = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+# Bump whenever the prompt changes so cached verdicts from the old prompt are not reused
+PROMPT_VERSION = "2"
+# Separates a title from the article context appended to it in prompts
+CONTEXT_SEPARATOR = " | Context: "
+
+PROMPT_TEMPLATE = """You are a news analyst. You will be given a news event title, possibly followed by context from the article.
+    You need to determine if the following specific triggering event has happened: "{triggering_event}"
+    
+    GUIDELINES:
+    - Respond 'True' ONLY if the event described in "{triggering_event}" has actually occurred as a confirmed fact in the news report title or its context.
+    - Respond 'False' for:
+        - Verbal threats, warnings, or predictions of the event.
+        - "Tensions rising" or "fears of" the event without it actually happening.
+        - Rumors or unsubstantiated claims.
+    
+    Respond with only 'True' if the event has happened, and 'False' otherwise.
+    
+    News Title: {title}
+    """
+
+# Rough characters-per-token ratio used to keep batches under the token budget
+CHARS_PER_TOKEN = 4
+
+BATCH_PROMPT_TEMPLATE = """You are a news analyst. You will be given a numbered list of news event titles, some followed by context from the article.
+    For each title, determine if the following specific triggering event has happened: "{triggering_event}"
+
+    GUIDELINES:
+    - Mark a title True ONLY if the event described in "{triggering_event}" has actually occurred as a confirmed fact in that news report title or its context.
+    - Mark a title False for:
+        - Verbal threats, warnings, or predictions of the event.
+        - "Tensions rising" or "fears of" the event without it actually happening.
+        - Rumors or unsubstantiated claims.
+    - Judge every title on its own. Return exactly one verdict per index.
+
+    {format_instructions}
+
+    News Titles:
+    {titles}
+    """
+
+
+def with_context(title: str, context: str = "") -> str:
+    """The text classified for a title: the title, plus its context on the same line if there is any."""
+    return f"{title}{CONTEXT_SEPARATOR}{context}" if context else title
+
+
+def title_of(text: str) -> str:
+    return text.split(CONTEXT_SEPARATOR, 1)[0]
+
+
+def number_titles(titles: List[str]) -> str:
+    return "\n".join(f"{i}. {title}" for i, title in enumerate(titles))
+
+
+def pack_batches(titles: List[str], max_batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """Group title indices into batches bounded by count and approximate token budget.
+
+    A single title that exceeds the token budget on its own still gets a batch.
+    """
+    batches = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, title in enumerate(titles):
+        tokens = len(title) // CHARS_PER_TOKEN + 4
+        if current and (len(current) >= max_batch_size or current_tokens + tokens > max_batch_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
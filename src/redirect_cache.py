@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class RedirectCache:
+    """On-disk map of long URL -> final URL after redirects, with expiry.
+
+    One instance is shared by the resolve, enrichment and notify threads, so
+    every use of the connection holds a lock.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS redirects (
+                url TEXT PRIMARY KEY,
+                final_url TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, resolved_at FROM redirects WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def put(self, url: str, final_url: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO redirects (url, final_url, resolved_at) VALUES (?, ?, ?)",
+                (url, final_url, time.time()),
+            )
+            self._conn.commit()
+
+    def compact(self) -> int:
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM redirects WHERE resolved_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        self._conn.close()
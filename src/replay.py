@@ -0,0 +1,320 @@
+"""Replay archived feeds through the pipeline for backfills and load tests.
+
+Streams the snapshots recorded with ``archive_feeds`` through the prefilter,
+bulk classification and notification stages. Notifications are only logged
+and written to ``--output`` unless ``--notify`` is given. Progress is
+checkpointed per watch and triggering event, so an interrupted replay resumes
+where it stopped.
+
+    python -m src.replay --since 2026-09-01 --triggering-event "..." --output matches.jsonl
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import IO, Iterable, List, Optional, Set
+
+from src.classification_cache import ClassificationCache
+from src.classifier_engine import ClassifierEngine
+from src.config import Config, Watch, load_config
+from src.enrichment import enrich_events
+from src.feed_archive import FeedArchive
+from src.metrics import metrics
+from src.normalize import title_hash
+from src.notifier import send_notification
+from src.processing import Stores, write_metrics
+from src.rss import NewsEvent, parse_rss_events
+
+# Entries per classify_many call; large enough to keep every batch and worker busy
+BULK_SIZE = 500
+
+
+def entry_key(event: NewsEvent) -> str:
+    return event.guid or event.link or title_hash(event.title)
+
+
+class ReplayCheckpoints:
+    """Per-replay progress: the last snapshot fully handled and the entries already decided.
+
+    Both are written in one transaction, so a replay resumed after a crash
+    neither skips nor repeats entries.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                name TEXT PRIMARY KEY,
+                snapshot_id INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS decided (
+                name TEXT NOT NULL,
+                entry_key TEXT NOT NULL,
+                PRIMARY KEY (name, entry_key)
+            )"""
+        )
+        self._conn.commit()
+
+    def position(self, name: str) -> int:
+        row = self._conn.execute("SELECT snapshot_id FROM checkpoints WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def is_decided(self, name: str, key: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM decided WHERE name = ? AND entry_key = ?", (name, key)).fetchone() is not None
+
+    def commit(self, name: str, snapshot_id: int, keys: Iterable[str]):
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO decided (name, entry_key) VALUES (?, ?)", [(name, key) for key in keys])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, snapshot_id, updated_at) VALUES (?, ?, ?)",
+                (name, snapshot_id, time.time()),
+            )
+
+    def reset(self, name: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE name = ?", (name,))
+            self._conn.execute("DELETE FROM decided WHERE name = ?", (name,))
+
+    def close(self):
+        self._conn.close()
+
+
+def checkpoint_name(watch: Watch) -> str:
+    """Replays of the same watch with a different triggering event keep separate progress."""
+    return f"{watch.name}:{hashlib.sha1(watch.triggering_event.encode('utf-8')).hexdigest()[:12]}"
+
+
+@dataclass
+class ReplayStats:
+    snapshots: int = 0
+    matched: int = 0
+    classified: int = 0
+    triggered: int = 0
+    unclassified: int = 0
+    elapsed_seconds: float = 0.0
+    completed: bool = False
+
+    @property
+    def entries_per_second(self) -> float:
+        return self.classified / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+async def replay(
+    archive: FeedArchive,
+    watch: Watch,
+    config: Config,
+    engine: ClassifierEngine,
+    checkpoints: ReplayCheckpoints,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    output: Optional[IO[str]] = None,
+    notify: bool = False,
+    bulk_size: int = BULK_SIZE,
+) -> ReplayStats:
+    """Replay a watch's archived snapshots from its checkpoint.
+
+    Parsing the next snapshots overlaps with classifying the previous bulk.
+    Stops early, without advancing the checkpoint past the failed bulk, if
+    some entries could not be classified; rerunning retries them.
+    """
+    name = checkpoint_name(watch)
+    stats = ReplayStats()
+    cutoff = since or datetime.min.replace(tzinfo=timezone.utc)
+    start = time.perf_counter()
+    # Keys of entries queued in this run; earlier runs are checked against the checkpoint store
+    queued: Set[str] = set()
+    pending: List[NewsEvent] = []
+    in_flight: Optional[asyncio.Task] = None
+
+    async def flush(events: List[NewsEvent], snapshot_id: int) -> bool:
+        contexts = None
+        if config.enrichment != "none":
+            # Archived descriptions only; today's copy of an article is not what was live then
+            contexts = enrich_events(events, "description", config.enrichment_max_chars)
+        with metrics.span("replay_bulk"):
+            verdicts = await engine.classify_many([event.title for event in events], watch.triggering_event, contexts)
+        failed = sum(verdict is None for verdict in verdicts)
+        if failed:
+            stats.unclassified += failed
+            logging.error(f"{failed} of {len(events)} entries could not be classified; stopping before snapshot {snapshot_id}")
+            return False
+        for event, is_triggered in zip(events, verdicts):
+            if not is_triggered:
+                continue
+            stats.triggered += 1
+            logging.info(f"TRIGGERED ({event.published.isoformat()}): {event.title}")
+            if output is not None:
+                output.write(json.dumps({
+                    "watch": watch.name,
+                    "triggering_event": watch.triggering_event,
+                    "title": event.title,
+                    "link": event.link,
+                    "published": event.published.isoformat(),
+                    "matched_rules": list(event.matched_rules),
+                }) + "\n")
+            if notify:
+                await asyncio.to_thread(
+                    send_notification,
+                    title=f"News Alert: {watch.keyword_filter}",
+                    message=event.title,
+                    url=event.link,
+                    user_keys=config.pushover_user_keys,
+                    api_token=config.pushover_api_token,
+                    collapse=config.pushover_collapse_recipients,
+                )
+        stats.classified += len(events)
+        checkpoints.commit(name, snapshot_id, [entry_key(event) for event in events])
+        return True
+
+    async def hand_off(snapshot_id: int) -> bool:
+        nonlocal in_flight, pending
+        if in_flight is not None and not await in_flight:
+            return False
+        in_flight = asyncio.create_task(flush(pending, snapshot_id))
+        pending = []
+        return True
+
+    snapshot_id = checkpoints.position(name)
+    snapshots = archive.snapshots(
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        feed_urls=[watch.rss_feed_url],
+        after_id=snapshot_id,
+    )
+    stopped = False
+    for snapshot in snapshots:
+        events = await asyncio.to_thread(
+            parse_rss_events,
+            snapshot.content,
+            snapshot.content_type,
+            cutoff,
+            watch.keyword_filter,
+            config.streaming_parse,
+            False,
+            watch.prefilter,
+        )
+        stats.snapshots += 1
+        stats.matched += len(events)
+        for event in events:
+            key = entry_key(event)
+            if (until is not None and event.published >= until) or key in queued or checkpoints.is_decided(name, key):
+                continue
+            queued.add(key)
+            pending.append(event)
+        snapshot_id = snapshot.id
+        if len(pending) >= bulk_size and not await hand_off(snapshot_id):
+            stopped = True
+            break
+
+    if not stopped:
+        stopped = not await hand_off(snapshot_id) or not await in_flight
+    stats.completed = not stopped
+    stats.elapsed_seconds = time.perf_counter() - start
+    return stats
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", help="ISO date or time; only entries published from then on")
+    parser.add_argument("--until", help="ISO date or time; only entries published before then")
+    parser.add_argument("--watch", help="replay only the watch with this name")
+    parser.add_argument("--triggering-event", help="classify against this event instead of the watch's own")
+    parser.add_argument("--output", help="append triggered entries to this JSON-lines file")
+    parser.add_argument("--notify", action="store_true", help="send real notifications instead of a dry run")
+    parser.add_argument("--bulk-size", type=int, default=BULK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint and start over")
+    parser.add_argument(
+        "--record-labels",
+        action="store_true",
+        help="add the replay's verdicts to the labels the prescreen is trained on",
+    )
+    parser.add_argument("--stats", action="store_true", help="only print archive statistics")
+    return parser.parse_args(argv)
+
+
+async def run_replay(config: Config, args) -> List[ReplayStats]:
+    watches = config.get_watches()
+    if args.watch is not None:
+        watches = [watch for watch in watches if watch.name == args.watch]
+        if not watches:
+            raise ValueError(f"No watch named '{args.watch}'")
+    if args.triggering_event:
+        watches = [replace(watch, triggering_event=args.triggering_event) for watch in watches]
+
+    stores = Stores(replace(config, archive_feeds=True))
+    checkpoints = ReplayCheckpoints(os.path.join(config.state_dir, "replay.sqlite3"))
+    # Verdicts against a backfilled or trial triggering event stay out of the live cache,
+    # and out of the prescreen's training labels unless asked for
+    cache = ClassificationCache(
+        max_entries=config.classification_cache_max_entries,
+        ttl_seconds=config.classification_cache_ttl_hours * 3600,
+        path=os.path.join(config.state_dir, "replay_classifications.sqlite3"),
+    )
+    engine = ClassifierEngine(config, cache=cache, labels=stores.labels if args.record_labels else None)
+    output = open(args.output, "a") if args.output else None
+    results = []
+    try:
+        for watch in watches:
+            if args.restart:
+                checkpoints.reset(checkpoint_name(watch))
+            logging.info(f"Replaying '{watch.name}' against: {watch.triggering_event}")
+            results.append(await replay(
+                stores.archive, watch, config, engine, checkpoints,
+                since=_parse_time(args.since),
+                until=_parse_time(args.until),
+                output=output,
+                notify=args.notify,
+                bulk_size=args.bulk_size,
+            ))
+    finally:
+        if output is not None:
+            output.close()
+        await engine.aclose()
+        cache.close()
+        checkpoints.close()
+        stores.close()
+    return results
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    config = load_config()
+    if args.stats:
+        archive = FeedArchive(os.path.join(config.state_dir, "archive"))
+        print(json.dumps(archive.stats(), indent=2))
+        archive.close()
+        return
+
+    with metrics.span("run"):
+        results = asyncio.run(run_replay(config, args))
+    write_metrics(config)
+    for stats in results:
+        state = "complete" if stats.completed else "stopped early, rerun to resume"
+        print(
+            f"{stats.snapshots} snapshots, {stats.matched} matching entries, {stats.classified} classified, "
+            f"{stats.triggered} triggered in {stats.elapsed_seconds:.1f}s ({stats.entries_per_second:.0f} entries/s); {state}"
+        )
+
+
+if __name__ == "__main__":
+    main()
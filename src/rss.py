@@ -1,54 +1,287 @@
-import feedparser
+import hashlib
+import io
+import logging
+import time
+import requests
+import xml.etree.ElementTree as ElementTree
 from datetime import datetime, timedelta, timezone
-from dateutil import parser as date_parser
-from typing import List, Optional
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
-from bs4 import BeautifulSoup
+from src.feed_archive import FeedArchive
+from src.feed_state import FeedState, FeedStateStore
+from src.html_text import html_to_text
+from src.metrics import metrics
+from src.prefilter import Prefilter
 
-@dataclass
+FEED_TIMEOUT = (3.05, 15)
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+_session: Optional[requests.Session] = None
+
+@dataclass(slots=True)
 class NewsEvent:
     title: str
     link: str
     description: str
     published: datetime
+    guid: str = ""
+    # Prefilter rules that let the event through
+    matched_rules: Tuple[str, ...] = ()
 
 def strip_html(html_content: str) -> str:
-    if not html_content:
-        return ""
-    return BeautifulSoup(html_content, "html.parser").get_text(separator=" ", strip=True)
+    return html_to_text(html_content)
 
-def fetch_rss_events(feed_url: str, lookback_minutes: int, keyword_filter: Optional[str] = None) -> List[NewsEvent]:
-    feed = feedparser.parse(feed_url)
-    events = []
-    
-    now = datetime.now(timezone.utc)
-    cutoff_time = now - timedelta(minutes=lookback_minutes)
+def parse_feed_date(value: str) -> datetime:
+    """Parse an entry date into an aware datetime.
+
+    RSS (RFC 822) and Atom (RFC 3339) dates take a fast stdlib path; anything
+    else falls back to dateutil. Naive dates are assumed to be UTC.
 
-    for entry in feed.entries:
-        # Parse published date. Handle different formats if needed, but dateutil is robust.
+    Raises:
+        ValueError: If the date cannot be parsed.
+    """
+    try:
+        published = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
         try:
-            published_time = date_parser.parse(entry.published)
-            # Ensure timezone awareness
-            if published_time.tzinfo is None:
-                published_time = published_time.replace(tzinfo=timezone.utc)
-        except (AttributeError, ValueError):
-            continue # Skip if no date found
+            published = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            from dateutil import parser as date_parser
 
-        if published_time < cutoff_time:
+            published = date_parser.parse(value)
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def _child_text(element, *names: str) -> str:
+    for child in element:
+        if _local_name(child.tag) in names:
+            return (child.text or "").strip()
+    return ""
+
+def _atom_link(element) -> str:
+    for child in element:
+        if child.tag == ATOM_NS + "link" and child.get("rel", "alternate") == "alternate":
+            return child.get("href", "")
+    return ""
+
+def iter_rss_events(
+    source: bytes,
+    cutoff_time: datetime,
+    keyword_filter: Optional[str] = None,
+    date_ordered: bool = False,
+    prefilter: Optional[Prefilter] = None,
+) -> Iterator[NewsEvent]:
+    """Incrementally parse an RSS or Atom document, yielding matching events as they are read.
+
+    Each item is filtered by keyword and cutoff as soon as its closing tag is
+    seen and then discarded, so the document tree is never fully built. With
+    date_ordered=True (newest entries first), parsing stops at the first entry
+    older than the cutoff.
+    """
+    parents = []
+    for event, element in ElementTree.iterparse(io.BytesIO(source), events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        name = _local_name(element.tag)
+        if name not in ("item", "entry"):
             continue
 
-        title = entry.get("title", "")
+        title = _child_text(element, "title")
+        date_text = _child_text(element, "pubDate", "published", "updated")
+        link = _child_text(element, "link") if name == "item" else _atom_link(element)
+        guid = _child_text(element, "guid", "id")
+        description = _child_text(element, "description", "summary")
+        # Drop the finished item so memory stays flat on large feeds
+        if parents:
+            parents[-1].remove(element)
+        metrics.inc("entries_seen")
 
-        if keyword_filter:
-            if keyword_filter.lower() not in title.lower():
-                continue
+        try:
+            published_time = parse_feed_date(date_text)
+        except (ValueError, OverflowError):
+            continue
 
-        events.append(NewsEvent(
+        if published_time < cutoff_time:
+            if date_ordered:
+                return
+            continue
+
+        description = strip_html(description)
+        matched_rules = prefilter_rules(prefilter_text(title, description), keyword_filter, prefilter)
+        if matched_rules is None:
+            continue
+
+        yield NewsEvent(
             title=title,
-            link=entry.get("link", ""),
-            description="",
-            published=published_time
+            link=link,
+            description=description,
+            published=published_time,
+            guid=guid,
+            matched_rules=matched_rules
+        )
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update({"Accept-Encoding": "gzip, deflate", "User-Agent": "news-event-trigger"})
+        _session.mount("https://", HTTPAdapter(pool_maxsize=4))
+        _session.mount("http://", HTTPAdapter(pool_maxsize=4))
+    return _session
+
+def fetch_feed(feed_url: str, state_store: Optional[FeedStateStore] = None, session: Optional[requests.Session] = None) -> Optional[requests.Response]:
+    """Download a feed, conditionally if validators from a previous run are known.
+
+    Returns:
+        The response, or None if the feed is unchanged (304 or identical body).
+        New validators are staged on state_store and persisted by its commit().
+    """
+    session = session or _get_session()
+    headers = {}
+    previous = state_store.get(feed_url) if state_store is not None else FeedState()
+    if previous.etag:
+        headers["If-None-Match"] = previous.etag
+    if previous.last_modified:
+        headers["If-Modified-Since"] = previous.last_modified
+
+    with metrics.span("feed_fetch"):
+        response = session.get(feed_url, headers=headers, timeout=FEED_TIMEOUT)
+    metrics.inc("feed_fetches")
+    metrics.inc("feed_bytes", len(response.content))
+    if response.status_code == 304:
+        logging.info("Feed not modified (304)")
+        metrics.inc("feed_not_modified")
+        return None
+    response.raise_for_status()
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    if state_store is not None:
+        state_store.stage(feed_url, FeedState(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_hash=content_hash,
+            high_water_mark=previous.high_water_mark,
         ))
+    if content_hash == previous.content_hash:
+        logging.info("Feed body unchanged since last run")
+        metrics.inc("feed_not_modified")
+        return None
+    return response
+
+def prefilter_text(title: str, description: str = "") -> str:
+    """The text an entry is prefiltered on: its title and, on its own line, its description."""
+    return f"{title}\n{description}" if description else title
+
+def prefilter_rules(text: str, keyword_filter: Optional[str] = None, prefilter: Optional[Prefilter] = None) -> Optional[Tuple[str, ...]]:
+    """Rules that let text through, or None if it is filtered out.
+
+    A compiled prefilter takes precedence over the plain keyword substring test.
+    """
+    start = time.perf_counter()
+    if prefilter is not None:
+        match = prefilter.match(text)
+        rules = tuple(match.rules) if match else None
+    elif not keyword_filter:
+        rules = ()
+    else:
+        rules = (keyword_filter,) if keyword_filter.lower() in text.lower() else None
+    metrics.observe("prefilter", time.perf_counter() - start)
+    metrics.inc("entries_matched" if rules is not None else "entries_filtered_out")
+    return rules
+
+def fetch_rss_events(
+    feed_url: str,
+    lookback_minutes: int,
+    keyword_filter: Optional[str] = None,
+    state_store: Optional[FeedStateStore] = None,
+    since: Optional[datetime] = None,
+    streaming: bool = False,
+    date_ordered: bool = False,
+    prefilter: Optional[Prefilter] = None,
+    archive: Optional[FeedArchive] = None,
+) -> Optional[List[NewsEvent]]:
+    """Fetch a feed and return its recent entries matching keyword_filter (or prefilter).
+
+    Entries older than ``since``, or than lookback_minutes if since is not
+    given, are dropped. With streaming=True the document is parsed
+    incrementally by iter_rss_events instead of feedparser. Every changed body
+    is also recorded in ``archive`` if one is given. Returns None if the feed
+    has not changed since the last committed run.
+    """
+    response = fetch_feed(feed_url, state_store)
+    if response is None:
+        return None
+    if archive is not None:
+        try:
+            archive.append(feed_url, response.content, response.headers.get("Content-Type", ""))
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to archive feed {feed_url}: {e}")
+
+    now = datetime.now(timezone.utc)
+    cutoff_time = since if since is not None else now - timedelta(minutes=lookback_minutes)
+    return parse_rss_events(
+        response.content,
+        response.headers.get("Content-Type", ""),
+        cutoff_time,
+        keyword_filter,
+        streaming,
+        date_ordered,
+        prefilter,
+    )
+
+def parse_rss_events(
+    content: bytes,
+    content_type: str,
+    cutoff_time: datetime,
+    keyword_filter: Optional[str] = None,
+    streaming: bool = False,
+    date_ordered: bool = False,
+    prefilter: Optional[Prefilter] = None,
+) -> List[NewsEvent]:
+    """Parse a fetched feed body into its entries newer than cutoff_time that pass the filter."""
+    with metrics.span("feed_parse"):
+        if streaming:
+            return list(iter_rss_events(content, cutoff_time, keyword_filter, date_ordered, prefilter))
+
+        import feedparser
+
+        feed = feedparser.parse(content, response_headers={"content-type": content_type})
+        metrics.inc("entries_seen", len(feed.entries))
+        events = []
+
+        for entry in feed.entries:
+            # Parse published date. RFC 822 takes the fast path, dateutil handles the rest.
+            try:
+                published_time = parse_feed_date(entry.published)
+            except (AttributeError, ValueError, OverflowError):
+                continue # Skip if no date found
+
+            if published_time < cutoff_time:
+                continue
+
+            title = entry.get("title", "")
+            description = strip_html(entry.get("summary", ""))
+
+            matched_rules = prefilter_rules(prefilter_text(title, description), keyword_filter, prefilter)
+            if matched_rules is None:
+                continue
+
+            events.append(NewsEvent(
+                title=title,
+                link=entry.get("link", ""),
+                description=description,
+                published=published_time,
+                guid=entry.get("id", ""),
+                matched_rules=matched_rules
+            ))
     
-    return events
+        return events
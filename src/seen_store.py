@@ -0,0 +1,86 @@
+import logging
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+from src.normalize import title_hash
+from src.rss import NewsEvent
+
+
+class SeenStore:
+    """On-disk record of entries that were already classified.
+
+    Entries are keyed by their feed GUID (falling back to the link) and by a
+    hash of the normalized title, so an article that stays inside the lookback
+    window across runs, or is re-published under a new link with the same
+    headline, is only classified and notified once.
+
+    Stores opened with different ``namespace`` values on the same file (one
+    per watch) keep independent decisions.
+    """
+
+    def __init__(self, path: str, retention_hours: int = 48, namespace: str = ""):
+        self.path = path
+        self.retention_hours = retention_hours
+        self._prefix = f"{namespace}:" if namespace else ""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS seen (
+                entry_key TEXT PRIMARY KEY,
+                title_hash TEXT NOT NULL,
+                triggered INTEGER NOT NULL,
+                decided_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seen_title_hash ON seen (title_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seen_decided_at ON seen (decided_at)")
+        self._conn.commit()
+
+    def entry_key(self, event: NewsEvent) -> str:
+        return self._prefix + (event.guid or event.link or title_hash(event.title))
+
+    def _title_hash(self, event: NewsEvent) -> str:
+        return self._prefix + title_hash(event.title)
+
+    def is_seen(self, event: NewsEvent) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM seen WHERE entry_key = ? OR title_hash = ? LIMIT 1",
+            (self.entry_key(event), self._title_hash(event)),
+        ).fetchone()
+        return row is not None
+
+    def filter_unseen(self, events: Iterable[NewsEvent]) -> List[NewsEvent]:
+        """Return events not decided before, also dropping repeats within the batch."""
+        unseen = []
+        batch_keys = set()
+        for event in events:
+            keys = (self.entry_key(event), self._title_hash(event))
+            if keys[0] in batch_keys or keys[1] in batch_keys or self.is_seen(event):
+                continue
+            batch_keys.update(keys)
+            unseen.append(event)
+        return unseen
+
+    def mark(self, event: NewsEvent, triggered: bool, decided_at: Optional[float] = None):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO seen (entry_key, title_hash, triggered, decided_at) VALUES (?, ?, ?, ?)",
+            (self.entry_key(event), self._title_hash(event), int(triggered), decided_at or time.time()),
+        )
+        self._conn.commit()
+
+    def compact(self, vacuum: bool = True) -> int:
+        """Drop entries older than the retention window. Returns the number removed."""
+        cutoff = time.time() - self.retention_hours * 3600
+        removed = self._conn.execute("DELETE FROM seen WHERE decided_at < ?", (cutoff,)).rowcount
+        self._conn.commit()
+        if removed and vacuum:
+            self._conn.execute("VACUUM")
+        logging.info(f"Seen store compacted: removed {removed} entries older than {self.retention_hours}h")
+        return removed
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import struct
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from src.normalize import normalize_title, title_hash
+from src.rss import NewsEvent
+
+# Mersenne prime for the universal hash family; token hashes are reduced below it
+_PRIME = (1 << 61) - 1
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or says that the to was were will with".split()
+)
+
+
+def shingles(title: str) -> FrozenSet[str]:
+    """Content words of the normalized title."""
+    words = normalize_title(title).split()
+    content = frozenset(w for w in words if w not in _STOPWORDS)
+    return content or frozenset(words)
+
+
+class MinHasher:
+    """MinHash signatures: the fraction of equal slots estimates Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, tokens: FrozenSet[str]) -> Tuple[int, ...]:
+        if not tokens:
+            return (_PRIME,) * self.num_perm
+        hashes = [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "big") % _PRIME for t in tokens]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class LshIndex:
+    """Banded locality-sensitive hash index over MinHash signatures.
+
+    Signatures sharing every slot of at least one band are candidates. With
+    ``bands`` bands of ``rows`` slots, pairs above roughly
+    (1 / bands) ** (1 / rows) Jaccard similarity are very likely to collide.
+    """
+
+    def __init__(self, bands: int, rows: int):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+
+    def _band_keys(self, signature: Sequence[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key: str, signature: Sequence[int]):
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].append(key)
+
+    def candidates(self, signature: Sequence[int]) -> List[str]:
+        found = {}
+        for band_key in self._band_keys(signature):
+            for key in self._buckets.get(band_key, ()):
+                found[key] = None
+        return list(found)
+
+
+@dataclass
+class StoryCluster:
+    """Near-duplicate events of one story, notified through ``representative``."""
+    representative: NewsEvent
+    members: List[NewsEvent] = field(default_factory=list)
+    # The story continues one that triggered (and was notified) in an earlier run
+    notified_before: bool = False
+    signature: Tuple[int, ...] = ()
+
+
+class StoryIndex:
+    """Groups near-duplicate headlines within a run and against recent stories.
+
+    Titles are reduced to MinHash signatures of their content words and
+    indexed with LSH, so each event is compared only against likely matches.
+    Triggered stories are kept on disk for ``retention_hours`` so a story that
+    keeps being syndicated across runs is recognized and not re-notified.
+    Headlines that merely look alike can report different things (a threat
+    and the attack itself), so clusters only ever dedupe notifications; every
+    member is still classified on its own.
+    Stores opened with different ``namespace`` values on the same file (one
+    per watch) keep independent stories.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        retention_hours: int = 48,
+        namespace: str = "",
+        threshold: float = 0.5,
+        num_perm: int = 128,
+        bands: int = 32,
+    ):
+        self.retention_hours = retention_hours
+        self.namespace = namespace
+        self.threshold = threshold
+        self._hasher = MinHasher(num_perm)
+        self._rows = num_perm // bands
+        self._bands = bands
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS stories (
+                namespace TEXT NOT NULL,
+                story_key TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                triggered INTEGER NOT NULL,
+                decided_at REAL NOT NULL,
+                PRIMARY KEY (namespace, story_key)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS stories_decided_at ON stories (decided_at)")
+        self._conn.commit()
+
+        self._history = LshIndex(bands, self._rows)
+        # story_key -> (signature, triggered, decided_at)
+        self._known: Dict[str, Tuple[Tuple[int, ...], bool, float]] = {}
+        rows = self._conn.execute(
+            "SELECT story_key, signature, triggered, decided_at FROM stories WHERE namespace = ? AND decided_at >= ?",
+            (namespace, self._cutoff()),
+        )
+        for story_key, blob, triggered, decided_at in rows:
+            signature = self._unpack(blob)
+            if len(signature) == num_perm:
+                self._remember(story_key, signature, bool(triggered), decided_at)
+
+    def _cutoff(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.retention_hours * 3600
+
+    def _unpack(self, blob: bytes) -> Tuple[int, ...]:
+        return struct.unpack(f"<{len(blob) // 8}Q", blob)
+
+    def _remember(self, story_key: str, signature: Tuple[int, ...], triggered: bool, decided_at: float):
+        if story_key not in self._known:
+            self._history.add(story_key, signature)
+        self._known[story_key] = (signature, triggered, decided_at)
+
+    def _best(self, signature: Tuple[int, ...], candidates: List[str], signatures) -> Optional[str]:
+        best, best_score = None, self.threshold
+        for key in candidates:
+            score = similarity(signature, signatures(key))
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def cluster(self, events: List[NewsEvent], now: Optional[float] = None) -> List[StoryCluster]:
+        """Group events into stories, in order of each story's first event."""
+        cutoff = self._cutoff(now)
+        clusters: Dict[str, StoryCluster] = {}
+        run_index = LshIndex(self._bands, self._rows)
+        for event in events:
+            signature = self._hasher.signature(shingles(event.title))
+            match = self._best(signature, run_index.candidates(signature), lambda key: clusters[key].signature)
+            if match is not None:
+                clusters[match].members.append(event)
+                continue
+
+            key = str(len(clusters))
+            cluster = StoryCluster(representative=event, members=[event], signature=signature)
+            # Only triggered stories count: a similar headline that did not trigger says nothing about this one
+            notified = [
+                k for k in self._history.candidates(signature) if self._known[k][1] and self._known[k][2] >= cutoff
+            ]
+            cluster.notified_before = self._best(signature, notified, lambda k: self._known[k][0]) is not None
+            clusters[key] = cluster
+            run_index.add(key, signature)
+
+        stories = list(clusters.values())
+        logging.info(f"Grouped {len(events)} events into {len(stories)} stories")
+        return stories
+
+    def record(self, cluster: StoryCluster, triggered: bool, decided_at: Optional[float] = None):
+        """Remember a decided story so later runs recognize its copies."""
+        story_key = title_hash(cluster.representative.title)
+        decided_at = decided_at or time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO stories (namespace, story_key, signature, triggered, decided_at) VALUES (?, ?, ?, ?, ?)",
+            (
+                self.namespace,
+                story_key,
+                struct.pack(f"<{len(cluster.signature)}Q", *cluster.signature),
+                int(triggered),
+                decided_at,
+            ),
+        )
+        self._conn.commit()
+        self._remember(story_key, cluster.signature, triggered, decided_at)
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Drop stories older than the retention window, on disk and in memory. Returns the number removed from disk."""
+        cutoff = self._cutoff(now)
+        removed = self._conn.execute("DELETE FROM stories WHERE decided_at < ?", (cutoff,)).rowcount
+        self._conn.commit()
+        expired = [key for key, (_, _, decided_at) in self._known.items() if decided_at < cutoff]
+        if expired:
+            for key in expired:
+                del self._known[key]
+            self._history = LshIndex(self._bands, self._rows)
+            for key, (signature, _, _) in self._known.items():
+                self._history.add(key, signature)
+        return removed
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,317 @@
+"""WebSub (PubSubHubbub) subscriber: hub discovery, subscriptions and the push callback server."""
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from src.metrics import metrics
+
+DEFAULT_LEASE_SECONDS = 86400
+# Subscriptions are renewed once less than this fraction of the lease is left
+RENEW_FRACTION = 0.2
+# Pushed bodies larger than this are rejected; a delta is normally a few entries
+MAX_CONTENT_BYTES = 5 * 1024 * 1024
+HUB_TIMEOUT = (3.05, 15)
+_SIGNATURE_ALGORITHMS = {
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "sha384": hashlib.sha384,
+    "sha512": hashlib.sha512,
+}
+
+# on_content(feed_url, body, content_type), called from the callback server's threads
+ContentHandler = Callable[[str, bytes, str], None]
+
+
+def discover_hub(content: bytes, feed_url: str, link_header: str = "") -> Optional[Tuple[str, str]]:
+    """The (hub, topic) a feed advertises, or None if it has no hub.
+
+    HTTP Link headers take precedence over <link rel="hub"/"self"> elements in
+    the document. Without a self link, the feed URL is the topic.
+    """
+    hub = topic = None
+    for link in requests.utils.parse_header_links(link_header) if link_header else []:
+        rels = link.get("rel", "").split()
+        if "hub" in rels and hub is None:
+            hub = link.get("url")
+        if "self" in rels and topic is None:
+            topic = link.get("url")
+    if hub is None:
+        try:
+            root = ElementTree.fromstring(content)
+        except ElementTree.ParseError:
+            return None
+        for element in root.iter():
+            if element.tag.rsplit("}", 1)[-1] != "link" or not element.get("href"):
+                continue
+            rels = element.get("rel", "").split()
+            if "hub" in rels and hub is None:
+                hub = element.get("href")
+            if "self" in rels and topic is None:
+                topic = element.get("href")
+    if hub is None:
+        return None
+    return hub, topic or feed_url
+
+
+def verify_signature(secret: str, body: bytes, header: Optional[str]) -> bool:
+    """Check an X-Hub-Signature header ("sha256=<hex>") against the body."""
+    if not header or "=" not in header:
+        return False
+    algorithm, _, signature = header.partition("=")
+    digest = _SIGNATURE_ALGORITHMS.get(algorithm.strip().lower())
+    if digest is None:
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, digest).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+@dataclass
+class Subscription:
+    topic: str
+    hub: str
+    feed_url: str
+    secret: str
+    # Set once the hub has verified the subscription
+    lease_expires: Optional[float] = None
+
+    @property
+    def callback_id(self) -> str:
+        return hashlib.sha1(self.topic.encode("utf-8")).hexdigest()[:16]
+
+
+class WebSubReceiver:
+    """Subscribes to feed hubs and serves the callback they verify and push to.
+
+    Each subscription gets its own callback path and HMAC secret. Pushes with a
+    valid signature are passed to ``on_content``; unsigned or forged ones are
+    acknowledged, as the spec requires, and dropped. Subscriptions are kept in
+    SQLite so a restart keeps its secrets and leases.
+    """
+
+    def __init__(
+        self,
+        callback_url: str,
+        store_path: str,
+        on_content: ContentHandler,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        session: Optional[requests.Session] = None,
+    ):
+        self.callback_url = callback_url.rstrip("/")
+        self.on_content = on_content
+        self.host = host
+        self.port = port
+        self.lease_seconds = lease_seconds
+        self.session = session or requests.Session()
+        directory = os.path.dirname(store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS subscriptions (
+                topic TEXT PRIMARY KEY,
+                hub TEXT NOT NULL,
+                feed_url TEXT NOT NULL,
+                secret TEXT NOT NULL,
+                lease_expires REAL
+            )"""
+        )
+        self._conn.commit()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _subscriptions(self) -> List[Subscription]:
+        with self._lock:
+            rows = self._conn.execute("SELECT topic, hub, feed_url, secret, lease_expires FROM subscriptions").fetchall()
+        return [Subscription(*row) for row in rows]
+
+    def _by_callback(self, callback_id: str) -> Optional[Subscription]:
+        return next((s for s in self._subscriptions() if s.callback_id == callback_id), None)
+
+    def _save(self, subscription: Subscription):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO subscriptions (topic, hub, feed_url, secret, lease_expires) VALUES (?, ?, ?, ?, ?)",
+                (subscription.topic, subscription.hub, subscription.feed_url, subscription.secret, subscription.lease_expires),
+            )
+            self._conn.commit()
+
+    def _delete(self, topic: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM subscriptions WHERE topic = ?", (topic,))
+            self._conn.commit()
+
+    def callback_for(self, subscription: Subscription) -> str:
+        return f"{self.callback_url}/websub/{subscription.callback_id}"
+
+    def subscribe(self, feed_url: str, hub: str, topic: str) -> bool:
+        """Ask the hub for a subscription. The hub verifies it asynchronously through the callback.
+
+        Returns:
+            True if the hub accepted the request.
+        """
+        existing = next((s for s in self._subscriptions() if s.topic == topic), None)
+        subscription = Subscription(
+            topic=topic,
+            hub=hub,
+            feed_url=feed_url,
+            secret=existing.secret if existing else secrets.token_hex(32),
+            lease_expires=existing.lease_expires if existing else None,
+        )
+        self._save(subscription)
+        try:
+            response = self.session.post(hub, data={
+                "hub.mode": "subscribe",
+                "hub.topic": topic,
+                "hub.callback": self.callback_for(subscription),
+                "hub.lease_seconds": str(self.lease_seconds),
+                "hub.secret": subscription.secret,
+            }, timeout=HUB_TIMEOUT)
+        except requests.RequestException as e:
+            logging.warning(f"WebSub subscription to {hub} for {topic} failed: {e}")
+            return False
+        if response.status_code not in (202, 204):
+            logging.warning(f"WebSub hub {hub} refused subscription for {topic}: HTTP {response.status_code}")
+            return False
+        logging.info(f"Requested WebSub subscription for {topic} from {hub}")
+        return True
+
+    def is_subscribed(self, feed_url: str, now: Optional[float] = None) -> bool:
+        """Whether a verified, unexpired subscription delivers this feed."""
+        now = now or time.time()
+        return any(s.feed_url == feed_url and s.lease_expires and s.lease_expires > now for s in self._subscriptions())
+
+    def due_for_renewal(self, now: Optional[float] = None) -> List[Subscription]:
+        now = now or time.time()
+        return [
+            s for s in self._subscriptions()
+            if s.lease_expires is not None and s.lease_expires - now < self.lease_seconds * RENEW_FRACTION
+        ]
+
+    def handle_verification(self, callback_id: str, query: Dict[str, str]) -> Tuple[int, bytes]:
+        """Answer a hub's intent verification (or denial) GET."""
+        subscription = self._by_callback(callback_id)
+        mode = query.get("hub.mode")
+        topic = query.get("hub.topic")
+        if mode == "denied":
+            if subscription is not None and subscription.topic == topic:
+                logging.warning(f"WebSub hub denied subscription for {topic}: {query.get('hub.reason', '')}")
+                self._delete(topic)
+            return 200, b""
+        if subscription is None or subscription.topic != topic or "hub.challenge" not in query:
+            return 404, b""
+        if mode == "subscribe":
+            try:
+                lease = int(query.get("hub.lease_seconds", self.lease_seconds))
+            except ValueError:
+                lease = self.lease_seconds
+            subscription.lease_expires = time.time() + lease
+            self._save(subscription)
+            logging.info(f"WebSub subscription for {topic} verified for {lease}s")
+            return 200, query["hub.challenge"].encode("utf-8")
+        # We never unsubscribe while a subscription is wanted
+        return 404, b""
+
+    def handle_content(self, callback_id: str, body: bytes, content_type: str, signature: Optional[str]) -> int:
+        """Accept a content distribution POST and pass it on if its signature checks out."""
+        subscription = self._by_callback(callback_id)
+        if subscription is None:
+            return 410
+        if not verify_signature(subscription.secret, body, signature):
+            logging.warning(f"Dropping WebSub push for {subscription.topic} with a missing or invalid signature")
+            metrics.inc("websub_rejected")
+            return 202
+        metrics.inc("websub_pushes")
+        metrics.inc("websub_push_bytes", len(body))
+        try:
+            self.on_content(subscription.feed_url, body, content_type)
+        except Exception as e:
+            logging.error(f"Failed to handle WebSub push for {subscription.topic}: {e}")
+        return 202
+
+    def start(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _callback_id(self) -> Optional[str]:
+                parts = urlparse(self.path).path.strip("/").split("/")
+                return parts[1] if len(parts) == 2 and parts[0] == "websub" else None
+
+            def _reply(self, status: int, body: bytes = b""):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                callback_id = self._callback_id()
+                if callback_id is None:
+                    self._reply(404)
+                    return
+                query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                self._reply(*receiver.handle_verification(callback_id, query))
+
+            def do_POST(self):
+                callback_id = self._callback_id()
+                if callback_id is None:
+                    self._reply(404)
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Reading a negative length would block until the client hangs up
+                    self._reply(400)
+                    return
+                if length > MAX_CONTENT_BYTES:
+                    self._reply(413)
+                    return
+                body = self.rfile.read(length)
+                self._reply(receiver.handle_content(
+                    callback_id, body, self.headers.get("Content-Type", ""), self.headers.get("X-Hub-Signature"),
+                ))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"WebSub callback listening on {self.host}:{self.port}, published as {self.callback_url}")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def close(self):
+        self.stop()
+        self._conn.close()
+        self.session.close()
+
+
+def discover_feed_hub(feed_url: str, session: Optional[requests.Session] = None) -> Optional[Tuple[str, str]]:
+    """Fetch a feed once and return the (hub, topic) it advertises, if any."""
+    if session is None:
+        with requests.Session() as own_session:
+            return discover_feed_hub(feed_url, own_session)
+    response = session.get(feed_url, timeout=HUB_TIMEOUT)
+    response.raise_for_status()
+    return discover_hub(response.content, feed_url, response.headers.get("Link", ""))
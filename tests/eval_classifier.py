@@ -1,117 +1,370 @@
 import os
 import sys
+import json
+import time
+import hashlib
+import argparse
 import asyncio
-from typing import List, Tuple
-from dataclasses import dataclass
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, Field
+import itertools
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import asdict, dataclass, field
+
+import requests
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.classifier import classify_event
+from src.classifier_engine import ClassifierEngine
 from src.config import Config
+from src.metrics import metrics
+from src.prompts import MODEL_NAME, PROMPT_VERSION
+from benchmarks.openai_stub import OpenAIStub
+
+# Labeled cases live in git, so the dataset is versioned with the code and only grows
+DATASET_PATH = os.path.join(os.path.dirname(__file__), "eval_cases.jsonl")
+TRIGGERING_EVENT = "Military confrontation between Iran and US or Israel has occurred"
+GENERATOR_MODEL = "gpt-4.1"
+# Cases requested per generation call; larger requests come back truncated or repetitive
+GENERATION_CHUNK = 25
+OPENAI_API_BASE = "https://api.openai.com/v1"
+
+
+@dataclass
+class EvalCase:
+    title: str
+    triggering_event: str
+    label: bool
+
+
+def load_dataset(path: str) -> List[EvalCase]:
+    """Cases from a JSON-lines file of {title, triggering_event, label}, the format `python -m src.prescreen --cases` reads."""
+    if not os.path.exists(path):
+        return []
+    cases = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                case = json.loads(line)
+                cases.append(EvalCase(case["title"], case.get("triggering_event", TRIGGERING_EVENT), bool(case["label"])))
+    return cases
+
 
-NUM_CASES = 10
+def dataset_version(cases: Sequence[EvalCase]) -> str:
+    """Content hash identifying exactly which cases a result was measured on."""
+    digest = hashlib.sha256()
+    for case in sorted(cases, key=lambda c: (c.triggering_event, c.title)):
+        digest.update(json.dumps(asdict(case), sort_keys=True).encode("utf-8"))
+    return f"{len(cases)}-{digest.hexdigest()[:12]}"
 
-# Define Pydantic model for test case generation
-class NewsTestCase(BaseModel):
-    title: str = Field(description="The news event title")
-  #  description: str = Field(description="The news event description")
-    expected_classification: bool = Field(description="True if the event matches the trigger, False otherwise")
 
-class TestCases(BaseModel):
-    cases: List[NewsTestCase]
+def save_cases(path: str, triggering_event: str, titles: Sequence[Tuple[str, bool]]) -> int:
+    """Append labeled titles the dataset does not have yet; returns how many were added."""
+    known = {(case.triggering_event, case.title.strip().lower()) for case in load_dataset(path)}
+    added = 0
+    with open(path, "a") as f:
+        for title, label in titles:
+            key = (triggering_event, title.strip().lower())
+            if key in known:
+                continue
+            known.add(key)
+            f.write(json.dumps({"title": title.strip(), "triggering_event": triggering_event, "label": label}) + "\n")
+            added += 1
+    return added
+
+
+def generate_test_cases(triggering_event: str, num_cases: int) -> List[Tuple[str, bool]]:
+    from langchain_openai import ChatOpenAI
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import PydanticOutputParser
+    from pydantic import BaseModel, Field
+
+    # Define Pydantic model for test case generation
+    class NewsTestCase(BaseModel):
+        title: str = Field(description="The news event title")
+        expected_classification: bool = Field(description="True if the event matches the trigger, False otherwise")
+
+    class TestCases(BaseModel):
+        cases: List[NewsTestCase]
+
+    llm = ChatOpenAI(model_name=GENERATOR_MODEL, temperature=0.7)
 
-def generate_test_cases(triggering_event: str, num_cases: int) -> List[NewsTestCase]:
-    llm = ChatOpenAI(model_name="gpt-4.1", temperature=0.7)
-    
     parser = PydanticOutputParser(pydantic_object=TestCases)
-    
+
     prompt = PromptTemplate(
         template="""You are an expert news analyst and test data generator.
         Generate {num_cases} diverse news event test cases (titles) related to the following triggering event:
         "{triggering_event}"
-        
+
         Approximately half of the cases should be positive matches (True) where the event has actually happened.
         The other half should be negative matches (False), such as:
         - Related topics but not the specific event (e.g., rumors, threats, political statements without military action).
         - Completely unrelated events but with similar keywords.
         - Near misses.
-        
+
         {format_instructions}
         """,
         input_variables=["num_cases", "triggering_event"],
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
-    
+
     chain = prompt | llm | parser
-    
+
     try:
         result = chain.invoke({"num_cases": num_cases, "triggering_event": triggering_event})
-        return result.cases
+        return [(case.title, case.expected_classification) for case in result.cases]
     except Exception as e:
         print(f"Error generating test cases: {e}")
         return []
 
-def run_evaluation():
-    # Load config or create dummy
-    # We need OPENAI_API_KEY
-    if not os.getenv("OPENAI_API_KEY"):
-        print("OPENAI_API_KEY not found. Please set it to run tests.")
-        return
 
-    triggering_event = "Military confrontation between Iran and US or Israel has occurred"
-    
-    dummy_config = Config(
+def grow_dataset(path: str, triggering_event: str, count: int) -> int:
+    """Generate about ``count`` new labeled titles in chunks and append the unseen ones."""
+    added = 0
+    for start in range(0, count, GENERATION_CHUNK):
+        generated = generate_test_cases(triggering_event, min(GENERATION_CHUNK, count - start))
+        added += save_cases(path, triggering_event, generated)
+    return added
+
+
+class RecordingResponder:
+    """OpenAIStub responder that forwards to a real endpoint and appends every answer to a recording."""
+
+    def __init__(self, path: str, api_key: str, upstream: str = OPENAI_API_BASE):
+        self.path = path
+        self.api_key = api_key
+        self.upstream = upstream.rstrip("/")
+        self._session = requests.Session()
+
+    def __call__(self, body: dict):
+        response = self._session.post(
+            f"{self.upstream}/chat/completions",
+            json=body,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=120,
+        )
+        if response.status_code != 200:
+            return response.status_code, response.text, {}
+        completion = response.json()
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"key": request_key(body), "completion": completion}) + "\n")
+        return 200, completion, {}
+
+
+class ReplayResponder:
+    """OpenAIStub responder answering from a recording; requests that were never recorded get a 404."""
+
+    def __init__(self, path: str):
+        self.responses: Dict[str, dict] = {}
+        self.misses = 0
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.responses[entry["key"]] = entry["completion"]
+
+    def __call__(self, body: dict):
+        completion = self.responses.get(request_key(body))
+        if completion is None:
+            self.misses += 1
+            return 404, "no recorded response for this request", {}
+        return 200, completion, {}
+
+
+def request_key(body: dict) -> str:
+    """Identifies a chat request by model and prompt, so prompt or batching changes miss the recording."""
+    return hashlib.sha256(json.dumps([body.get("model"), body.get("messages")], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EvalConfig:
+    model: str = MODEL_NAME
+    batch_size: int = 20
+    concurrency: int = 8
+    prescreen: bool = False
+
+
+@dataclass
+class EvalResult:
+    config: EvalConfig
+    dataset_version: str
+    prompt_version: str = PROMPT_VERSION
+    cases: int = 0
+    positives: int = 0
+    true_positives: int = 0
+    false_positives: int = 0
+    false_negatives: int = 0
+    true_negatives: int = 0
+    unclassified: int = 0
+    elapsed_seconds: float = 0.0
+    llm_calls: int = 0
+    llm_latency: Dict[str, float] = field(default_factory=dict)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def precision(self) -> float:
+        predicted = self.true_positives + self.false_positives
+        return self.true_positives / predicted if predicted else 0.0
+
+    @property
+    def recall(self) -> float:
+        # Unclassified positives count as misses: in production they would never alert
+        return self.true_positives / self.positives if self.positives else 0.0
+
+    @property
+    def f1(self) -> float:
+        p, r = self.precision, self.recall
+        return 2 * p * r / (p + r) if p + r else 0.0
+
+    @property
+    def titles_per_second(self) -> float:
+        return self.cases / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def score(self, predictions: Sequence[Optional[bool]], labels: Sequence[bool]):
+        for prediction, label in zip(predictions, labels):
+            self.cases += 1
+            self.positives += label
+            if prediction is None:
+                self.unclassified += 1
+            elif prediction and label:
+                self.true_positives += 1
+            elif prediction:
+                self.false_positives += 1
+            elif label:
+                self.false_negatives += 1
+            else:
+                self.true_negatives += 1
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.update(precision=self.precision, recall=self.recall, f1=self.f1, titles_per_second=self.titles_per_second)
+        return data
+
+
+async def evaluate(cases: Sequence[EvalCase], eval_config: EvalConfig, api_key: str, api_base: Optional[str] = None, state_dir: str = ".state") -> EvalResult:
+    """Classify every case through the engine's concurrent batch path and score the verdicts."""
+    result = EvalResult(eval_config, dataset_version(cases))
+    config = Config(
         rss_feed_url="",
         keyword_filter="",
-        triggering_event=triggering_event,
+        triggering_event=TRIGGERING_EVENT,
         lookback_minutes=0,
         pushover_user_keys=[],
         pushover_api_token="",
-        openai_api_key=os.getenv("OPENAI_API_KEY")
+        openai_api_key=api_key,
+        state_dir=state_dir,
+        classification_batch_size=eval_config.batch_size,
+        classification_max_concurrency=eval_config.concurrency,
+        openai_api_base=api_base,
+        prescreen_enabled=eval_config.prescreen,
     )
+    by_event: Dict[str, List[EvalCase]] = {}
+    for case in cases:
+        by_event.setdefault(case.triggering_event, []).append(case)
+
+    metrics.reset()
+    engine = ClassifierEngine(config, model_name=eval_config.model)
+    # Load the client up front so the first configuration's throughput does not include imports
+    engine._build_chains()
+    start = time.perf_counter()
+    try:
+        for triggering_event, event_cases in by_event.items():
+            verdicts = await engine.classify_many([case.title for case in event_cases], triggering_event)
+            result.score(verdicts, [case.label for case in event_cases])
+            result.errors += [case.title for case, verdict in zip(event_cases, verdicts) if verdict is None]
+    finally:
+        result.elapsed_seconds = time.perf_counter() - start
+        await engine.aclose()
+
+    summary = metrics.summary()
+    counters = summary["counters"]
+    llm_call = summary["spans"].get("llm_call", {})
+    result.llm_calls = int(counters.get("llm_calls", 0))
+    result.llm_latency = {pct: llm_call.get(pct, 0.0) for pct in ("p50", "p95", "p99")}
+    result.input_tokens = int(counters.get("llm_input_tokens", 0))
+    result.output_tokens = int(counters.get("llm_output_tokens", 0))
+    result.cost_usd = counters.get("llm_cost_usd", 0.0)
+    return result
 
-    print(f"Generating test cases using gpt-4o for event: '{triggering_event}'...")
-    test_cases = generate_test_cases(triggering_event, num_cases=NUM_CASES)
-    
-    if not test_cases:
-        print("No test cases generated.")
-        return
-
-    print(f"Generated {len(test_cases)} test cases. Running evaluation with gpt-4o-mini...")
-    
-    passed = 0
-    failed = 0
-    
-    for i, case in enumerate(test_cases):
-        print(f"\nCase {i+1}:")
-        print(f"  Title: {case.title}")
-        print(f"  Expected: {case.expected_classification}")
-        
-        prediction = classify_event(case.title, None, dummy_config)
-        print(f"  Predicted: {prediction}")
-        
-        if prediction == case.expected_classification:
-            print("  Result: PASS")
-            passed += 1
-        else:
-            print("  Result: FAIL")
-            failed += 1
-
-    print(f"\nEvaluation Complete.")
-    print(f"Passed: {passed}/{len(test_cases)}")
-    print(f"Failed: {failed}/{len(test_cases)}")
-    
-    if failed > 0:
-        print("Evaluation FAILED.")
+
+def run_evaluation(cases: Sequence[EvalCase], configs: Sequence[EvalConfig], api_key: str, api_base: Optional[str] = None, state_dir: str = ".state") -> List[EvalResult]:
+    return [asyncio.run(evaluate(cases, eval_config, api_key, api_base, state_dir)) for eval_config in configs]
+
+
+def format_results(results: Sequence[EvalResult]) -> str:
+    if not results:
+        return "No configurations evaluated."
+    first = results[0]
+    lines = [
+        f"Dataset {first.dataset_version}, prompt version {first.prompt_version}",
+        f"{'model':<14} {'batch':>5} {'conc':>4} {'pre':>3} {'prec':>6} {'recall':>6} {'f1':>6} {'unk':>4} "
+        f"{'calls':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'titles/s':>8} {'cost $':>9}",
+    ]
+    for r in results:
+        c = r.config
+        lines.append(
+            f"{c.model:<14} {c.batch_size:>5} {c.concurrency:>4} {'y' if c.prescreen else 'n':>3} "
+            f"{r.precision:>6.3f} {r.recall:>6.3f} {r.f1:>6.3f} {r.unclassified:>4} {r.llm_calls:>5} "
+            f"{r.llm_latency['p50'] * 1000:>8.1f} {r.llm_latency['p95'] * 1000:>8.1f} {r.llm_latency['p99'] * 1000:>8.1f} "
+            f"{r.titles_per_second:>8.1f} {r.cost_usd:>9.5f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Evaluate the classifier on the labeled dataset.")
+    arg_parser.add_argument("--dataset", default=DATASET_PATH, help="JSON-lines file of labeled cases")
+    arg_parser.add_argument("--generate", type=int, default=0, help=f"first add this many new cases generated with {GENERATOR_MODEL}")
+    arg_parser.add_argument("--limit", type=int, help="evaluate only the first N cases")
+    arg_parser.add_argument("--model", nargs="+", default=[MODEL_NAME])
+    arg_parser.add_argument("--batch-size", nargs="+", type=int, default=[20])
+    arg_parser.add_argument("--concurrency", nargs="+", type=int, default=[8])
+    arg_parser.add_argument("--prescreen", action="store_true", help="let the trained prescreen decide confident titles")
+    arg_parser.add_argument("--state-dir", default=".state", help="where the prescreen model is loaded from")
+    mode = arg_parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", help="append every OpenAI response to this file for later replay")
+    mode.add_argument("--replay", help="answer from a recording instead of OpenAI; runs offline")
+    arg_parser.add_argument("--min-f1", type=float, help="exit non-zero if any configuration scores below this F1")
+    arg_parser.add_argument("--json", action="store_true", help="print results as JSON")
+    return arg_parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not args.replay and not api_key:
+        print("OPENAI_API_KEY not found. Please set it, or pass --replay to run offline.")
         sys.exit(1)
+
+    if args.generate:
+        added = grow_dataset(args.dataset, TRIGGERING_EVENT, args.generate)
+        print(f"Added {added} new labeled cases to {args.dataset}")
+
+    cases = load_dataset(args.dataset)[:args.limit]
+    if not cases:
+        print(f"No cases in {args.dataset}; use --generate to create some.")
+        sys.exit(1)
+
+    configs = [
+        EvalConfig(model, batch_size, concurrency, args.prescreen)
+        for model, batch_size, concurrency in itertools.product(args.model, args.batch_size, args.concurrency)
+    ]
+    if args.record or args.replay:
+        responder = RecordingResponder(args.record, api_key) if args.record else ReplayResponder(args.replay)
+        with OpenAIStub(responder) as stub:
+            results = run_evaluation(cases, configs, api_key or "replay", stub.base_url, args.state_dir)
+        if args.replay and responder.misses:
+            print(f"{responder.misses} requests were not in the recording and count as unclassified", file=sys.stderr)
     else:
-        print("Evaluation PASSED.")
-        sys.exit(0)
+        results = run_evaluation(cases, configs, api_key, None, args.state_dir)
+
+    print(json.dumps([r.to_dict() for r in results], indent=2) if args.json else format_results(results))
+    if args.min_f1 is not None and any(r.f1 < args.min_f1 for r in results):
+        print(f"Evaluation FAILED: F1 below {args.min_f1}")
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    run_evaluation()
+    main()
@@ -0,0 +1,28 @@
+import unittest
+
+from benchmarks.run import STAGES, BenchmarkOptions, format_report, run_benchmark
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+
+    def test_runs_every_stage_offline(self):
+        options = BenchmarkOptions(
+            entries=200,
+            runs=2,
+            openai_latency=0.0,
+            pushover_latency=0.0,
+            redirect_latency=0.0,
+        )
+
+        report = run_benchmark(options)
+
+        self.assertEqual(report.entries, 400)
+        self.assertGreater(report.triggered, 0)
+        self.assertEqual(sum(report.errors.values()), 0)
+        self.assertEqual({stage: len(report.samples[stage]) > 0 for stage in STAGES}, dict.fromkeys(STAGES, True))
+        self.assertEqual(len(report.samples["notify"]), report.triggered)
+        self.assertIn("p95 ms", format_report(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
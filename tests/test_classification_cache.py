@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from classification_cache import ClassificationCache
+from prompts import with_context
+
+
+class TestClassificationCache(unittest.TestCase):
+
+    def test_key_ignores_headline_formatting(self):
+        a = ClassificationCache.make_key("Iran strikes base - Reuters", "event", "model", "1")
+        b = ClassificationCache.make_key("IRAN strikes base! - AP", "event", "model", "1")
+        c = ClassificationCache.make_key("Iran strikes base", "event", "model", "2")
+
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_key_keeps_short_contexts(self):
+        title = "Iran reports explosions near an air base - Reuters"
+        bare = ClassificationCache.make_key(title, "event", "model", "1")
+        confirmed = ClassificationCache.make_key(with_context(title, "Officials confirm a strike"), "event", "model", "1")
+        denied = ClassificationCache.make_key(with_context(title, "Officials deny a strike"), "event", "model", "1")
+
+        self.assertEqual(len({bare, confirmed, denied}), 3)
+        self.assertEqual(confirmed, ClassificationCache.make_key(with_context("IRAN reports explosions near an air base! - AP", "Officials confirm a strike"), "event", "model", "1"))
+
+    def test_hit_and_miss_counters(self):
+        cache = ClassificationCache()
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", True)
+
+        self.assertTrue(cache.get("k"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        cache = ClassificationCache(max_entries=2)
+        cache.put("a", True)
+        cache.put("b", False)
+        cache.get("a")
+        cache.put("c", True)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertTrue(cache.get("a"))
+        self.assertTrue(cache.get("c"))
+
+    def test_ttl_expiry(self):
+        cache = ClassificationCache(ttl_seconds=10)
+        with patch("classification_cache.time.time", return_value=1000.0):
+            cache.put("k", True)
+        with patch("classification_cache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.get("k"))
+
+    def test_persistent_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.sqlite3")
+            cache = ClassificationCache(max_entries=2, path=path)
+            cache.put("a", True)
+            cache.put("b", False)
+            cache.put("c", True)
+            cache.close()
+
+            reopened = ClassificationCache(max_entries=2, path=path)
+            self.assertIsNone(reopened.get("a"))
+            self.assertFalse(reopened.get("b"))
+            self.assertTrue(reopened.get("c"))
+            reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from classifier import BatchVerdicts, TitleVerdict, verdicts_from_batch
+from prompts import pack_batches
+
+
+class TestBatching(unittest.TestCase):
+
+    def test_pack_batches_respects_size_and_token_budget(self):
+        titles = ["short"] * 5 + ["x" * 400] + ["short"] * 2
+
+        batches = pack_batches(titles, max_batch_size=3, max_batch_tokens=60)
+
+        self.assertEqual(batches, [[0, 1, 2], [3, 4], [5], [6, 7]])
+
+    def test_verdicts_from_batch_leaves_missing_indices_unclassified(self):
+        result = BatchVerdicts(verdicts=[TitleVerdict(index=0, happened=False), TitleVerdict(index=2, happened=True), TitleVerdict(index=7, happened=True)])
+
+        self.assertEqual(verdicts_from_batch(result, 3), [False, None, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import unittest
+
+from classification_cache import ClassificationCache
+from classifier_engine import ClassifierEngine, parse_duration, retry_delay_from_headers
+from config import Config
+from benchmarks.openai_stub import OpenAIStub
+
+
+def make_config(base_url, **overrides):
+    config = Config(
+        rss_feed_url="",
+        keyword_filter="",
+        triggering_event="Military confrontation has occurred",
+        lookback_minutes=0,
+        pushover_user_keys=[],
+        pushover_api_token="",
+        openai_api_key="test-key",
+        openai_api_base=base_url,
+    )
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def run_engine(engine, coro):
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await engine.aclose()
+    return asyncio.run(runner())
+
+
+def prompt_text(body):
+    return body["messages"][-1]["content"]
+
+
+class TestRateLimitHeaders(unittest.TestCase):
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("20ms"), 0.02)
+        self.assertEqual(parse_duration("6m0s"), 360.0)
+        self.assertEqual(parse_duration("1.5"), 1.5)
+        self.assertIsNone(parse_duration("soon"))
+
+    def test_retry_delay_prefers_retry_after(self):
+        self.assertEqual(retry_delay_from_headers({"retry-after-ms": "250", "retry-after": "3"}), 0.25)
+        self.assertEqual(retry_delay_from_headers({"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "500ms"}), 2.0)
+        self.assertIsNone(retry_delay_from_headers({}))
+
+
+class TestClassifierEngine(unittest.TestCase):
+
+    def test_retries_after_429_and_5xx(self):
+        statuses = [429, 503]
+
+        def responder(body):
+            if statuses:
+                return statuses.pop(0), "busy", {"retry-after-ms": "10"}
+            return 200, "True", {}
+
+        with OpenAIStub(responder) as stub:
+            engine = ClassifierEngine(make_config(stub.base_url), backoff_base=0.01)
+            verdict = run_engine(engine, engine.classify("Strike on base"))
+
+        self.assertTrue(verdict)
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual(engine.retries, 2)
+
+    def test_gives_up_after_max_retries(self):
+        with OpenAIStub(lambda body: (500, "down", {})) as stub:
+            engine = ClassifierEngine(make_config(stub.base_url, classification_max_retries=1), backoff_base=0.01)
+            verdicts = run_engine(engine, engine.classify_many(["Strike on base"]))
+
+        self.assertEqual(verdicts, [None])
+        self.assertEqual(len(stub.requests), 2)
+
+    def test_concurrency_is_bounded(self):
+        titles = [f"Headline {i}" for i in range(6)]
+
+        def responder(body):
+            return 200, "True" if "Headline 3" in prompt_text(body) else "False", {}
+
+        with OpenAIStub(responder, latency=0.05) as stub:
+            config = make_config(stub.base_url, classification_batch_size=1, classification_max_concurrency=2)
+            engine = ClassifierEngine(config)
+            verdicts = run_engine(engine, engine.classify_many(titles))
+
+        self.assertEqual(verdicts, [False, False, False, True, False, False])
+        self.assertEqual(len(stub.requests), 6)
+        self.assertEqual(stub.max_in_flight, 2)
+
+    def test_backoff_does_not_hold_a_concurrency_slot(self):
+        failures = ["Flaky"]
+
+        def responder(body):
+            if "Flaky" in prompt_text(body) and failures:
+                failures.pop()
+                return 503, "busy", {"retry-after": "0.5"}
+            return 200, "False", {}
+
+        with OpenAIStub(responder) as stub:
+            config = make_config(stub.base_url, classification_batch_size=1, classification_max_concurrency=1)
+            engine = ClassifierEngine(config, backoff_base=0.01)
+            verdicts = run_engine(engine, engine.classify_many(["Flaky headline", "Steady headline"]))
+
+        self.assertEqual(verdicts, [False, False])
+        order = [("Flaky" if "Flaky" in prompt_text(body) else "Steady") for body in stub.requests]
+        # The steady title went out while the flaky one was backing off
+        self.assertEqual(order, ["Flaky", "Steady", "Flaky"])
+
+    def test_batches_share_one_request_and_fill_cache(self):
+        def responder(body):
+            verdicts = [{"index": 0, "happened": True}, {"index": 1, "happened": False}]
+            return 200, json.dumps({"verdicts": verdicts}), {}
+
+        cache = ClassificationCache()
+        with OpenAIStub(responder) as stub:
+            engine = ClassifierEngine(make_config(stub.base_url), cache=cache)
+            first = run_engine(engine, engine.classify_many(["a", "b"]))
+            engine = ClassifierEngine(make_config(stub.base_url), cache=cache)
+            second = run_engine(engine, engine.classify_many(["a", "b"]))
+
+        self.assertEqual(first, [True, False])
+        self.assertEqual(second, [True, False])
+        self.assertEqual(len(stub.requests), 1)
+
+    def test_bad_batch_response_falls_back_to_single_calls(self):
+        def responder(body):
+            text = prompt_text(body)
+            if "numbered list" in text:
+                return 200, "I cannot answer that", {}
+            return 200, "True" if "News Title: b" in text else "False", {}
+
+        with OpenAIStub(responder) as stub:
+            engine = ClassifierEngine(make_config(stub.base_url))
+            verdicts = run_engine(engine, engine.classify_many(["a", "b"]))
+
+        self.assertEqual(verdicts, [False, True])
+        self.assertEqual(len(stub.requests), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
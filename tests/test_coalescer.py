@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from classifier_engine import ClassifierEngine
+from coalescer import Alert, AlertCoalescer, build_digest
+from config import Config
+from notifier import MAX_MESSAGE_LENGTH, MAX_URL_LENGTH, DeliveryResult
+from processing import Stores, flush_alerts, process_events
+from rss import NewsEvent
+from benchmarks.openai_stub import OpenAIStub
+
+
+def alert(i, url="https://news.example/a"):
+    return Alert("News Alert: Iran", f"Iran story {i}", url)
+
+
+class TestAlertCoalescer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "alerts.sqlite3")
+        self.coalescer = AlertCoalescer(self.path, window_seconds=60)
+
+    def tearDown(self):
+        self.coalescer.close()
+        self.tmp.cleanup()
+
+    def test_first_alert_goes_out_and_the_rest_wait_for_the_window(self):
+        self.assertTrue(self.coalescer.submit(alert(0), now=1000))
+        self.assertFalse(self.coalescer.submit(alert(1), now=1001))
+        self.assertFalse(self.coalescer.submit(alert(2), now=1002))
+
+        self.assertEqual(self.coalescer.due(now=1030), [])
+        due = self.coalescer.due(now=1060)
+        self.coalescer.ack(due, now=1060)
+
+        self.assertEqual([a.message for a in due], ["Iran story 1", "Iran story 2"])
+        self.assertEqual(self.coalescer.pending(), 0)
+        # The digest opened a new window
+        self.assertFalse(self.coalescer.submit(alert(3), now=1070))
+        # Past the window, but story 3 is still waiting, so story 4 joins its digest
+        self.assertFalse(self.coalescer.submit(alert(4), now=2000))
+
+    def test_pending_alerts_survive_a_restart(self):
+        self.coalescer.submit(alert(0), now=1000)
+        self.coalescer.submit(alert(1), now=1010)
+        self.coalescer.close()
+
+        self.coalescer = AlertCoalescer(self.path, window_seconds=60)
+
+        self.assertFalse(self.coalescer.submit(alert(2), now=1020))
+        due = self.coalescer.due(now=1100)
+        self.coalescer.ack(due, now=1100)
+        self.assertEqual([a.message for a in due], ["Iran story 1", "Iran story 2"])
+        self.assertTrue(self.coalescer.submit(alert(3), now=1200))
+
+    def test_failed_immediate_send_is_requeued(self):
+        first = alert(0)
+        self.assertTrue(self.coalescer.submit(first, now=1000))
+        self.assertFalse(self.coalescer.submit(alert(1), now=1010))
+
+        self.coalescer.requeue(first)
+
+        # The window it opened is closed again, and it leads the digest
+        self.assertEqual([a.message for a in self.coalescer.due(now=1011)], ["Iran story 0", "Iran story 1"])
+
+    def test_alerts_stay_queued_until_acknowledged(self):
+        self.coalescer.submit(alert(0), now=1000)
+        self.coalescer.submit(alert(1), now=1010)
+
+        self.assertEqual([a.message for a in self.coalescer.due(now=1060)], ["Iran story 1"])
+        # Not delivered: still queued, and still due
+        self.assertEqual([a.message for a in self.coalescer.due(now=1070)], ["Iran story 1"])
+        self.coalescer.submit(alert(2), now=1075)
+        self.coalescer.ack(self.coalescer.due(now=1070)[:1], now=1080)
+
+        # Only the acknowledged alert left; the one queued meanwhile waits for the next window
+        self.assertEqual(self.coalescer.pending(), 1)
+        self.assertEqual(self.coalescer.due(now=1100), [])
+        self.assertEqual([a.message for a in self.coalescer.due(now=1140)], ["Iran story 2"])
+
+
+class TestBuildDigest(unittest.TestCase):
+
+    def test_lists_alerts_within_message_limit(self):
+        alerts = [Alert("News Alert: Iran", f"Story {i} " + "x" * 150, "https://news.example/a") for i in range(12)]
+
+        title, message, url = build_digest(alerts, max_items=10)
+
+        self.assertEqual(title, "News Alert: Iran (12 more)")
+        self.assertLessEqual(len(message), MAX_MESSAGE_LENGTH)
+        self.assertTrue(message.startswith("• Story 0 "))
+        self.assertTrue(message.endswith("…and 6 more"))
+        self.assertEqual(url, "https://news.example/a")
+
+    def test_caps_items(self):
+        _, message, _ = build_digest([alert(i) for i in range(5)], max_items=2)
+
+        self.assertEqual(message, "• Iran story 0\n• Iran story 1\n…and 3 more")
+
+    def test_mixed_watches_get_a_generic_title(self):
+        title, _, _ = build_digest([alert(0), Alert("News Alert: Israel", "Israel story", "https://news.example/b")])
+
+        self.assertEqual(title, "News Alerts (2 more)")
+
+    def test_embeds_an_unshortenable_link_after_the_list(self):
+        long_url = "https://news.example/" + "a" * MAX_URL_LENGTH
+
+        with patch("src.notifier.follow_redirects", return_value=long_url):
+            _, message, url = build_digest([alert(0, long_url), alert(1)])
+
+        self.assertEqual(url, "")
+        self.assertEqual(message, f"• Iran story 0\n• Iran story 1\n{long_url}")
+        self.assertLessEqual(len(message), MAX_MESSAGE_LENGTH)
+
+
+def batch_responder(request):
+    prompt = request["messages"][-1]["content"]
+    lines = [line.strip() for line in prompt.split("News Titles:", 1)[1].splitlines() if line.strip()[:1].isdigit()]
+    return 200, json.dumps({"verdicts": [{"index": int(line.split(".", 1)[0]), "happened": "struck" in line} for line in lines]}), {}
+
+
+class TestPipelineCoalescing(unittest.TestCase):
+
+    def test_burst_costs_one_alert_and_one_digest(self):
+        titles = ["Iran struck an air base", "Iran struck a depot", "Iran struck a port", "Iran holds talks"]
+        events = [NewsEvent(title=t, link=f"https://news.example/{i}", description="", published=datetime.now(timezone.utc), guid=t) for i, t in enumerate(titles)]
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(batch_responder) as stub:
+            config = Config(
+                rss_feed_url="",
+                keyword_filter="Iran",
+                triggering_event="Strike happened",
+                lookback_minutes=60,
+                pushover_user_keys=["user"],
+                pushover_api_token="token",
+                openai_api_key="key",
+                state_dir=tmp,
+                openai_api_base=stub.base_url,
+                story_clustering=False,
+                prescreen_enabled=False,
+                notify_coalesce_seconds=0.5,
+            )
+            stores = Stores(config)
+
+            async def run():
+                engine = ClassifierEngine(config)
+                try:
+                    complete = await process_events(events, config.default_watch(), config, stores, engine)
+                finally:
+                    await engine.aclose()
+                early = await flush_alerts(config, stores)
+                await asyncio.sleep(0.6)
+                return complete, early, await flush_alerts(config, stores)
+
+            with patch("processing.send_notification", return_value=[DeliveryResult("user", True)]) as mock_send:
+                complete, early, digested = asyncio.run(run())
+            stores.close()
+
+        self.assertTrue(complete)
+        self.assertEqual((early, digested), (0, 2))
+        self.assertEqual(mock_send.call_count, 2)
+        first, digest = [call.kwargs for call in mock_send.call_args_list]
+        self.assertEqual(first["title"], "News Alert: Iran")
+        self.assertEqual(digest["title"], "News Alert: Iran (2 more)")
+        self.assertEqual(sorted(digest["message"].splitlines()), sorted(f"• {t}" for t in titles[:3] if t != first["message"]))
+
+    def test_failed_alert_goes_out_with_the_next_digest(self):
+        titles = ["Iran struck an air base", "Iran holds talks"]
+        events = [NewsEvent(title=t, link=f"https://news.example/{i}", description="", published=datetime.now(timezone.utc), guid=t) for i, t in enumerate(titles)]
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(batch_responder) as stub:
+            config = Config(
+                rss_feed_url="",
+                keyword_filter="Iran",
+                triggering_event="Strike happened",
+                lookback_minutes=60,
+                pushover_user_keys=["user"],
+                pushover_api_token="token",
+                openai_api_key="key",
+                state_dir=tmp,
+                openai_api_base=stub.base_url,
+                prescreen_enabled=False,
+                notify_coalesce_seconds=60,
+            )
+            stores = Stores(config)
+
+            async def run():
+                engine = ClassifierEngine(config)
+                try:
+                    with patch("processing.send_notification", side_effect=RuntimeError("network down")):
+                        await process_events(events, config.default_watch(), config, stores, engine)
+                finally:
+                    await engine.aclose()
+                with patch("processing.send_notification", return_value=[DeliveryResult("user", True)]) as mock_send:
+                    return await flush_alerts(config, stores), mock_send
+
+            digested, mock_send = asyncio.run(run())
+            stores.close()
+
+        self.assertEqual(digested, 1)
+        self.assertEqual(mock_send.call_args.kwargs["message"], "• Iran struck an air base")
+
+    def test_failed_digest_is_sent_again(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = Config(
+                rss_feed_url="",
+                keyword_filter="Iran",
+                triggering_event="Strike happened",
+                lookback_minutes=60,
+                pushover_user_keys=["user"],
+                pushover_api_token="token",
+                openai_api_key="key",
+                state_dir=tmp,
+                notify_coalesce_seconds=60,
+            )
+            stores = Stores(config)
+            stores.alerts.submit(alert(0))
+            stores.alerts.submit(alert(1))
+            stores.alerts.submit(alert(2))
+
+            async def run():
+                with patch("processing.send_notification", return_value=[DeliveryResult("user", False, 500)]):
+                    failed = await flush_alerts(config, stores, force=True)
+                with patch("processing.send_notification", side_effect=RuntimeError("network down")):
+                    raised = await flush_alerts(config, stores, force=True)
+                with patch("processing.send_notification", return_value=[DeliveryResult("user", True)]) as mock_send:
+                    sent = await flush_alerts(config, stores, force=True)
+                return failed, raised, sent, mock_send
+
+            failed, raised, sent, mock_send = asyncio.run(run())
+            remaining = stores.alerts.pending()
+            stores.close()
+
+        self.assertEqual((failed, raised, sent, remaining), (0, 0, 2, 0))
+        self.assertEqual(mock_send.call_args.kwargs["message"], "• Iran story 1\n• Iran story 2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from config import Config, Watch, load_config
+from daemon import Daemon, PollSchedule
+from benchmarks.openai_stub import OpenAIStub
+from tests.test_rss import FeedServer, rss_document, rss_item
+
+
+class TestPollSchedule(unittest.TestCase):
+
+    def test_busy_feed_polls_faster(self):
+        schedule = PollSchedule(min_seconds=30, max_seconds=900, smoothing=1.0)
+
+        self.assertEqual(schedule.observe(new_entries=10, elapsed_seconds=600), 60)
+        self.assertEqual(schedule.observe(new_entries=100, elapsed_seconds=600), 30)
+
+    def test_quiet_feed_backs_off_to_max(self):
+        schedule = PollSchedule(min_seconds=30, max_seconds=900, smoothing=0.5)
+        schedule.observe(new_entries=10, elapsed_seconds=100)
+
+        intervals = [schedule.observe(new_entries=0, elapsed_seconds=60) for _ in range(12)]
+
+        self.assertEqual(intervals, sorted(intervals))
+        self.assertEqual(intervals[-1], 900)
+
+    def test_first_poll_does_not_count_towards_the_rate(self):
+        schedule = PollSchedule(min_seconds=30, max_seconds=900, smoothing=0.3)
+
+        self.assertEqual(schedule.observe(new_entries=50, elapsed_seconds=None), 30)
+        self.assertEqual(schedule.rate, 0)
+        self.assertEqual(schedule.observe(new_entries=0, elapsed_seconds=30), 900)
+
+    def test_jitter_stays_in_bounds(self):
+        schedule = PollSchedule(min_seconds=100, max_seconds=100, jitter=0.1)
+
+        for _ in range(50):
+            self.assertTrue(90 <= schedule.next_delay() <= 110)
+
+
+class TestLoadWatches(unittest.TestCase):
+
+    def test_watches_inherit_defaults(self):
+        config_data = {
+            "rss_feed_url": "https://news.example/rss?q={keyword}",
+            "keyword_filter": "Iran",
+            "triggering_event": "Event A",
+            "lookback_minutes": 30,
+            "watches": [
+                {"keyword_filter": "Iran", "triggering_event": "Event A"},
+                {"name": "tw", "keyword_filter": "Taiwan", "triggering_event": "Event B", "max_poll_seconds": 300},
+            ],
+        }
+        env = {"PUSHOVER_API_TOKEN": "t", "OPENAI_API_KEY": "k", "PUSHOVER_USER_KEYS": "user1"}
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, env):
+            path = os.path.join(tmp, "config.json")
+            with open(path, "w") as f:
+                json.dump(config_data, f)
+            config = load_config(path)
+
+        iran, taiwan = config.get_watches()
+        self.assertEqual((iran.name, iran.rss_feed_url, iran.lookback_minutes), ("Iran", "https://news.example/rss?q=Iran", 30))
+        self.assertEqual((taiwan.name, taiwan.rss_feed_url, taiwan.max_poll_seconds), ("tw", "https://news.example/rss?q=Taiwan", 300))
+
+    def test_unknown_profiler_is_a_config_error(self):
+        config_data = {"rss_feed_url": "https://news.example/rss", "keyword_filter": "Iran", "triggering_event": "Event A", "profile": "perf"}
+        env = {"PUSHOVER_API_TOKEN": "t", "OPENAI_API_KEY": "k", "PUSHOVER_USER_KEYS": "user1"}
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, env):
+            os.environ.pop("PROFILE", None)
+            path = os.path.join(tmp, "config.json")
+            with open(path, "w") as f:
+                json.dump(config_data, f)
+            with self.assertRaisesRegex(ValueError, "profile must be one of"):
+                load_config(path)
+
+
+class TestDaemon(unittest.TestCase):
+
+    def test_polls_each_feed_once_for_all_its_watches(self):
+        body = rss_document([
+            rss_item("Iran strikes base", 5),
+            rss_item("Taiwan drills continue", 5),
+            rss_item("Weather report", 5),
+        ])
+
+        def responder(request):
+            return 200, "True" if "Iran" in request["messages"][-1]["content"] else "False", {}
+
+        with tempfile.TemporaryDirectory() as tmp, FeedServer(body) as feed, OpenAIStub(responder) as openai_stub:
+            config = Config(
+                rss_feed_url=feed.url,
+                keyword_filter="",
+                triggering_event="",
+                lookback_minutes=60,
+                pushover_user_keys=["user"],
+                pushover_api_token="token",
+                openai_api_key="key",
+                state_dir=tmp,
+                openai_api_base=openai_stub.base_url,
+                watches=[
+                    Watch("iran", feed.url, "Iran", "Strike happened"),
+                    Watch("taiwan", feed.url, "Taiwan", "Invasion happened"),
+                ],
+            )
+            with patch("src.processing.send_notification") as mock_send:
+                daemon = Daemon(config)
+                asyncio.run(daemon.run(max_polls=1))
+                self.assertEqual(len(feed.requests), 1)
+                self.assertEqual(len(openai_stub.requests), 2)
+                mock_send.assert_called_once()
+                self.assertEqual(mock_send.call_args.kwargs["message"], "Iran strikes base")
+
+                second = Daemon(config)
+                asyncio.run(second.run(max_polls=1))
+
+        # The second poll gets a 304 and classifies nothing new
+        self.assertEqual(len(feed.requests), 2)
+        self.assertEqual(len(openai_stub.requests), 2)
+        mock_send.assert_called_once()
+
+    def test_classification_cache_only_for_shared_triggering_events(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            def daemon_for(*events):
+                config = Config(
+                    rss_feed_url="", keyword_filter="", triggering_event="", lookback_minutes=60,
+                    pushover_user_keys=[], pushover_api_token="", openai_api_key="key", state_dir=tmp,
+                    watches=[Watch(f"w{i}", "https://news.example/rss", "Iran", event) for i, event in enumerate(events)],
+                )
+                return Daemon(config)
+
+            separate = daemon_for("Strike happened", "Invasion happened")
+            shared = daemon_for("Strike happened", "Strike happened")
+            separate.stores.close()
+            shared.stores.close()
+
+        self.assertIsNone(separate.engine.cache)
+        self.assertIsNotNone(shared.engine.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
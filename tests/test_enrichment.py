@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from classifier_engine import ClassifierEngine
+from config import Config
+from enrichment import ArticleCache, enrich_events, useful_context
+from html_text import article_text, html_to_text
+from tests.test_follow_redirects import REAL_GOOGLE_NEWS_URL, legacy_google_news_url
+from processing import Stores, process_events
+from rss import NewsEvent
+from benchmarks.openai_stub import OpenAIStub
+
+ARTICLE = b"""<html><head><meta name="description" content="Summary from meta">
+<script>var tracking = "<p>not text</p>";</script></head>
+<body><nav><p>Home | World | Politics</p></nav>
+<article><h1>Headline</h1><p>Iranian forces struck a base near the border overnight,</p>
+<p>officials in both countries confirmed on Sunday.</p></article>
+<footer><p>Copyright</p></footer></body></html>"""
+SLOW_SECONDS = 2.0
+
+
+class PageServer:
+    """Serves article pages by path; /slow/... pages answer after SLOW_SECONDS."""
+
+    def __init__(self, body=ARTICLE):
+        self.body = body
+        self.requests = []
+
+    def __enter__(self):
+        server_self = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server_self.requests.append(self.path)
+                if self.path.startswith("/slow/"):
+                    time.sleep(SLOW_SECONDS)
+                if self.path.startswith("/missing/"):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(server_self.body)))
+                self.end_headers()
+                self.wfile.write(server_self.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def event(title, link="", description=""):
+    return NewsEvent(title=title, link=link, description=description, published=datetime.now(timezone.utc), guid=title)
+
+
+class TestExtraction(unittest.TestCase):
+
+    def test_article_text_prefers_paragraphs_outside_boilerplate(self):
+        text = article_text([ARTICLE[:100], ARTICLE[100:]])
+
+        self.assertEqual(text, "Iranian forces struck a base near the border overnight, officials in both countries confirmed on Sunday.")
+
+    def test_article_text_stops_at_max_chars(self):
+        chunks = [b"<p>" + b"word " * 50 + b"</p>"] * 3 + [b"<p>never read</p>"]
+        read = []
+
+        text = article_text((read.append(chunk) or chunk for chunk in chunks), max_chars=100)
+
+        self.assertLessEqual(len(text), 100)
+        self.assertTrue(text.endswith("…"))
+        self.assertEqual(len(read), 1)
+
+    def test_falls_back_to_meta_description(self):
+        page = b'<html><head><meta property="og:description" content="Meta text"></head><body><div>Menu</div></body></html>'
+
+        self.assertEqual(article_text([page]), "Meta text")
+
+    def test_html_to_text(self):
+        self.assertEqual(html_to_text('<a href="x">Iran &amp; US</a>&nbsp;&nbsp;<font>Reuters</font>'), "Iran & US Reuters")
+        self.assertEqual(html_to_text(""), "")
+
+    def test_adjacent_elements_stay_separate_words(self):
+        self.assertEqual(html_to_text("<p>Iran</p><p>strikes</p><div>base</div>"), "Iran strikes base")
+        self.assertEqual(html_to_text("<b>Iran</b><i>strikes</i>"), "Iran strikes")
+        self.assertEqual(article_text([b"<p>Iran <b>str", b"ikes</b><i>base</i></p>"]), "Iran strikes base")
+
+    def test_context_repeating_the_title_is_dropped(self):
+        title = "Iran struck a base - Reuters"
+
+        self.assertEqual(useful_context(title, "Iran struck a base Reuters"), "")
+        self.assertEqual(
+            useful_context(title, "Officials confirmed the strike on Sunday morning"),
+            "Officials confirmed the strike on Sunday morning",
+        )
+
+
+class TestEnrichEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ArticleCache(os.path.join(self.tmp.name, "articles.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_fetches_articles_in_parallel_within_budget(self):
+        with PageServer() as pages:
+            events = [event(f"Iran story {i}", f"{pages.url}/slow/{i}") for i in range(6)]
+            events.append(event("Iran late story", f"{pages.url}/slow/late", "Feed description of the late story, with more words"))
+            started = time.perf_counter()
+            contexts = enrich_events(events, "article", cache=self.cache, budget_seconds=SLOW_SECONDS * 2, workers=8)
+            elapsed = time.perf_counter() - started
+
+        # Seven slow pages, one round trip
+        self.assertLess(elapsed, SLOW_SECONDS * 2)
+        self.assertTrue(all(context.startswith("Iranian forces struck a base") for context in contexts))
+
+    def test_uses_descriptions_past_budget_and_caches_late_pages(self):
+        with PageServer() as pages:
+            slow = event("Iran late story", f"{pages.url}/slow/late", "Feed description of the late story, with more words")
+            started = time.perf_counter()
+            contexts = enrich_events([slow], "article", cache=self.cache, budget_seconds=0.2)
+            elapsed = time.perf_counter() - started
+            # The fetch finishes in the background and serves the next poll from the cache
+            deadline = time.monotonic() + SLOW_SECONDS * 2
+            while self.cache.get(slow.link) is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            again = enrich_events([slow], "article", cache=self.cache, budget_seconds=0.2)
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(contexts, ["Feed description of the late story, with more words"])
+        self.assertTrue(again[0].startswith("Iranian forces"))
+        self.assertEqual(pages.requests, ["/slow/late"])
+
+    def test_late_fetches_after_close_are_dropped(self):
+        with PageServer() as pages:
+            events = [event(f"Iran story {i}", f"{pages.url}/slow/{i}") for i in range(2)]
+            with self.assertNoLogs(level="WARNING"):
+                enrich_events(events, "article", cache=self.cache, budget_seconds=0.1, workers=1)
+                self.cache.close()
+                time.sleep(SLOW_SECONDS + 0.5)
+
+        # The queued second fetch was cancelled rather than started
+        self.assertEqual(pages.requests, ["/slow/0"])
+
+    def test_failed_pages_fall_back_to_description(self):
+        with PageServer() as pages:
+            contexts = enrich_events([event("Iran", f"{pages.url}/missing/1", "A description that says something new")], "article")
+
+        self.assertEqual(contexts, ["A description that says something new"])
+
+    def test_google_news_links_are_not_fetched(self):
+        with patch("enrichment.fetch_article_text") as mock_fetch:
+            contexts = enrich_events([event("Iran struck a base - Reuters", REAL_GOOGLE_NEWS_URL, "Iran struck a base Reuters")], "article", cache=self.cache)
+
+        mock_fetch.assert_not_called()
+        self.assertEqual(contexts, [""])
+        self.assertIsNone(self.cache.get(REAL_GOOGLE_NEWS_URL))
+
+    def test_decodable_google_news_links_fetch_the_publisher_page(self):
+        with PageServer() as pages:
+            link = legacy_google_news_url(f"{pages.url}/story")
+            contexts = enrich_events([event("Iran struck a base", link)], "article", cache=self.cache)
+
+        self.assertEqual(pages.requests, ["/story"])
+        self.assertTrue(contexts[0].startswith("Iranian forces struck a base"))
+
+
+class TestPipelineEnrichment(unittest.TestCase):
+
+    def test_classifier_sees_descriptions(self):
+        def responder(request):
+            prompt = request["messages"][-1]["content"]
+            lines = [line.strip() for line in prompt.split("News Titles:", 1)[1].splitlines() if line.strip()[:1].isdigit()]
+            verdicts = [{"index": int(line.split(".", 1)[0]), "happened": "confirmed" in line} for line in lines]
+            return 200, json.dumps({"verdicts": verdicts}), {}
+
+        events = [
+            event("Iran reports explosions near base", "https://news.example/1", "Officials confirmed an air strike hit the base overnight"),
+            event("Iran holds talks", "https://news.example/2", "Iran holds talks"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(responder) as stub:
+            config = Config(
+                rss_feed_url="",
+                keyword_filter="Iran",
+                triggering_event="Strike happened",
+                lookback_minutes=60,
+                pushover_user_keys=["user"],
+                pushover_api_token="token",
+                openai_api_key="key",
+                state_dir=tmp,
+                openai_api_base=stub.base_url,
+                story_clustering=False,
+                prescreen_enabled=False,
+                enrichment="description",
+            )
+            stores = Stores(config)
+
+            async def run():
+                engine = ClassifierEngine(config)
+                try:
+                    return await process_events(events, config.default_watch(), config, stores, engine)
+                finally:
+                    await engine.aclose()
+
+            with patch("processing.send_notification") as mock_send:
+                self.assertTrue(asyncio.run(run()))
+            stores.close()
+
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args.kwargs["message"], "Iran reports explosions near base")
+        prompt = stub.requests[0]["messages"][-1]["content"]
+        self.assertIn("Iran reports explosions near base | Context: Officials confirmed", prompt)
+        self.assertIn("1. Iran holds talks\n", prompt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tests.eval_classifier import (
+    DATASET_PATH,
+    EvalConfig,
+    EvalResult,
+    ReplayResponder,
+    dataset_version,
+    load_dataset,
+    request_key,
+    run_evaluation,
+    save_cases,
+)
+from benchmarks.openai_stub import OpenAIStub, chat_completion
+
+HAPPENED_WORDS = ("strike", "strikes", "launches", "bomb", "fires", "fire", "hit", "shot", "clashes", "kills", "intercept", "raid", "seizes", "destroyed", "explosions")
+
+
+def keyword_responder(body):
+    """Answers single and batch prompts by looking for verbs of something having happened."""
+    prompt = body["messages"][-1]["content"]
+
+    def happened(title):
+        return any(word in title.lower().split() for word in HAPPENED_WORDS)
+
+    if "News Titles:" in prompt:
+        lines = [line.strip() for line in prompt.split("News Titles:", 1)[1].splitlines() if line.strip()[:1].isdigit()]
+        verdicts = [{"index": int(line.split(".", 1)[0]), "happened": happened(line.split(". ", 1)[1])} for line in lines]
+        return 200, json.dumps({"verdicts": verdicts}), {}
+    return 200, "True" if happened(prompt.split("News Title:", 1)[1]) else "False", {}
+
+
+class TestDataset(unittest.TestCase):
+
+    def test_bundled_dataset_is_balanced_and_unique(self):
+        cases = load_dataset(DATASET_PATH)
+        positives = sum(case.label for case in cases)
+
+        self.assertGreaterEqual(len(cases), 40)
+        self.assertEqual(len({case.title for case in cases}), len(cases))
+        self.assertTrue(0.3 <= positives / len(cases) <= 0.7)
+
+    def test_save_cases_only_appends_new_titles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cases.jsonl")
+            self.assertEqual(save_cases(path, "event", [("Iran strikes", True), ("Talks resume", False)]), 2)
+            version = dataset_version(load_dataset(path))
+
+            self.assertEqual(save_cases(path, "event", [("iran strikes ", True), ("New title", False)]), 1)
+
+            self.assertEqual(len(load_dataset(path)), 3)
+            self.assertNotEqual(dataset_version(load_dataset(path)), version)
+
+
+class TestScoring(unittest.TestCase):
+
+    def test_precision_recall_f1(self):
+        result = EvalResult(EvalConfig(), "v")
+        result.score([True, True, False, None, False], [True, False, True, True, False])
+
+        self.assertEqual((result.true_positives, result.false_positives, result.false_negatives, result.true_negatives), (1, 1, 1, 1))
+        self.assertEqual(result.unclassified, 1)
+        self.assertAlmostEqual(result.precision, 0.5)
+        self.assertAlmostEqual(result.recall, 1 / 3)
+        self.assertAlmostEqual(result.f1, 0.4)
+
+
+class TestEvaluation(unittest.TestCase):
+
+    def test_compares_batching_configurations_offline(self):
+        cases = load_dataset(DATASET_PATH)
+        configs = [EvalConfig(batch_size=1, concurrency=4), EvalConfig(batch_size=10, concurrency=4)]
+
+        with OpenAIStub(keyword_responder) as stub:
+            single, batched = run_evaluation(cases, configs, "key", stub.base_url)
+
+        self.assertEqual(single.llm_calls, len(cases))
+        self.assertEqual(batched.llm_calls, 4)
+        self.assertEqual(single.cases, len(cases))
+        self.assertEqual(single.f1, batched.f1)
+        self.assertGreater(single.f1, 0.8)
+        self.assertGreater(single.input_tokens, 0)
+        self.assertGreater(single.cost_usd, 0)
+        self.assertGreater(single.llm_latency["p95"], 0)
+
+    def test_replays_recorded_responses(self):
+        cases = load_dataset(DATASET_PATH)[:3]
+        with OpenAIStub(keyword_responder) as live:
+            run_evaluation(cases, [EvalConfig(batch_size=1)], "key", live.base_url)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            recording = os.path.join(tmp, "recording.jsonl")
+            with open(recording, "w") as f:
+                for body in live.requests[:2]:
+                    content = keyword_responder(body)[1]
+                    f.write(json.dumps({"key": request_key(body), "completion": chat_completion(content, prompt_tokens=100)}) + "\n")
+            responder = ReplayResponder(recording)
+
+            with OpenAIStub(responder) as stub:
+                result, = run_evaluation(cases, [EvalConfig(batch_size=1)], "key", stub.base_url)
+
+        self.assertEqual(responder.misses, 1)
+        self.assertEqual(result.unclassified, 1)
+        self.assertEqual(result.input_tokens, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
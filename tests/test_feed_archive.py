@@ -0,0 +1,204 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from classifier_engine import ClassifierEngine
+from config import Config, Watch
+from feed_archive import FeedArchive
+from feed_state import FeedStateStore
+from prescreen import LabelStore
+from replay import ReplayCheckpoints, parse_args, replay, run_replay
+from rss import fetch_rss_events
+from benchmarks.openai_stub import OpenAIStub
+from tests.test_rss import FeedServer, rss_document, rss_item
+
+FEED_URL = "https://news.example/rss"
+
+
+def answer_struck(body):
+    """Triggers on titles containing "struck"; batch prompts get a JSON verdict list."""
+    prompt = body["messages"][-1]["content"]
+    if "News Titles:" in prompt:
+        lines = [line.strip() for line in prompt.split("News Titles:", 1)[1].splitlines() if line.strip()[:1].isdigit()]
+        verdicts = [{"index": int(line.split(".", 1)[0]), "happened": "struck" in line} for line in lines]
+        return 200, json.dumps({"verdicts": verdicts}), {}
+    return 200, "True" if "struck" in prompt.split("News Title:", 1)[1] else "False", {}
+
+
+class TestFeedArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = FeedArchive(os.path.join(self.tmp.name, "archive"))
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def test_round_trips_compressed_snapshots_in_order(self):
+        bodies = [rss_document([rss_item(f"Story {i}-{j}", j) for j in range(50)]) for i in range(3)]
+        for i, body in enumerate(bodies):
+            self.archive.append(FEED_URL, body, "application/rss+xml", fetched_at=1000 + i)
+
+        snapshots = list(self.archive.snapshots())
+        stats = self.archive.stats()
+
+        self.assertEqual([s.content for s in snapshots], bodies)
+        self.assertEqual([s.fetched_at for s in snapshots], [1000, 1001, 1002])
+        self.assertLess(stats["stored_bytes"], stats["raw_bytes"] / 3)
+
+    def test_skips_body_identical_to_previous_snapshot(self):
+        self.assertIsNotNone(self.archive.append(FEED_URL, b"<rss/>"))
+        self.assertIsNone(self.archive.append(FEED_URL, b"<rss/>"))
+        self.assertIsNotNone(self.archive.append("https://other.example/rss", b"<rss/>"))
+
+        self.assertEqual(self.archive.stats()["snapshots"], 2)
+
+    def test_filters_by_time_feed_and_position(self):
+        ids = [self.archive.append(url, f"body {i}".encode(), fetched_at=100 + i) for i, url in enumerate([FEED_URL, "b", FEED_URL, FEED_URL])]
+
+        self.assertEqual([s.id for s in self.archive.snapshots(since=101, until=103)], ids[1:3])
+        self.assertEqual([s.id for s in self.archive.snapshots(feed_urls=[FEED_URL])], [ids[0], ids[2], ids[3]])
+        self.assertEqual([s.id for s in self.archive.snapshots(feed_urls=[FEED_URL], after_id=ids[2])], [ids[3]])
+
+    def test_rolls_over_segments_and_reopens(self):
+        archive = FeedArchive(os.path.join(self.tmp.name, "small"), segment_bytes=64)
+        bodies = [os.urandom(100) for _ in range(3)]
+        for body in bodies:
+            archive.append(FEED_URL, body)
+        archive.close()
+
+        reopened = FeedArchive(os.path.join(self.tmp.name, "small"), segment_bytes=64)
+        reopened.append(FEED_URL, b"last")
+        contents = [s.content for s in reopened.snapshots()]
+        reopened.close()
+
+        self.assertEqual(contents, bodies + [b"last"])
+        self.assertEqual(len([f for f in os.listdir(os.path.join(self.tmp.name, "small")) if f.startswith("segment-")]), 4)
+
+    def test_fetch_records_changed_bodies(self):
+        state = FeedStateStore(os.path.join(self.tmp.name, "feeds.sqlite3"))
+        with FeedServer(rss_document([rss_item("Iran news", 5)])) as server:
+            fetch_rss_events(server.url, 60, "Iran", state_store=state, archive=self.archive)
+            state.commit()
+            fetch_rss_events(server.url, 60, "Iran", state_store=state, archive=self.archive)
+        state.close()
+
+        snapshots = list(self.archive.snapshots())
+        self.assertEqual(len(snapshots), 1)
+        self.assertEqual(snapshots[0].feed_url, server.url)
+        self.assertIn(b"Iran news", snapshots[0].content)
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = FeedArchive(os.path.join(self.tmp.name, "archive"))
+        self.checkpoints = ReplayCheckpoints(os.path.join(self.tmp.name, "replay.sqlite3"))
+        self.watch = Watch(name="iran", rss_feed_url=FEED_URL, keyword_filter="Iran", triggering_event="Iran strike")
+        # Overlapping snapshots, as consecutive polls of a busy feed produce
+        self.archive.append(FEED_URL, rss_document([
+            rss_item("Iran struck a base", 30, guid="a"), rss_item("Iran warns", 29, guid="b"), rss_item("Weather", 28, guid="c"),
+        ]))
+        self.archive.append(FEED_URL, rss_document([
+            rss_item("Iran warns", 29, guid="b"), rss_item("Iran struck a depot", 10, guid="d"), rss_item("Iran talks", 9, guid="e"),
+        ]))
+
+    def tearDown(self):
+        self.checkpoints.close()
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def _replay(self, responder, bulk_size=2):
+        config = Config(
+            rss_feed_url=FEED_URL,
+            keyword_filter="Iran",
+            triggering_event="Iran strike",
+            lookback_minutes=60,
+            pushover_user_keys=[],
+            pushover_api_token="",
+            openai_api_key="key",
+            state_dir=self.tmp.name,
+            classification_max_retries=0,
+            prescreen_enabled=False,
+        )
+        output = io.StringIO()
+        with OpenAIStub(responder) as stub:
+            config.openai_api_base = stub.base_url
+
+            async def run():
+                engine = ClassifierEngine(config, backoff_base=0.01)
+                try:
+                    return await replay(self.archive, self.watch, config, engine, self.checkpoints, output=output, bulk_size=bulk_size)
+                finally:
+                    await engine.aclose()
+
+            stats = asyncio.run(run())
+        return stats, [json.loads(line)["title"] for line in output.getvalue().splitlines()], stub
+
+    def test_replays_each_matching_entry_once(self):
+        stats, triggered, stub = self._replay(answer_struck)
+
+        self.assertTrue(stats.completed)
+        self.assertEqual((stats.snapshots, stats.classified, stats.triggered), (2, 4, 2))
+        self.assertEqual(triggered, ["Iran struck a base", "Iran struck a depot"])
+
+    def test_resumes_after_failed_bulk(self):
+        def fail_on_talks(body):
+            if "Iran talks" in body["messages"][-1]["content"]:
+                return 400, "bad request", {}
+            return answer_struck(body)
+
+        stats, triggered, _ = self._replay(fail_on_talks)
+        self.assertFalse(stats.completed)
+        self.assertEqual(stats.classified, 2)
+        self.assertEqual(triggered, ["Iran struck a base"])
+
+        stats, triggered, stub = self._replay(answer_struck)
+        self.assertTrue(stats.completed)
+        self.assertEqual(stats.classified, 2)
+        self.assertEqual(triggered, ["Iran struck a depot"])
+
+        stats, _, stub = self._replay(answer_struck)
+        self.assertEqual((stats.snapshots, stats.classified), (0, 0))
+        self.assertEqual(stub.requests, [])
+
+    def _run_replay(self, *argv):
+        config = Config(
+            rss_feed_url=FEED_URL,
+            keyword_filter="Iran",
+            triggering_event="Iran strike",
+            lookback_minutes=60,
+            pushover_user_keys=[],
+            pushover_api_token="",
+            openai_api_key="key",
+            state_dir=self.tmp.name,
+            prescreen_enabled=False,
+        )
+        with OpenAIStub(answer_struck) as stub:
+            config.openai_api_base = stub.base_url
+            stats, = asyncio.run(run_replay(config, parse_args(list(argv))))
+        labels = LabelStore(os.path.join(self.tmp.name, "labels.sqlite3"))
+        try:
+            return stats, labels.examples("Iran strike")
+        finally:
+            labels.close()
+
+    def test_leaves_live_cache_and_labels_alone_by_default(self):
+        stats, labels = self._run_replay()
+
+        self.assertEqual(stats.classified, 4)
+        self.assertEqual(labels, [])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "classifications.sqlite3")))
+
+    def test_records_labels_when_asked(self):
+        _, labels = self._run_replay("--record-labels")
+
+        self.assertEqual(len(labels), 4)
+
+if __name__ == '__main__':
+    unittest.main()
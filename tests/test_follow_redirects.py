@@ -1,14 +1,162 @@
+import base64
+import os
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
 
-from follow_redirects import follow_redirects
+from follow_redirects import follow_redirects, follow_redirects_many, resolve_urls, resolve_with_http
+from google_news import decode_google_news_url
+from redirect_cache import RedirectCache
+
+REAL_GOOGLE_NEWS_URL = "https://news.google.com/rss/articles/CBMiswFBVV95cUxQeXhyS0xzNm5NSWozN2RYUmgxb0daZy1lUHl1Rm5PX3dxMEdmcTN5TGZZWUF2V2JMM1JxNE9hcld1NEdHbUVtYXlPQ2taVHVEeTRYakc4ZnRUZTNiWFdXenp1dXYtbU5yT2VtcGdzOTBGSjJYOFF2NzVrdDQ2RXo1WUVwdWNvNE40NHZGSnAyQ2JMdVNhcjlUdHEzdl9kLTlaTDhMdjVSWXJvYW5oY20yRHFzWdIBuAFBVV95cUxOeDBveEpWWlBIVlJjZy1Jdmk3WUQ3MDJfMXRmM1FMSWJma2kxRzJqTGwzZjYzaXdKaU5LNmtfM21JTTlhd3RPOG5PMldLNzBqVjZTT0tyYmRpV0NGTUtaLVNxbXRzZHJPUV9WUnhLYzRXci1wVmdBaHNJUmI4Nkt4THVJNFdlckJZQmJ2MUkzazBpUHJPN0JnMUtvNXpha2k3QzV3bHRMbjEtbXZhNDg5c0RDbVgwcUVH?oc=5"
+
+
+def legacy_google_news_url(article_url):
+    payload = article_url.encode()
+    token = base64.urlsafe_b64encode(b"\x08\x13\x22" + bytes([len(payload)]) + payload + b"\xd2\x01\x00").decode().rstrip("=")
+    return f"https://news.google.com/rss/articles/{token}?oc=5"
+
+
+class RedirectStub:
+    """Local server that redirects /start to the same port on a different host name."""
+
+    def __enter__(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/start":
+                    self.send_response(302)
+                    self.send_header("Location", f"http://localhost:{self.server.server_address[1]}/final")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.port = self.server.server_address[1]
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
 
 
 class TestFollowRedirects(unittest.TestCase):
 
     def test_real_google_news_url(self):
-        google_news_url = "https://news.google.com/rss/articles/CBMiswFBVV95cUxQeXhyS0xzNm5NSWozN2RYUmgxb0daZy1lUHl1Rm5PX3dxMEdmcTN5TGZZWUF2V2JMM1JxNE9hcld1NEdHbUVtYXlPQ2taVHVEeTRYakc4ZnRUZTNiWFdXenp1dXYtbU5yT2VtcGdzOTBGSjJYOFF2NzVrdDQ2RXo1WUVwdWNvNE40NHZGSnAyQ2JMdVNhcjlUdHEzdl9kLTlaTDhMdjVSWXJvYW5oY20yRHFzWdIBuAFBVV95cUxOeDBveEpWWlBIVlJjZy1Jdmk3WUQ3MDJfMXRmM1FMSWJma2kxRzJqTGwzZjYzaXdKaU5LNmtfM21JTTlhd3RPOG5PMldLNzBqVjZTT0tyYmRpV0NGTUtaLVNxbXRzZHJPUV9WUnhLYzRXci1wVmdBaHNJUmI4Nkt4THVJNFdlckJZQmJ2MUkzazBpUHJPN0JnMUtvNXpha2k3QzV3bHRMbjEtbXZhNDg5c0RDbVgwcUVH?oc=5"
+        google_news_url = REAL_GOOGLE_NEWS_URL
         result_url = follow_redirects(google_news_url)
 
         # The final URL should not be a Google News URL
         self.assertIsNotNone(result_url)
-        self.assertNotIn("news.google.com", result_url)
\ No newline at end of file
+        self.assertNotIn("news.google.com", result_url)
+
+
+class TestRedirectCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = RedirectCache(os.path.join(self.tmp.name, "redirects.sqlite3"), ttl_seconds=60)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_resolves_many_with_one_browser_session(self):
+        urls = ["https://news.google.com/a", "https://news.google.com/b", "https://news.google.com/a"]
+        resolved = {"https://news.google.com/a": "https://a.example/1", "https://news.google.com/b": "https://b.example/2"}
+
+        with patch("follow_redirects.resolve_with_http", return_value=None), \
+                patch("follow_redirects._follow_redirects_many_async", new=AsyncMock(return_value=resolved)) as mock_resolve:
+            result = follow_redirects_many(urls, cache=self.cache)
+
+        mock_resolve.assert_awaited_once_with(["https://news.google.com/a", "https://news.google.com/b"])
+        self.assertEqual(result, resolved)
+
+    def test_cached_urls_skip_the_browser(self):
+        self.cache.put("https://news.google.com/a", "https://a.example/1")
+
+        with patch("follow_redirects._follow_redirects_many_async", new=AsyncMock()) as mock_resolve:
+            result = follow_redirects_many(["https://news.google.com/a"], cache=self.cache)
+
+        mock_resolve.assert_not_awaited()
+        self.assertEqual(result, {"https://news.google.com/a": "https://a.example/1"})
+
+    def test_unresolved_urls_are_not_cached(self):
+        url = "https://news.google.com/a"
+        with patch("follow_redirects.resolve_with_http", return_value=None), \
+                patch("follow_redirects._follow_redirects_many_async", new=AsyncMock(return_value={url: url})):
+            follow_redirects_many([url], cache=self.cache)
+
+        self.assertIsNone(self.cache.get(url))
+
+    def test_expired_entries_are_ignored(self):
+        self.cache.put("https://news.google.com/a", "https://a.example/1")
+        with patch("redirect_cache.time.time", return_value=10 ** 10):
+            self.assertIsNone(self.cache.get("https://news.google.com/a"))
+
+    def test_shared_across_threads(self):
+        errors = []
+
+        def use(worker):
+            try:
+                for i in range(200):
+                    url = f"https://news.google.com/{worker}/{i}"
+                    self.cache.put(url, f"https://a.example/{worker}/{i}")
+                    self.assertEqual(self.cache.get(url), f"https://a.example/{worker}/{i}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=use, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+
+class TestResolverChain(unittest.TestCase):
+
+    def test_decodes_legacy_google_news_token(self):
+        url = legacy_google_news_url("https://www.example.com/world/article-123")
+
+        self.assertEqual(decode_google_news_url(url), "https://www.example.com/world/article-123")
+
+    def test_opaque_google_news_token_is_not_decoded(self):
+        self.assertIsNone(decode_google_news_url(REAL_GOOGLE_NEWS_URL))
+        self.assertIsNone(decode_google_news_url("https://example.com/rss/articles/CBMi"))
+
+    def test_http_tier_follows_redirects(self):
+        with RedirectStub() as stub:
+            final_url = resolve_with_http(f"http://127.0.0.1:{stub.port}/start")
+            unresolved = resolve_with_http(f"http://127.0.0.1:{stub.port}/final")
+
+        self.assertEqual(final_url, f"http://localhost:{stub.port}/final")
+        self.assertIsNone(unresolved)
+
+    def test_chain_reports_tier_and_skips_browser(self):
+        decodable = legacy_google_news_url("https://www.example.com/a")
+        with RedirectStub() as stub:
+            redirecting = f"http://127.0.0.1:{stub.port}/start"
+            with patch("follow_redirects._follow_redirects_many_async", new=AsyncMock()) as mock_browser:
+                result = resolve_urls([decodable, redirecting])
+
+        mock_browser.assert_not_awaited()
+        self.assertEqual(result[decodable].tier, "decode")
+        self.assertEqual(result[redirecting].tier, "http")
+        self.assertEqual(result[redirecting].final_url, f"http://localhost:{stub.port}/final")
+
+    def test_chain_falls_back_to_browser(self):
+        url = "https://news.google.com/rss/articles/opaque"
+        with patch("follow_redirects.resolve_with_http", return_value=None), \
+                patch("follow_redirects._follow_redirects_many_async", new=AsyncMock(return_value={url: "https://a.example/1"})):
+            result = resolve_urls([url])
+
+        self.assertEqual(result[url].tier, "browser")
+        self.assertEqual(result[url].final_url, "https://a.example/1")
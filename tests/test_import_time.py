@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import unittest
+
+from benchmarks.import_time import ROOT, import_times, total_ms
+
+# Loaded on first use only; importing an entry point must not pull these in
+HEAVY_MODULES = ("langchain_openai", "langchain_core", "openai", "playwright", "bs4", "feedparser", "dateutil")
+
+
+class TestColdStart(unittest.TestCase):
+
+    def test_entry_points_defer_heavy_dependencies(self):
+        code = (
+            f"import sys; sys.path[:0] = [{ROOT!r}]; "
+            "import src.main, src.daemon; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_import_time_report_parses_modules(self):
+        times = import_times("src.config")
+
+        self.assertIn("src.config", [name for name, _, _ in times])
+        self.assertGreater(total_ms(times, "src.config"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
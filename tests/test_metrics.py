@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from metrics import Metrics, percentile, profiling
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_percentile_nearest_rank(self):
+        values = [float(i) for i in range(1, 101)]
+
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_spans_time_async_blocks(self):
+        metrics = Metrics()
+
+        async def run():
+            with metrics.span("classify"):
+                await asyncio.sleep(0.02)
+        asyncio.run(run())
+
+        stats = metrics.summary()["spans"]["classify"]
+        self.assertEqual(stats["count"], 1)
+        self.assertGreaterEqual(stats["p50"], 0.02)
+
+    def test_cost_per_alert(self):
+        metrics = Metrics()
+        metrics.inc("llm_cost_usd", 0.03)
+        self.assertIsNone(metrics.summary()["cost_per_alert_usd"])
+
+        metrics.inc("alerts_sent", 3)
+
+        self.assertAlmostEqual(metrics.summary()["cost_per_alert_usd"], 0.01)
+
+    def test_writes_json_and_prometheus_textfile(self):
+        metrics = Metrics()
+        metrics.inc("llm_calls", 2)
+        metrics.observe("feed_fetch", 0.5)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "metrics", "summary.json")
+            prom_path = os.path.join(tmp, "news.prom")
+            metrics.write(json_path, prom_path)
+            with open(json_path) as f:
+                summary = json.load(f)
+            with open(prom_path) as f:
+                textfile = f.read()
+
+        self.assertEqual(summary["counters"], {"llm_calls": 2})
+        self.assertIn("news_trigger_llm_calls_total 2", textfile)
+        self.assertIn('news_trigger_span_seconds{span="feed_fetch",quantile="0.95"} 0.5', textfile)
+        self.assertIn('news_trigger_span_seconds_count{span="feed_fetch"} 1', textfile)
+
+    def test_profiling_writes_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for kind in ("cprofile", "tracemalloc"):
+                with profiling(kind, tmp):
+                    sorted(range(1000), reverse=True)
+            self.assertEqual(len(os.listdir(tmp)), 2)
+            with self.assertRaises(ValueError):
+                with profiling("perf", tmp):
+                    pass
+
+
+if __name__ == '__main__':
+    unittest.main()
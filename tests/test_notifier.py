@@ -1,6 +1,43 @@
+import threading
+import time
 import unittest
-from unittest.mock import patch
-from notifier import prepare_message_and_url, MAX_MESSAGE_LENGTH, MAX_URL_LENGTH
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from notifier import prepare_message_and_url, send_notification, PushoverClient, MAX_MESSAGE_LENGTH, MAX_URL_LENGTH
+
+
+def pushover_response(status_code, body=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = body if body is not None else {"status": 1, "request": "req-1"}
+    response.headers = headers or {}
+    return response
+
+
+class FakeSession:
+    """Returns queued responses per user field; the last one repeats."""
+
+    def __init__(self, responses, delay=0.0):
+        self.responses = responses
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, timeout=None):
+        with self._lock:
+            self.calls.append(data)
+            queue = self.responses[data["user"]]
+            result = queue.pop(0) if len(queue) > 1 else queue[0]
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        pass
 
 class TestPrepareMessageAndUrl(unittest.TestCase):
     
@@ -113,5 +150,84 @@ class TestPrepareMessageAndUrl(unittest.TestCase):
         self.assertEqual(result_url, "")
 
 
+class TestPushoverClient(unittest.TestCase):
+
+    def test_recipients_are_sent_concurrently(self):
+        session = FakeSession({f"user{i}": [pushover_response(200)] for i in range(4)}, delay=0.1)
+        client = PushoverClient("token", session=session, max_workers=4)
+
+        start = time.monotonic()
+        results = client.send("Title", "Message", "https://example.com", [f"user{i}" for i in range(4)])
+
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual([r.user_key for r in results], ["user0", "user1", "user2", "user3"])
+        self.assertTrue(all(r.success for r in results))
+        self.assertEqual(session.calls[0]["url_title"], "Read more")
+
+    def test_retries_5xx_and_connection_errors(self):
+        session = FakeSession({"user": [pushover_response(503, {}), requests.exceptions.ConnectionError("reset"), pushover_response(200)]})
+        client = PushoverClient("token", session=session, backoff_base=0.001)
+
+        result, = client.send("Title", "Message", None, ["user"])
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.attempts, 3)
+        self.assertNotIn("url", session.calls[0])
+
+    def test_4xx_and_429_are_not_retried(self):
+        session = FakeSession({
+            "bad": [pushover_response(400, {"status": 0, "errors": ["user identifier is invalid"]})],
+            "quota": [pushover_response(429, {"status": 0}, {"X-Limit-App-Reset": "1700000000"})],
+        })
+        client = PushoverClient("token", session=session, backoff_base=0.001)
+
+        bad, quota = client.send("Title", "Message", None, ["bad", "quota"])
+
+        self.assertEqual((bad.success, bad.attempts, bad.error), (False, 1, "user identifier is invalid"))
+        self.assertEqual((quota.success, quota.attempts), (False, 1))
+        self.assertIn("1700000000", quota.error)
+
+    def test_gives_up_after_max_retries(self):
+        session = FakeSession({"user": [pushover_response(500, {})]})
+        client = PushoverClient("token", session=session, max_retries=2, backoff_base=0.001)
+
+        result, = client.send("Title", "Message", None, ["user"])
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.attempts, 3)
+
+    def test_collapsed_recipients_use_one_call(self):
+        session = FakeSession({"a,b,c": [pushover_response(200)]})
+        client = PushoverClient("token", session=session)
+
+        results = client.send("Title", "Message", None, ["a", "b", "c"], collapse=True)
+
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual([r.user_key for r in results], ["a", "b", "c"])
+        self.assertTrue(all(r.success for r in results))
+
+    def test_rejected_collapsed_call_falls_back_to_individual_sends(self):
+        session = FakeSession({
+            "a,b": [pushover_response(400, {"status": 0, "errors": ["user identifier is invalid"]})],
+            "a": [pushover_response(200)],
+            "b": [pushover_response(400, {"status": 0, "errors": ["user identifier is invalid"]})],
+        })
+        client = PushoverClient("token", session=session)
+
+        a, b = client.send("Title", "Message", None, ["a", "b"], collapse=True)
+
+        self.assertTrue(a.success)
+        self.assertFalse(b.success)
+
+    def test_send_notification_prepares_message(self):
+        session = FakeSession({"user": [pushover_response(200)]})
+        client = PushoverClient("token", session=session)
+
+        results = send_notification("Title", "x" * 1500, "https://example.com", ["user"], "token", client=client)
+
+        self.assertTrue(results[0].success)
+        self.assertEqual(len(session.calls[0]["message"]), MAX_MESSAGE_LENGTH)
+
+
 if __name__ == '__main__':
     unittest.main()
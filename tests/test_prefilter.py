@@ -0,0 +1,69 @@
+import time
+import unittest
+
+from prefilter import Prefilter, Rule
+
+
+class TestPrefilter(unittest.TestCase):
+
+    def setUp(self):
+        self.prefilter = Prefilter(
+            rules=[
+                Rule(name="iran-military", any=["Iran"], all=["strike"], none=["drill"]),
+                Rule(name="iran-israel", all=["Iran", "Israel"]),
+            ],
+            aliases={"Iran": ["Tehran", "IRGC", "Islamic Republic"], "strike": ["strikes", "airstrike", "airstrikes"]},
+            exclude=["op-ed", "opinion"],
+        )
+
+    def test_aliases_map_to_canonical_terms(self):
+        match = self.prefilter.match("IRGC airstrikes hit base near Baghdad")
+
+        self.assertEqual(match.rules, ["iran-military"])
+        self.assertEqual(match.terms, frozenset({"iran", "strike"}))
+
+    def test_reports_every_fired_rule(self):
+        match = self.prefilter.match("Israel says strike on Tehran depot was a success")
+
+        self.assertEqual(match.rules, ["iran-military", "iran-israel"])
+
+    def test_rule_exclusions_and_global_excludes(self):
+        self.assertEqual(self.prefilter.match("Iran strike drill planned near Israel").rules, ["iran-israel"])
+        self.assertIsNone(self.prefilter.match("Opinion: Iran strike would backfire"))
+        self.assertIsNone(self.prefilter.match("Markets rally on strong earnings"))
+
+    def test_word_boundaries(self):
+        self.assertIsNone(self.prefilter.match("Iranian strike reported"))
+        self.assertIsNotNone(Prefilter.from_keyword("Iran").match("Iranian strike reported"))
+
+    def test_nested_terms_are_credited(self):
+        prefilter = Prefilter([Rule(name="both", all=["islamic republic", "republic"])])
+
+        self.assertEqual(prefilter.match("Islamic Republic statement").rules, ["both"])
+
+    def test_from_dict(self):
+        prefilter = Prefilter.from_dict({
+            "aliases": {"Iran": ["Tehran"]},
+            "exclude": ["fears"],
+            "rules": [{"name": "iran", "any": ["Iran"]}],
+        })
+
+        self.assertEqual(prefilter.match("Explosions in Tehran").rules, ["iran"])
+        self.assertIsNone(prefilter.match("Fears grow over Tehran"))
+
+    def test_scales_to_many_terms(self):
+        terms = [f"term{i}" for i in range(2000)]
+        prefilter = Prefilter([Rule(name="many", any=terms)])
+        text = "a headline mentioning nothing in particular " * 20
+
+        start = time.perf_counter()
+        for _ in range(200):
+            prefilter.match(text)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(prefilter.match("news about term1999").rules, ["many"])
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
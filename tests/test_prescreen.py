@@ -0,0 +1,159 @@
+import asyncio
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from classifier_engine import ClassifierEngine
+from config import Config
+from prescreen import (
+    HashedNgramModel,
+    LabelStore,
+    Prescreen,
+    cascade_stats,
+    choose_high,
+    choose_low,
+    load_prescreen,
+    model_path,
+    train,
+)
+from benchmarks.openai_stub import OpenAIStub
+
+TRIGGERING_EVENT = "Military confrontation between Iran and US or Israel has occurred"
+ACTORS = ["Iran", "Israel", "US", "IRGC", "Tehran", "Pentagon"]
+TARGETS = ["air base", "naval convoy", "drone site", "military depot", "radar station"]
+
+
+def labeled_titles(count, seed=0):
+    rng = random.Random(seed)
+    positive = [
+        "{a} strikes {t} in overnight raid",
+        "{a} launches missiles at {t}",
+        "Explosions as {a} bombs {t}",
+        "{a} shoots down drones over {t}",
+    ]
+    negative = [
+        "Op-ed: why {a} should avoid war over {t}",
+        "Fears of escalation grow as {a} warns about {t}",
+        "{a} threatens retaliation if {t} is attacked",
+        "Opinion: the {t} debate in {a}",
+    ]
+    examples = []
+    for i in range(count):
+        templates, label = (positive, True) if i % 2 else (negative, False)
+        title = rng.choice(templates).format(a=rng.choice(ACTORS), t=rng.choice(TARGETS))
+        examples.append((title, label))
+    return examples
+
+
+class TestHashedNgramModel(unittest.TestCase):
+
+    def test_learns_to_separate_classes(self):
+        model = HashedNgramModel().fit(labeled_titles(200))
+        held_out = labeled_titles(50, seed=1)
+
+        correct = sum((model.score(title) >= 0.5) == label for title, label in held_out)
+
+        self.assertGreaterEqual(correct / len(held_out), 0.95)
+
+    def test_scoring_takes_microseconds(self):
+        model = HashedNgramModel().fit(labeled_titles(200))
+        titles = [title for title, _ in labeled_titles(2000, seed=2)]
+
+        start = time.perf_counter()
+        model.score_many(titles)
+        per_title = (time.perf_counter() - start) / len(titles)
+
+        self.assertLess(per_title, 500e-6)
+
+    def test_round_trips_through_dict(self):
+        model = HashedNgramModel().fit(labeled_titles(40))
+        copy = HashedNgramModel.from_dict(model.to_dict())
+
+        self.assertAlmostEqual(copy.score("Iran strikes air base"), model.score("Iran strikes air base"))
+
+
+class TestCalibration(unittest.TestCase):
+
+    def test_choose_low_keeps_target_recall(self):
+        scores = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95]
+        labels = [False, False, False, True, False, True, True, True, True, True]
+
+        self.assertEqual(choose_low(scores, labels, 1.0), 0.4)
+        self.assertEqual(choose_low(scores, labels, 5 / 6), 0.6)
+
+    def test_choose_high_meets_precision(self):
+        scores = [0.1, 0.5, 0.6, 0.8, 0.9]
+        labels = [False, False, True, True, True]
+
+        self.assertEqual(choose_high(scores, labels, 1.0), 0.6)
+        self.assertIsNone(choose_high([0.9], [False], 1.0))
+
+    def test_cascade_stats_count_local_errors_only(self):
+        stats = cascade_stats([0.1, 0.2, 0.5, 0.9], [False, True, True, True], low=0.3, high=0.8)
+
+        self.assertEqual(stats.local_fraction, 0.75)
+        self.assertAlmostEqual(stats.recall, 2 / 3)
+        self.assertEqual(stats.precision, 1.0)
+
+    def test_train_reports_recall_traded(self):
+        prescreen, report = train(labeled_titles(120), target_recall=1.0, target_precision=1.0)
+
+        self.assertIn("decided locally", report)
+        self.assertEqual(len(report.splitlines()), 8)
+        self.assertIsNotNone(prescreen.high)
+        self.assertLessEqual(prescreen.low, prescreen.high)
+
+
+class TestCascade(unittest.TestCase):
+
+    def test_engine_only_escalates_uncertain_titles(self):
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(lambda request: (200, "True", {})) as stub:
+            model = HashedNgramModel().fit(labeled_titles(200))
+            Prescreen(model, low=0.2, high=0.8).save(model_path(tmp, TRIGGERING_EVENT), TRIGGERING_EVENT, 200)
+            config = Config(
+                rss_feed_url="",
+                keyword_filter="",
+                triggering_event=TRIGGERING_EVENT,
+                lookback_minutes=0,
+                pushover_user_keys=[],
+                pushover_api_token="",
+                openai_api_key="key",
+                state_dir=tmp,
+                openai_api_base=stub.base_url,
+            )
+            labels = LabelStore(os.path.join(tmp, "labels.sqlite3"))
+            titles = [
+                "Op-ed: why Iran should avoid war over air base",
+                "Israel launches missiles at drone site",
+                "Parliament in Tehran debates budget",
+            ]
+            uncertain = model.score(titles[2])
+            self.assertTrue(0.2 <= uncertain < 0.8)
+
+            async def run():
+                engine = ClassifierEngine(config, labels=labels)
+                try:
+                    return await engine.classify_many(titles), engine.local_decisions
+                finally:
+                    await engine.aclose()
+
+            verdicts, local_decisions = asyncio.run(run())
+            logged = labels.examples(TRIGGERING_EVENT)
+            labels.close()
+
+        self.assertEqual(verdicts, [False, True, True])
+        self.assertEqual(local_decisions, 2)
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(logged, [("Parliament in Tehran debates budget", True)])
+
+    def test_missing_or_foreign_model_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(load_prescreen(tmp, TRIGGERING_EVENT))
+            Prescreen(HashedNgramModel(), 0.1).save(model_path(tmp, TRIGGERING_EVENT), "Another event", 0)
+            self.assertIsNone(load_prescreen(tmp, TRIGGERING_EVENT))
+
+
+if __name__ == '__main__':
+    unittest.main()
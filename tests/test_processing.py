@@ -0,0 +1,91 @@
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from classifier_engine import ClassifierEngine
+from config import Config
+from src.metrics import metrics
+from processing import Stores, process_events
+from rss import NewsEvent
+from benchmarks.openai_stub import OpenAIStub
+
+SLOW_SECONDS = 1.0
+
+
+def event(title):
+    return NewsEvent(title=title, link=f"https://news.example/{abs(hash(title))}", description="", published=datetime.now(timezone.utc), guid=title)
+
+
+def slow_batch_responder(request):
+    """Batches mentioning "parliament" take SLOW_SECONDS; titles with "struck" trigger."""
+    prompt = request["messages"][-1]["content"]
+    if "parliament" in prompt:
+        time.sleep(SLOW_SECONDS)
+    lines = [line.strip() for line in prompt.split("News Titles:", 1)[1].splitlines() if line.strip()[:1].isdigit()]
+    verdicts = [{"index": int(line.split(".", 1)[0]), "happened": "struck" in line} for line in lines]
+    return 200, json.dumps({"verdicts": verdicts}), {}
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_first_alert_does_not_wait_for_slow_batches(self):
+        events = [
+            event("Iran parliament debates budget"), event("Iran parliament session ends"),
+            event("Iran parliament votes on trade"), event("Iran parliament recesses"),
+            event("Iran struck an air base"), event("Iran holds talks"),
+        ]
+        sent_at = []
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(slow_batch_responder) as stub:
+            config = Config(
+                rss_feed_url="",
+                keyword_filter="Iran",
+                triggering_event="Strike happened",
+                lookback_minutes=60,
+                pushover_user_keys=["user"],
+                pushover_api_token="token",
+                openai_api_key="key",
+                state_dir=tmp,
+                openai_api_base=stub.base_url,
+                classification_batch_size=2,
+                story_clustering=False,
+                prescreen_enabled=False,
+            )
+            watch = config.default_watch()
+            stores = Stores(config)
+
+            async def run():
+                engine = ClassifierEngine(config)
+                try:
+                    return await process_events(events, watch, config, stores, engine, time.perf_counter())
+                finally:
+                    await engine.aclose()
+
+            metrics.reset()
+            with patch("processing.send_notification", side_effect=lambda **kwargs: sent_at.append(time.perf_counter())) as mock_send:
+                complete = asyncio.run(run())
+                finished = time.perf_counter()
+            seen = [stores.seen_store(watch).is_seen(e) for e in events]
+            stores.close()
+
+        self.assertTrue(complete)
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args.kwargs["message"], "Iran struck an air base")
+        # The alert went out while the slow batches were still being classified
+        self.assertLess(sent_at[0], finished - SLOW_SECONDS / 2)
+        self.assertEqual(metrics.summary()["spans"]["time_to_first_alert"]["count"], 1)
+        self.assertEqual(seen, [True] * len(events))
+
+    def test_news_event_is_slotted(self):
+        item = event("Iran struck an air base")
+
+        self.assertFalse(hasattr(item, "__dict__"))
+        self.assertLess(sys.getsizeof(item), 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+from feed_state import FeedStateStore
+from prefilter import Prefilter
+from rss import fetch_rss_events, iter_rss_events, parse_feed_date
+
+
+def rss_item(title, minutes_ago, link=None, guid=None, description=None):
+    published = format_datetime(datetime.now(timezone.utc) - timedelta(minutes=minutes_ago))
+    link = link or f"https://example.com/{abs(hash(title))}"
+    description = f"<description>{escape(description)}</description>" if description is not None else ""
+    return f"""<item>
+      <title>{title}</title>
+      <link>{link}</link>
+      <guid isPermaLink="false">{guid or link}</guid>
+      <pubDate>{published}</pubDate>{description}
+    </item>"""
+
+
+def rss_document(items):
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Test feed</title>
+{"".join(items)}
+</channel></rss>""".encode("utf-8")
+
+
+class FeedServer:
+    """Serves a mutable feed body with an ETag and honors If-None-Match."""
+
+    def __init__(self, body, etag='"v1"', send_etag=True):
+        self.body = body
+        self.etag = etag
+        self.send_etag = send_etag
+        self.requests = []
+
+    def __enter__(self):
+        server_self = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server_self.requests.append(dict(self.headers))
+                if server_self.send_etag and self.headers.get("If-None-Match") == server_self.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+                if server_self.send_etag:
+                    self.send_header("ETag", server_self.etag)
+                self.send_header("Content-Length", str(len(server_self.body)))
+                self.end_headers()
+                self.wfile.write(server_self.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/rss"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestFetchRssEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FeedStateStore(os.path.join(self.tmp.name, "feeds.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_filters_by_keyword_and_lookback(self):
+        body = rss_document([
+            rss_item("Iran news", 5, guid="g-1"),
+            rss_item("Other news", 5),
+            rss_item("Old Iran news", 120),
+        ])
+        with FeedServer(body) as server:
+            events = fetch_rss_events(server.url, 60, "iran")
+
+        self.assertEqual([e.title for e in events], ["Iran news"])
+        self.assertEqual(events[0].guid, "g-1")
+
+    def test_not_modified_short_circuits(self):
+        with FeedServer(rss_document([rss_item("Iran news", 5)])) as server:
+            first = fetch_rss_events(server.url, 60, "Iran", state_store=self.store)
+            self.store.commit()
+            second = fetch_rss_events(server.url, 60, "Iran", state_store=self.store)
+
+        self.assertEqual(len(first), 1)
+        self.assertIsNone(second)
+        self.assertEqual(server.requests[1].get("If-None-Match"), '"v1"')
+
+    def test_identical_body_short_circuits(self):
+        with FeedServer(rss_document([rss_item("Iran news", 5)]), send_etag=False) as server:
+            fetch_rss_events(server.url, 60, "Iran", state_store=self.store)
+            self.store.commit()
+            self.assertIsNone(fetch_rss_events(server.url, 60, "Iran", state_store=self.store))
+
+            server.body = rss_document([rss_item("Iran news", 5), rss_item("More Iran news", 1)])
+            self.assertEqual(len(fetch_rss_events(server.url, 60, "Iran", state_store=self.store)), 2)
+
+    def test_uncommitted_state_is_not_reused(self):
+        with FeedServer(rss_document([rss_item("Iran news", 5)])) as server:
+            fetch_rss_events(server.url, 60, "Iran", state_store=self.store)
+            events = fetch_rss_events(server.url, 60, "Iran", state_store=self.store)
+
+        self.assertEqual(len(events), 1)
+
+
+class TestStreamingParser(unittest.TestCase):
+
+    def test_matches_feedparser_results(self):
+        body = rss_document([
+            rss_item("Iran news &amp; analysis", 5, guid="g-1", description='<p>Officials&nbsp;said <b>more</b></p><script>x()</script>'),
+            rss_item("Other news", 5),
+            rss_item("Old Iran news", 120),
+            rss_item("Newer Iran news", 1),
+        ])
+        with FeedServer(body) as server:
+            expected = fetch_rss_events(server.url, 60, "iran")
+            streamed = fetch_rss_events(server.url, 60, "iran", streaming=True)
+
+        self.assertEqual(streamed, expected)
+        self.assertEqual([e.title for e in streamed], ["Iran news & analysis", "Newer Iran news"])
+        self.assertEqual([e.description for e in streamed], ["Officials said more", ""])
+
+    def test_keyword_in_description_only_matches(self):
+        body = rss_document([
+            rss_item("Explosions reported near air base", 5, description="<p>Iranian officials confirmed the strike</p>"),
+            rss_item("Explosions reported near port", 5, description="Local officials gave no details"),
+        ])
+        prefilter = Prefilter.from_dict({"rules": [{"name": "iran", "any": ["Iranian"]}]})
+        with FeedServer(body) as server:
+            for streaming in (False, True):
+                by_keyword = fetch_rss_events(server.url, 60, "iran", streaming=streaming)
+                by_rule = fetch_rss_events(server.url, 60, streaming=streaming, prefilter=prefilter)
+
+                self.assertEqual([e.title for e in by_keyword], ["Explosions reported near air base"])
+                self.assertEqual([e.matched_rules for e in by_rule], [("iran",)])
+
+    def test_date_ordered_feed_stops_at_cutoff(self):
+        body = rss_document([rss_item("Fresh", 1), rss_item("Old", 120), rss_item("Misplaced fresh", 2)])
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=60)
+
+        unordered = [e.title for e in iter_rss_events(body, cutoff)]
+        ordered = [e.title for e in iter_rss_events(body, cutoff, date_ordered=True)]
+
+        self.assertEqual(unordered, ["Fresh", "Misplaced fresh"])
+        self.assertEqual(ordered, ["Fresh"])
+
+    def test_atom_entries(self):
+        published = (datetime.now(timezone.utc) - timedelta(minutes=5)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        body = f"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Atom</title>
+  <entry>
+    <title>Iran atom entry</title>
+    <link rel="alternate" href="https://example.com/atom/1"/>
+    <id>tag:example.com,2026:1</id>
+    <published>{published}</published>
+  </entry>
+</feed>""".encode("utf-8")
+
+        events = list(iter_rss_events(body, datetime.now(timezone.utc) - timedelta(minutes=60), "Iran"))
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].link, "https://example.com/atom/1")
+        self.assertEqual(events[0].guid, "tag:example.com,2026:1")
+
+    def test_parse_feed_date_formats(self):
+        expected = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+        self.assertEqual(parse_feed_date("Sun, 01 Mar 2026 12:30:00 GMT"), expected)
+        self.assertEqual(parse_feed_date("2026-03-01T12:30:00Z"), expected)
+        self.assertEqual(parse_feed_date("March 1, 2026 12:30 UTC"), expected)
+        self.assertEqual(parse_feed_date("2026-03-01 12:30:00"), expected)
+        with self.assertRaises(ValueError):
+            parse_feed_date("not a date")
+
+
+if __name__ == '__main__':
+    unittest.main()
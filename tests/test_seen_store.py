@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+
+from rss import NewsEvent
+from normalize import normalize_title
+from seen_store import SeenStore
+
+
+def make_event(title, link="https://example.com/a", guid=""):
+    return NewsEvent(title=title, link=link, description="", published=datetime.now(timezone.utc), guid=guid)
+
+
+class TestSeenStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SeenStore(os.path.join(self.tmp.name, "state", "seen.sqlite3"), retention_hours=1)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_marked_event_is_skipped(self):
+        event = make_event("Iran launches drones", guid="guid-1")
+        self.assertEqual(self.store.filter_unseen([event]), [event])
+
+        self.store.mark(event, triggered=False)
+
+        self.assertTrue(self.store.is_seen(event))
+        self.assertEqual(self.store.filter_unseen([event]), [])
+
+    def test_same_headline_from_other_outlet_is_skipped(self):
+        first = make_event("Iran launches drones - Reuters", link="https://a.example/1", guid="a-1")
+        second = make_event("Iran Launches Drones! - AP News", link="https://b.example/2", guid="b-2")
+        self.store.mark(first, triggered=True)
+
+        self.assertEqual(self.store.filter_unseen([second]), [])
+
+    def test_headlines_with_an_inner_dash_are_not_conflated(self):
+        first = make_event("US - Iran talks collapse", link="https://a.example/1")
+        second = make_event("US - China trade deal signed", link="https://b.example/2")
+        self.store.mark(first, triggered=False)
+
+        self.assertEqual(self.store.filter_unseen([second]), [second])
+        self.assertEqual(normalize_title("US - Iran talks collapse"), "us iran talks collapse")
+        self.assertEqual(normalize_title("US - Iran talks collapse - Reuters"), "us iran talks collapse")
+        self.assertEqual(normalize_title("Iran launches drones | The Times of Israel"), "iran launches drones")
+
+    def test_duplicates_within_batch_are_dropped(self):
+        first = make_event("Strikes reported in Tehran", link="https://a.example/1")
+        second = make_event("Strikes reported in Tehran", link="https://b.example/2")
+        other = make_event("Unrelated headline", link="https://c.example/3")
+
+        self.assertEqual(self.store.filter_unseen([first, second, other]), [first, other])
+
+    def test_compact_drops_expired_entries(self):
+        old = make_event("Old story", guid="old")
+        fresh = make_event("Fresh story", guid="fresh")
+        self.store.mark(old, triggered=False, decided_at=time.time() - 2 * 3600)
+        self.store.mark(fresh, triggered=False)
+
+        removed = self.store.compact()
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(self.store.is_seen(old))
+        self.assertTrue(self.store.is_seen(fresh))
+
+    def test_state_persists_across_instances(self):
+        event = make_event("Persistent story", guid="p-1")
+        self.store.mark(event, triggered=True)
+        self.store.close()
+
+        self.store = SeenStore(self.store.path, retention_hours=1)
+
+        self.assertTrue(self.store.is_seen(event))
+
+
+if __name__ == '__main__':
+    unittest.main()
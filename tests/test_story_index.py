@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from classifier_engine import ClassifierEngine
+from config import Config
+from processing import Stores, process_events
+from rss import NewsEvent
+from story_index import MinHasher, StoryIndex, shingles, similarity
+from benchmarks.openai_stub import OpenAIStub
+
+
+def make_event(title, link):
+    return NewsEvent(title=title, link=link, description="", published=datetime.now(timezone.utc), guid=link)
+
+
+SYNDICATED = [
+    "Iran launches missiles at Israeli air bases - Reuters",
+    "Iran launches missiles at Israeli air bases, officials say - AP News",
+    "Iran launches wave of missiles at Israeli air bases - BBC",
+    "Iran launches missiles at Israeli airbases - CNN",
+    "Israeli air bases hit as Iran launches missiles - Al Jazeera",
+]
+
+
+class TestMinHash(unittest.TestCase):
+
+    def test_shingles_drop_outlet_and_stopwords(self):
+        self.assertEqual(shingles("The strike on Tehran - Reuters"), frozenset({"strike", "tehran"}))
+
+    def test_signature_similarity_estimates_jaccard(self):
+        hasher = MinHasher(num_perm=256)
+        a = frozenset("iran launches missiles israeli air bases".split())
+        b = frozenset("iran launches wave missiles israeli air bases".split())
+
+        self.assertEqual(similarity(hasher.signature(a), hasher.signature(a)), 1.0)
+        self.assertAlmostEqual(similarity(hasher.signature(a), hasher.signature(b)), 6 / 7, delta=0.1)
+
+
+class TestStoryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "stories.sqlite3")
+        self.index = StoryIndex(self.path, retention_hours=1)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_groups_syndicated_headlines(self):
+        events = [make_event(title, f"https://news.example/{i}") for i, title in enumerate(SYNDICATED)]
+        events.insert(2, make_event("Oil prices climb in early trading", "https://news.example/oil"))
+
+        clusters = self.index.cluster(events)
+
+        self.assertEqual([len(c.members) for c in clusters], [5, 1])
+        self.assertEqual(clusters[0].representative, events[0])
+        self.assertEqual(clusters[1].representative.title, "Oil prices climb in early trading")
+
+    def test_recognizes_stories_from_earlier_runs(self):
+        first, = self.index.cluster([make_event(SYNDICATED[0], "https://news.example/0")])
+        self.index.record(first, triggered=True)
+        self.index.close()
+
+        self.index = StoryIndex(self.path, retention_hours=1)
+        later = self.index.cluster([
+            make_event(SYNDICATED[3], "https://news.example/3"),
+            make_event("Oil prices climb in early trading", "https://news.example/oil"),
+        ])
+
+        self.assertEqual([c.notified_before for c in later], [True, False])
+
+    def test_stories_that_did_not_trigger_are_not_inherited(self):
+        first, = self.index.cluster([make_event("Iran warns it could attack US bases in Iraq", "https://news.example/0")])
+        self.index.record(first, triggered=False)
+
+        later, = self.index.cluster([make_event("Iran attacks US bases in Iraq", "https://news.example/1")])
+
+        self.assertFalse(later.notified_before)
+
+    def test_namespaces_are_independent(self):
+        first, = self.index.cluster([make_event(SYNDICATED[0], "https://news.example/0")])
+        self.index.record(first, triggered=True)
+
+        other = StoryIndex(self.path, retention_hours=1, namespace="other")
+        try:
+            self.assertFalse(other.cluster([make_event(SYNDICATED[1], "https://news.example/1")])[0].notified_before)
+        finally:
+            other.close()
+
+    def test_compact_drops_expired_stories(self):
+        first, = self.index.cluster([make_event(SYNDICATED[0], "https://news.example/0")])
+        self.index.record(first, triggered=False, decided_at=time.time() - 7200)
+
+        self.assertEqual(self.index.compact(), 1)
+
+    def test_stories_expire_in_a_long_lived_index(self):
+        now = time.time()
+        first, = self.index.cluster([make_event(SYNDICATED[0], "https://news.example/0")], now=now)
+        self.index.record(first, triggered=True, decided_at=now)
+        copy = [make_event(SYNDICATED[1], "https://news.example/1")]
+
+        self.assertTrue(self.index.cluster(copy, now=now + 1800)[0].notified_before)
+        self.assertFalse(self.index.cluster(copy, now=now + 3700)[0].notified_before)
+        self.assertEqual(self.index.compact(now=now + 3700), 1)
+        self.assertEqual(self.index._known, {})
+        self.assertEqual(self.index._history.candidates(first.signature), [])
+
+
+class TestProcessStories(unittest.TestCase):
+
+    def run_events(self, config, events, openai_stub):
+        async def run():
+            stores = Stores(config)
+            engine = ClassifierEngine(config, cache=stores.cache)
+            try:
+                return await process_events(events, config.default_watch(), config, stores, engine)
+            finally:
+                await engine.aclose()
+                stores.close()
+        return asyncio.run(run())
+
+    def make_config(self, tmp, openai_stub):
+        return Config(
+            rss_feed_url="https://news.example/rss",
+            keyword_filter="Iran",
+            triggering_event="Iran attacked",
+            lookback_minutes=60,
+            pushover_user_keys=["user"],
+            pushover_api_token="token",
+            openai_api_key="key",
+            state_dir=tmp,
+            openai_api_base=openai_stub.base_url,
+            story_clustering=True,
+            prescreen_enabled=False,
+        )
+
+    def test_one_notification_per_story(self):
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(attack_responder) as openai_stub:
+            config = self.make_config(tmp, openai_stub)
+            events = [make_event(title, f"https://news.example/{i}") for i, title in enumerate(SYNDICATED)]
+
+            with patch("processing.send_notification") as mock_send:
+                self.assertTrue(self.run_events(config, events[:4], openai_stub))
+                # A copy published after the story was notified does not notify again
+                self.assertTrue(self.run_events(config, events[4:], openai_stub))
+
+        self.assertEqual(classified_titles(openai_stub), SYNDICATED)
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args.kwargs["message"], f"{SYNDICATED[0]} (4 sources)")
+        self.assertEqual(mock_send.call_args.kwargs["url"], "https://news.example/0")
+
+    def test_similar_headlines_are_classified_on_their_own(self):
+        threat = "Iran warns it could attack US bases in Iraq"
+        attack = "Iran attacks US bases in Iraq"
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(attack_responder) as openai_stub:
+            config = self.make_config(tmp, openai_stub)
+
+            with patch("processing.send_notification") as mock_send:
+                self.assertTrue(self.run_events(config, [make_event(threat, "https://news.example/0")], openai_stub))
+                self.assertTrue(self.run_events(config, [
+                    make_event(attack, "https://news.example/1"),
+                    make_event("Iran threatens to attack US bases in Iraq", "https://news.example/2"),
+                ], openai_stub))
+
+        self.assertEqual(len(classified_titles(openai_stub)), 3)
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args.kwargs["message"], attack)
+
+
+def attack_responder(request):
+    """Answers single and batch prompts: a headline triggers if it reports an attack or launch."""
+    prompt = request["messages"][-1]["content"]
+    if "News Titles:" not in prompt:
+        return 200, str(triggers(prompt.split("News Title:", 1)[1])), {}
+    lines = [line.strip() for line in prompt.split("News Titles:", 1)[1].splitlines() if line.strip()[:1].isdigit()]
+    verdicts = [{"index": int(line.split(".", 1)[0]), "happened": triggers(line)} for line in lines]
+    return 200, json.dumps({"verdicts": verdicts}), {}
+
+
+def triggers(text):
+    return "attacks" in text or "launches" in text
+
+
+def classified_titles(openai_stub):
+    titles = []
+    for request in openai_stub.requests:
+        prompt = request["messages"][-1]["content"]
+        if "News Titles:" in prompt:
+            titles += [line.strip().split(". ", 1)[1] for line in prompt.split("News Titles:", 1)[1].splitlines() if line.strip()[:1].isdigit()]
+        else:
+            titles.append(prompt.split("News Title:", 1)[1].strip())
+    return titles
+
+if __name__ == '__main__':
+    unittest.main()
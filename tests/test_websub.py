@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import hmac
+import http.client
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlencode
+
+import requests
+
+from config import Config, Watch
+from daemon import Daemon
+from benchmarks.openai_stub import OpenAIStub
+from tests.test_rss import FeedServer, rss_document, rss_item
+from websub import WebSubReceiver, discover_hub, verify_signature
+
+ATOM = "http://www.w3.org/2005/Atom"
+
+
+def hub_feed(hub_url, self_url, items):
+    """RSS document advertising a WebSub hub with atom:link elements."""
+    links = f'<atom:link rel="hub" href="{hub_url}"/><atom:link rel="self" href="{self_url}"/>'
+    return rss_document([links] + items).replace(b"<rss ", f'<rss xmlns:atom="{ATOM}" '.encode(), 1)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubHub:
+    """Local stand-in for a WebSub hub: verifies subscribers and distributes signed content."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.verified = threading.Event()
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode()).items()}
+                self.send_response(202)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                threading.Thread(target=hub._verify, args=(form,), daemon=True).start()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/hub"
+
+    def _verify(self, form):
+        challenge = "challenge-123"
+        query = urlencode({
+            "hub.mode": form["hub.mode"],
+            "hub.topic": form["hub.topic"],
+            "hub.challenge": challenge,
+            "hub.lease_seconds": form.get("hub.lease_seconds", "3600"),
+        })
+        response = requests.get(f"{form['hub.callback']}?{query}", timeout=5)
+        if response.status_code == 200 and response.text == challenge:
+            self.subscribers[form["hub.topic"]] = (form["hub.callback"], form.get("hub.secret"))
+            self.verified.set()
+
+    def publish(self, topic, body, secret=None):
+        callback, subscriber_secret = self.subscribers[topic]
+        secret = secret or subscriber_secret
+        signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return requests.post(callback, data=body, headers={"Content-Type": "application/rss+xml", "X-Hub-Signature": signature}, timeout=5)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TestDiscovery(unittest.TestCase):
+
+    def test_finds_hub_and_self_links_in_feed(self):
+        body = hub_feed("https://hub.example/", "https://news.example/feed", [])
+
+        self.assertEqual(discover_hub(body, "https://fetched.example/"), ("https://hub.example/", "https://news.example/feed"))
+        self.assertIsNone(discover_hub(rss_document([]), "https://fetched.example/"))
+
+    def test_link_header_takes_precedence(self):
+        header = '<https://hub.other/>; rel="hub", <https://topic.other/>; rel="self"'
+        body = hub_feed("https://hub.example/", "https://news.example/feed", [])
+
+        self.assertEqual(discover_hub(body, "https://x/", header), ("https://hub.other/", "https://topic.other/"))
+
+    def test_verifies_hmac_signatures(self):
+        body = b"<rss/>"
+        signature = "sha1=" + hmac.new(b"secret", body, hashlib.sha1).hexdigest()
+
+        self.assertTrue(verify_signature("secret", body, signature))
+        self.assertFalse(verify_signature("other", body, signature))
+        self.assertFalse(verify_signature("secret", body, None))
+        self.assertFalse(verify_signature("secret", body, "md5=abc"))
+
+
+class TestReceiver(unittest.TestCase):
+
+    def test_subscribes_and_accepts_only_signed_pushes(self):
+        received = []
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp, StubHub() as hub:
+            receiver = WebSubReceiver(f"http://127.0.0.1:{port}", os.path.join(tmp, "websub.sqlite3"), lambda *args: received.append(args), host="127.0.0.1", port=port)
+            receiver.start()
+            try:
+                self.assertTrue(receiver.subscribe("https://news.example/rss", hub.url, "https://news.example/topic"))
+                self.assertTrue(hub.verified.wait(5))
+                self.assertTrue(receiver.is_subscribed("https://news.example/rss"))
+
+                self.assertEqual(hub.publish("https://news.example/topic", b"<rss>signed</rss>").status_code, 202)
+                self.assertEqual(hub.publish("https://news.example/topic", b"<rss>forged</rss>", secret="wrong").status_code, 202)
+                callback = hub.subscribers["https://news.example/topic"][0]
+                wrong_topic = requests.get(callback, params={"hub.mode": "subscribe", "hub.topic": "https://evil.example/", "hub.challenge": "x"}, timeout=5)
+            finally:
+                receiver.close()
+
+        self.assertEqual(received, [("https://news.example/rss", b"<rss>signed</rss>", "application/rss+xml")])
+        self.assertEqual(wrong_topic.status_code, 404)
+
+    def test_rejects_bad_content_lengths(self):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp:
+            receiver = WebSubReceiver(f"http://127.0.0.1:{port}", os.path.join(tmp, "websub.sqlite3"), lambda *args: None, host="127.0.0.1", port=port)
+            receiver.start()
+            statuses = []
+            try:
+                for length in ("abc", "-1", str(10 ** 9)):
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                    conn.putrequest("POST", "/websub/abc")
+                    conn.putheader("Content-Length", length)
+                    conn.endheaders()
+                    statuses.append(conn.getresponse().status)
+                    conn.close()
+            finally:
+                receiver.close()
+
+        self.assertEqual(statuses, [400, 400, 413])
+
+
+class TestPushIngestion(unittest.TestCase):
+
+    def test_pushed_entries_are_classified_and_notified(self):
+        def responder(request):
+            return 200, "True" if "struck" in request["messages"][-1]["content"] else "False", {}
+
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp, StubHub() as hub, OpenAIStub(responder) as openai_stub:
+            topic = "https://news.example/topic"
+            with FeedServer(hub_feed(hub.url, topic, [rss_item("Iran holds talks", 5)])) as feed:
+                config = Config(
+                    rss_feed_url=feed.url,
+                    keyword_filter="Iran",
+                    triggering_event="Strike happened",
+                    lookback_minutes=60,
+                    pushover_user_keys=["user"],
+                    pushover_api_token="token",
+                    openai_api_key="key",
+                    state_dir=tmp,
+                    openai_api_base=openai_stub.base_url,
+                    websub_callback_url=f"http://127.0.0.1:{port}",
+                    websub_listen_host="127.0.0.1",
+                    websub_listen_port=port,
+                    watches=[Watch("iran", feed.url, "Iran", "Strike happened", min_poll_seconds=3600, max_poll_seconds=3600)],
+                )
+                with patch("src.processing.send_notification") as mock_send:
+                    daemon = Daemon(config)
+
+                    async def run():
+                        task = asyncio.create_task(daemon.run())
+                        await asyncio.to_thread(hub.verified.wait, 5)
+                        pushed_at = time.monotonic()
+                        delta = hub_feed(hub.url, topic, [rss_item("Iran struck a base", 0)])
+                        await asyncio.to_thread(hub.publish, topic, delta)
+                        while not mock_send.called and time.monotonic() - pushed_at < 5:
+                            await asyncio.sleep(0.02)
+                        daemon.stop()
+                        await task
+                        return time.monotonic() - pushed_at
+
+                    latency = asyncio.run(run())
+
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args.kwargs["message"], "Iran struck a base")
+        self.assertLess(latency, 5)
+        # One poll at startup plus the discovery fetch; the push needed no fetch
+        self.assertEqual(len(feed.requests), 2)
+
+    def test_duplicate_pushes_notify_once(self):
+        def responder(request):
+            return 200, "True" if "struck" in request["messages"][-1]["content"] else "False", {}
+
+        with tempfile.TemporaryDirectory() as tmp, OpenAIStub(responder, latency=0.2) as openai_stub:
+            feed_url = "https://news.example/rss"
+            config = Config(
+                rss_feed_url=feed_url,
+                keyword_filter="Iran",
+                triggering_event="Strike happened",
+                lookback_minutes=60,
+                pushover_user_keys=["user"],
+                pushover_api_token="token",
+                openai_api_key="key",
+                state_dir=tmp,
+                openai_api_base=openai_stub.base_url,
+                prescreen_enabled=False,
+            )
+            body = rss_document([rss_item("Iran struck a base", 0)])
+            with patch("src.processing.send_notification") as mock_send:
+                daemon = Daemon(config)
+
+                async def run():
+                    # Hubs may deliver the same update twice, and both arrive while the first is classified
+                    try:
+                        await asyncio.gather(*(daemon.handle_push(feed_url, body, "application/rss+xml") for _ in range(2)))
+                    finally:
+                        await daemon.engine.aclose()
+                        daemon.stores.close()
+
+                asyncio.run(run())
+
+        mock_send.assert_called_once()
+        self.assertEqual(len(openai_stub.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()